@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Inmoser Service Management',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.0',
     'category': 'Service Management',
     'summary': 'Complete Service Order Management System for Technical Services',
     'author': 'INMOSER84',
@@ -44,6 +44,8 @@
         # 4. Vistas (ir.ui.view) y Asistentes
         'views/service_order_views.xml',
         'views/service_order_calendar.xml',         # Definición de vista de calendario
+        'views/service_technician_capacity_views.xml',
+        'views/service_report_monthly_views.xml',
         'views/service_order_map.xml',
         'views/service_equipment_views.xml',
         'views/service_type_views.xml',
@@ -84,6 +86,8 @@
         'tests/test_service_workflows.py',
         'tests/test_ui.py',
         'tests/test_performance.py',
+        'tests/test_technician_availability.py',
+        'tests/test_route_planner.py',
     ],
     'installable': True,
     'application': True,
@@ -0,0 +1,84 @@
+from odoo.http import request
+from collections import defaultdict
+import functools
+import threading
+import time
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+
+
+class ApiMetrics(object):
+    """Per API key and endpoint request counters and latency histograms.
+
+    Metrics are kept per worker process; scrape every worker (or sum them)
+    to get server-wide figures.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = defaultdict(lambda: {
+            'requests': 0,
+            'errors': 0,
+            'sum': 0.0,
+            'buckets': [0] * len(LATENCY_BUCKETS),
+        })
+
+    def record(self, key_name, endpoint, duration, error=False):
+        with self._lock:
+            series = self._series[(key_name, endpoint)]
+            series['requests'] += 1
+            series['errors'] += int(bool(error))
+            series['sum'] += duration
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    series['buckets'][index] += 1
+                    break
+
+    def observe(self, endpoint):
+        """Decorator timing an API handler.
+
+        The handler's key name is the one stored on the request by
+        ``MainController._validate_api_key``; unauthenticated calls are
+        accounted under ``invalid``.
+        """
+        def decorator(method):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                error = True
+                try:
+                    result = method(*args, **kwargs)
+                    error = (isinstance(result, dict) and 'error' in result) or getattr(result, 'status_code', 200) >= 400
+                    return result
+                finally:
+                    key_name = getattr(request, 'service_api_key', None) or 'invalid'
+                    self.record(key_name, endpoint, time.perf_counter() - start, error)
+            return wrapper
+        return decorator
+
+    def export(self):
+        """Render the metrics in the Prometheus text exposition format"""
+        with self._lock:
+            series = {labels: dict(values, buckets=list(values['buckets'])) for labels, values in self._series.items()}
+
+        lines = [
+            '# TYPE modulo_api_requests_total counter',
+            '# TYPE modulo_api_errors_total counter',
+            '# TYPE modulo_api_request_duration_seconds histogram',
+        ]
+        for (key_name, endpoint), values in sorted(series.items()):
+            labels = 'key="%s",endpoint="%s"' % (key_name, endpoint)
+            lines.append('modulo_api_requests_total{%s} %d' % (labels, values['requests']))
+            lines.append('modulo_api_errors_total{%s} %d' % (labels, values['errors']))
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, values['buckets']):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('modulo_api_request_duration_seconds_bucket{%s,le="%s"} %d' % (labels, le, cumulative))
+            lines.append('modulo_api_request_duration_seconds_sum{%s} %f' % (labels, values['sum']))
+            lines.append('modulo_api_request_duration_seconds_count{%s} %d' % (labels, values['requests']))
+        return '\n'.join(lines) + '\n'
+
+
+api_metrics = ApiMetrics()
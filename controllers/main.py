@@ -2,11 +2,44 @@ from odoo import http
 from odoo.http import request
 from odoo.exceptions import AccessError, UserError
 from odoo import _
+from .api_metrics import api_metrics
+from datetime import timezone
+from werkzeug.http import http_date
+import base64
+import hashlib
 import logging
 import json
 
 _logger = logging.getLogger(__name__)
 
+# Modelos cuyos códigos QR se sirven bajo demanda en /service-qr/<kind>/<id>.<format>
+QR_IMAGE_MODELS = {
+    'service-order': 'service.order',
+    'equipment': 'service.equipment',
+}
+QR_IMAGE_MIMETYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+QR_IMAGE_MAX_AGE = 86400
+
+# Claves devueltas por la API de estado -> campo de service.order
+API_ORDER_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'state': 'state',
+    'date_requested': 'date_requested',
+    'date_scheduled': 'date_scheduled',
+    'date_started': 'date_started',
+    'date_completed': 'date_completed',
+    'technician': 'technician_id',
+    'partner': 'partner_id',
+    'service_type': 'service_type_id',
+    'equipment': 'equipment_id',
+}
+API_ORDER_STATES = ('draft', 'scheduled', 'in_progress', 'completed', 'cancelled')
+API_CHANGES_MAX_LIMIT = 1000
+
 class MainController(http.Controller):
 
     @http.route(['/service-order/scan/<string:qr_data>'], type='http', auth="public", website=True, sitemap=False)
@@ -16,30 +49,26 @@ class MainController(http.Controller):
             return request.render('website.404')
 
         try:
-            # Parse QR data
-            parts = qr_data.split('|')
-            if len(parts) < 3:
-                _logger.warning("Invalid QR data format: %s", qr_data)
-                return request.render('website.404')
-
-            order_ref = parts[0]
-            customer_name = parts[1]
-            date_str = parts[2]
-
-            # Find service order
-            service_order = request.env['service.order'].sudo().search([
-                ('name', '=', order_ref)
-            ], limit=1)
-
-            if not service_order:
-                _logger.warning("Service order not found: %s", order_ref)
-                return request.render('website.404')
-
-            # Check if the customer name matches (case insensitive)
-            if service_order.partner_id.name.lower() != customer_name.lower():
-                _logger.warning("Customer name mismatch for order %s: expected %s, got %s", 
-                               order_ref, service_order.partner_id.name, customer_name)
-                return request.render('website.403')
+            ServiceOrder = request.env['service.order'].sudo()
+
+            # Signed token: the signature is checked before loading anything, then a primary key lookup
+            order_id = ServiceOrder._resolve_qr_token(qr_data)
+            if order_id:
+                service_order = ServiceOrder.browse(order_id).exists()
+                if not service_order:
+                    _logger.warning("Service order not found for QR token: %s", qr_data)
+                    return request.render('website.404')
+            else:
+                service_order = self._find_service_order_from_legacy_qr(qr_data)
+                if not service_order:
+                    return request.render('website.404')
+
+                # Check if the customer name matches (case insensitive)
+                customer_name = qr_data.split('|')[1]
+                if service_order.partner_id.name.lower() != customer_name.lower():
+                    _logger.warning("Customer name mismatch for order %s: expected %s, got %s", 
+                                   service_order.name, service_order.partner_id.name, customer_name)
+                    return request.render('website.403')
 
             values = {
                 'service_order': service_order,
@@ -54,7 +83,62 @@ class MainController(http.Controller):
                 'error_message': _('An error occurred while processing your request')
             })
 
+    def _find_service_order_from_legacy_qr(self, qr_data):
+        """Resolve the ``name|customer|date`` payload of labels printed
+        before signed QR tokens"""
+        # Parse QR data
+        parts = qr_data.split('|')
+        if len(parts) < 3:
+            _logger.warning("Invalid QR data format: %s", qr_data)
+            return None
+
+        order_ref = parts[0]
+
+        # Find service order
+        service_order = request.env['service.order'].sudo().search([
+            ('name', '=', order_ref)
+        ], limit=1)
+
+        if not service_order:
+            _logger.warning("Service order not found: %s", order_ref)
+            return None
+        return service_order
+
+    @http.route(['/service-qr/<string:kind>/<int:res_id>.<string:image_format>'], type='http', auth="user", methods=['GET'], sitemap=False)
+    def service_qr_image(self, kind=None, res_id=None, image_format=None, **kw):
+        """Render a QR code on demand, with ETag based revalidation"""
+        model = QR_IMAGE_MODELS.get(kind)
+        if not model or image_format not in QR_IMAGE_MIMETYPES:
+            return request.not_found()
+
+        record = request.env[model].browse(res_id).exists()
+        if not record:
+            return request.not_found()
+        try:
+            record.check_access_rights('read')
+            record.check_access_rule('read')
+        except AccessError:
+            return request.not_found()
+
+        generator = request.env['qr.code.generator']
+        payload = record._get_qr_data(record)
+        etag = generator._qr_cache_key(payload, image_format=image_format)
+        headers = [
+            ('ETag', '"%s"' % etag),
+            ('Cache-Control', 'private, max-age=%d' % QR_IMAGE_MAX_AGE),
+        ]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response(b'', headers=headers, status=304)
+
+        image = generator._render_qr_code(payload, image_format=image_format)
+        if not image:
+            return request.not_found()
+
+        headers.append(('Content-Type', QR_IMAGE_MIMETYPES[image_format]))
+        return request.make_response(base64.b64decode(image), headers=headers)
+
     @http.route(['/api/service-order/<int:order_id>/status'], type='json', auth="api_key", methods=['GET'], csrf=False)
+    @api_metrics.observe('status')
     def api_service_order_status(self, order_id=None, **kw):
         try:
             if not order_id:
@@ -71,25 +155,144 @@ class MainController(http.Controller):
             if not service_order.exists():
                 return {'error': _('Service order not found')}
 
-            return {
-                'id': service_order.id,
-                'name': service_order.name,
-                'state': service_order.state,
-                'date_requested': service_order.date_requested,
-                'date_scheduled': service_order.date_scheduled,
-                'date_started': service_order.date_started,
-                'date_completed': service_order.date_completed,
-                'technician': service_order.technician_id.name if service_order.technician_id else None,
-                'partner': service_order.partner_id.name,
-                'service_type': service_order.service_type_id.name,
-                'equipment': service_order.equipment_id.name if service_order.equipment_id else None,
-            }
+            return self._serialize_service_orders(service_order)[0]
 
         except Exception as e:
             _logger.error("Error getting service order status: %s", str(e))
             return {'error': str(e)}
 
+    @http.route(['/api/service-order/status'], type='http', auth="api_key", methods=['GET'], csrf=False)
+    @api_metrics.observe('status_list')
+    def api_service_order_status_list(self, ids=None, technician_id=None, state=None, fields=None, **kw):
+        """Status of several service orders in one call.
+
+        Orders are selected by ``ids`` or by ``technician_id``/``state``
+        (comma separated lists), and ``fields`` restricts the returned keys.
+        Responses carry an ETag and Last-Modified derived from the
+        transactions that wrote the orders (see
+        ``service.order._get_change_version``), so unchanged worklists are
+        answered with 304 without reading or serializing them.
+        """
+        try:
+            if not self._validate_api_key(request.httprequest.headers.get('Authorization')):
+                return request.make_json_response({'error': _('Invalid API key')}, status=401)
+
+            domain = []
+            if ids:
+                domain.append(('id', 'in', [int(order_id) for order_id in ids.split(',')]))
+            if technician_id:
+                domain.append(('technician_id', '=', int(technician_id)))
+            if state:
+                states = state.split(',')
+                if not set(states) <= set(API_ORDER_STATES):
+                    return request.make_json_response({'error': _('Invalid state: %s') % state}, status=400)
+                domain.append(('state', 'in', states))
+            if not domain:
+                return request.make_json_response({'error': _('Missing ids, technician_id or state')}, status=400)
+
+            keys = fields.split(',') if fields else list(API_ORDER_FIELDS)
+            unknown = set(keys) - set(API_ORDER_FIELDS)
+            if unknown:
+                return request.make_json_response({'error': _('Invalid fields: %s') % ', '.join(sorted(unknown))}, status=400)
+            keys = ['id'] + [key for key in keys if key != 'id']
+
+            ServiceOrder = request.env['service.order'].sudo()
+            version, count, last_modified = ServiceOrder._get_change_version(domain)
+            etag = hashlib.sha1(repr((domain, keys, version)).encode()).hexdigest()
+            headers = [('ETag', '"%s"' % etag), ('Cache-Control', 'private, no-cache')]
+            if last_modified:
+                headers.append(('Last-Modified', http_date(last_modified.replace(tzinfo=timezone.utc))))
+
+            if_none_match = request.httprequest.if_none_match
+            if_modified_since = request.httprequest.if_modified_since
+            if if_none_match:
+                not_modified = if_none_match.contains(etag)
+            else:
+                not_modified = bool(last_modified and if_modified_since and last_modified.replace(
+                    microsecond=0, tzinfo=timezone.utc) <= if_modified_since.astimezone(timezone.utc))
+            if not_modified:
+                return request.make_response(b'', headers=headers, status=304)
+
+            orders = ServiceOrder.search_fetch(domain, [API_ORDER_FIELDS[key] for key in keys], order='id')
+            return request.make_json_response({
+                'count': count,
+                'orders': self._serialize_service_orders(orders, keys),
+            }, headers=headers)
+
+        except ValueError as e:
+            return request.make_json_response({'error': str(e)}, status=400)
+        except Exception as e:
+            _logger.error("Error getting service order statuses: %s", str(e))
+            return request.make_json_response({'error': str(e)}, status=500)
+
+    @http.route(['/api/service-order/changes'], type='http', auth="api_key", methods=['GET'], csrf=False)
+    @api_metrics.observe('changes')
+    def api_service_order_changes(self, since=None, limit=None, **kw):
+        """Orders created, updated or cancelled after the ``since`` cursor.
+
+        Changes are returned in the order of the transactions that wrote
+        them (see ``service.order._get_changes``), held back while an older
+        transaction is still in progress, and ``next_cursor`` is passed back
+        as ``since`` on the next call.
+        """
+        try:
+            if not self._validate_api_key(request.httprequest.headers.get('Authorization')):
+                return request.make_json_response({'error': _('Invalid API key')}, status=401)
+
+            limit = min(int(limit or 200), API_CHANGES_MAX_LIMIT)
+            after = self._decode_changes_cursor(since) if since else (0, 0)
+            orders, position = request.env['service.order'].sudo()._get_changes(after, limit)
+
+            orders.fetch(list(API_ORDER_FIELDS.values()) + ['create_date', 'write_date'])
+            changes = []
+            for order, values in zip(orders, self._serialize_service_orders(orders)):
+                if order['state'] == 'cancelled':
+                    values['change'] = 'cancelled'
+                elif order['create_date'] == order['write_date']:
+                    values['change'] = 'created'
+                else:
+                    values['change'] = 'updated'
+                values['write_date'] = order['write_date']
+                changes.append(values)
+
+            return request.make_json_response({
+                'changes': changes,
+                'next_cursor': self._encode_changes_cursor(*position) if orders else since,
+                'has_more': len(orders) == limit,
+            })
+
+        except ValueError as e:
+            return request.make_json_response({'error': str(e)}, status=400)
+        except Exception as e:
+            _logger.error("Error getting service order changes: %s", str(e))
+            return request.make_json_response({'error': str(e)}, status=500)
+
+    def _encode_changes_cursor(self, change_txid, order_id):
+        return base64.urlsafe_b64encode(('%s,%s' % (change_txid, order_id)).encode()).decode()
+
+    def _decode_changes_cursor(self, cursor):
+        try:
+            change_txid, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(',')
+            return int(change_txid), int(order_id)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError(_('Invalid cursor: %s') % cursor)
+
+    def _serialize_service_orders(self, orders, keys=None):
+        """Map service orders to the API representation, related records
+        being given by name"""
+        result = []
+        for order in orders:
+            values = {}
+            for key in keys or API_ORDER_FIELDS:
+                value = order[API_ORDER_FIELDS[key]]
+                if API_ORDER_FIELDS[key].endswith('_id'):
+                    value = value.name if value else None
+                values[key] = value
+            result.append(values)
+        return result
+
     @http.route(['/api/service-order/<int:order_id>/update'], type='json', auth="api_key", methods=['POST'], csrf=False)
+    @api_metrics.observe('update')
     def api_update_service_order(self, order_id=None, **kw):
         try:
             if not order_id:
@@ -146,6 +349,7 @@ class MainController(http.Controller):
             return {'error': str(e)}
 
     @http.route(['/api/service-order/create'], type='json', auth="api_key", methods=['POST'], csrf=False)
+    @api_metrics.observe('create')
     def api_create_service_order(self, **kw):
         try:
             # Validate API key
@@ -154,25 +358,9 @@ class MainController(http.Controller):
                 _logger.warning("Invalid API key attempt for service order creation")
                 return {'error': _('Invalid API key')}
 
-            # Validate required fields
-            required_fields = ['partner_id', 'service_type_id']
-            for field in required_fields:
-                if field not in kw:
-                    return {'error': _('Missing required field: %s') % field}
-
-            # Create service order
-            service_order_vals = {
-                'partner_id': kw['partner_id'],
-                'service_type_id': kw['service_type_id'],
-                'description': kw.get('description', ''),
-                'priority': kw.get('priority', 'medium'),
-            }
-
-            # Optional fields
-            if 'equipment_id' in kw:
-                service_order_vals['equipment_id'] = kw['equipment_id']
-            if 'technician_id' in kw:
-                service_order_vals['technician_id'] = kw['technician_id']
+            service_order_vals, error = request.env['service.order']._prepare_api_vals(kw)
+            if error:
+                return {'error': error}
 
             service_order = request.env['service.order'].sudo().create(service_order_vals)
             _logger.info("Service order %s created via API", service_order.name)
@@ -189,8 +377,47 @@ class MainController(http.Controller):
             _logger.error("Error creating service order: %s", str(e))
             return {'error': str(e)}
 
+    @http.route(['/api/service-order/batch'], type='json', auth="api_key", methods=['POST'], csrf=False)
+    @api_metrics.observe('batch')
+    def api_create_service_order_batch(self, orders=None, atomic=True, **kw):
+        """Create several service orders with a single ``create(vals_list)``.
+
+        With ``atomic`` (the default) any invalid item aborts the whole
+        batch; otherwise valid items are created and invalid ones are
+        reported individually (see ``service.order._create_api_batch``).
+        """
+        try:
+            # Validate API key
+            api_key = request.httprequest.headers.get('Authorization')
+            if not self._validate_api_key(api_key):
+                _logger.warning("Invalid API key attempt for batch service order creation")
+                return {'error': _('Invalid API key')}
+
+            if not isinstance(orders, list) or not orders:
+                return {'error': _('Missing orders')}
+            batch_limit = int(request.env['ir.config_parameter'].sudo().get_param('modulo.api_batch_limit', 500))
+            if len(orders) > batch_limit:
+                return {'error': _('Too many orders in batch: %s (maximum %s)') % (len(orders), batch_limit)}
+            is_atomic = self._parse_api_bool(atomic)
+            if is_atomic is None:
+                return {'error': _('Invalid value for atomic: %s') % atomic}
+
+            return request.env['service.order'].sudo()._create_api_batch(orders, atomic=is_atomic)
+
+        except Exception as e:
+            _logger.error("Error creating service orders in batch: %s", str(e))
+            return {'error': str(e)}
+
+    def _parse_api_bool(self, value):
+        """JSON boolean, ``0``/``1`` or their usual string forms; ``None`` if invalid"""
+        if isinstance(value, str):
+            return {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}.get(value.strip().lower())
+        if isinstance(value, bool) or value in (0, 1):
+            return bool(value)
+        return None
+
     def _validate_api_key(self, api_key):
-        """Validate API key"""
+        """Validate API key, returning the name of the matching key"""
         if not api_key:
             return False
         
@@ -198,9 +425,19 @@ class MainController(http.Controller):
         if api_key.startswith('Bearer '):
             api_key = api_key[7:]
         
-        # Get valid API key from configuration
-        valid_key = request.env['ir.config_parameter'].sudo().get_param('modulo.api_key')
-        return api_key == valid_key
+        # Compare against the cached, configured API keys
+        key_name = request.env['ir.config_parameter'].sudo()._match_service_api_key(api_key)
+        request.service_api_key = key_name
+        return key_name or False
+
+    @http.route(['/api/service-order/metrics'], type='http', auth="api_key", methods=['GET'], csrf=False)
+    def api_service_order_metrics(self, **kw):
+        """Per API key request counters and latency histograms (Prometheus format)"""
+        if not self._validate_api_key(request.httprequest.headers.get('Authorization')):
+            return request.make_response(_('Invalid API key'), status=401)
+        return request.make_response(api_metrics.export(), headers=[
+            ('Content-Type', 'text/plain; version=0.0.4'),
+        ])
 
     @http.route(['/service/dashboard'], type='http', auth="user", website=True)
     def service_dashboard(self, **kwargs):
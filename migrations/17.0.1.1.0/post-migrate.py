@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from odoo import api, SUPERUSER_ID
+
+
+def _reset_template(env, xmlid, filename):
+    """Reload a noupdate mail template from its data file"""
+    template = env.ref(xmlid, raise_if_not_found=False)
+    if template:
+        template.template_fs = filename
+        template.reset_template()
+
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    # Precio de servicio congelado: las órdenes completadas toman el precio de lista actual, salvo
+    # las ya facturadas, que toman el de su factura
+    cr.execute("""
+        UPDATE service_order so
+           SET service_price = pt.list_price
+          FROM service_type st
+          JOIN product_product pp ON pp.id = st.product_id
+          JOIN product_template pt ON pt.id = pp.product_tmpl_id
+         WHERE st.id = so.service_type_id
+           AND so.state = 'completed'
+           AND COALESCE(so.service_price, 0) = 0
+    """)
+    cr.execute("""
+        UPDATE service_order so
+           SET service_price = line.price_unit
+          FROM (SELECT DISTINCT ON (o.id) o.id AS order_id, aml.price_unit
+                  FROM service_order o
+                  JOIN service_type st ON st.id = o.service_type_id
+                  JOIN account_move_line aml ON aml.move_id = o.invoice_id AND aml.product_id = st.product_id
+                 WHERE o.state = 'completed'
+              ORDER BY o.id, aml.id) AS line
+         WHERE so.id = line.order_id
+    """)
+    # Indicadores de técnicos: construir las líneas diarias a partir del histórico
+    env['service.technician.kpi']._rebuild()
+    # El feed de cambios usa ahora change_txid en lugar de write_date
+    cr.execute("DROP INDEX IF EXISTS service_order_write_date_id_index")
+    # Plantillas con la sintaxis ${...}, que Odoo 17 ya no interpreta: los registros
+    # noupdate no se actualizan con el módulo, así que se recargan desde su archivo
+    _reset_template(env, 'modulo.email_template_service_reminder', 'modulo/data/email_templates.xml')
+    # El reporte mensual pasa de service.order a res.company y deja de estar duplicado
+    # en email_templates.xml
+    _reset_template(env, 'modulo.email_template_monthly_service_report_modulo',
+                    'modulo/data/email_template_monthly_service_report.xml')
+    # Códigos QR: las imágenes se leen del almacén compartido a partir de qr_code_key, así que
+    # se eliminan las copias por registro y se calcula la clave de los registros existentes
+    qr_models = [name for name in env.registry.descendants(['qr.code.generator'], '_inherit')
+                 if not env[name]._abstract]
+    env['ir.attachment'].search([('res_model', 'in', qr_models), ('res_field', '=', 'qr_code')]).unlink()
+    for name in qr_models:
+        env[name].with_context(active_test=False).search([])._refresh_qr_codes()
@@ -1,11 +1,23 @@
+# Mixin de códigos QR antes de los modelos que lo heredan
+from . import qr_code_generator
+from . import qr_code_queue
 from . import service_order
+from . import service_order_reminder
 from . import service_type
 from . import service_equipment
 from . import service_order_refaction_line
 from . import account_integration
 from . import stock_integration
 from . import hr_integration
+from . import service_order_scheduler
+from . import service_route_planner
+from . import service_technician_capacity
+from . import service_technician_kpi
+from . import service_report_monthly
 from . import hr_employee_extension
 from . import res_partner_extension
-from . import qr_code_generator
+from . import ir_config_parameter
+from . import ir_http
 from . import service_order_business_logic
+from . import report_equipment_history
+from . import report_technician_performance
@@ -1,4 +1,9 @@
-from odoo import models, fields, api, _
+from odoo import models, _
+from odoo.exceptions import UserError
+from collections import defaultdict
+
+# Criterios para repartir en varias facturas las órdenes de un mismo cliente
+INVOICE_GROUPINGS = ('period', 'service_type')
 
 class AccountIntegration(models.AbstractModel):
     _name = 'account.integration'
@@ -6,36 +11,93 @@ class AccountIntegration(models.AbstractModel):
 
     def create_invoice_from_service_order(self, service_order):
         """Create an invoice from a service order"""
-        if not service_order.partner_id:
+        return self.create_invoices_from_service_orders(service_order)
+
+    def create_invoices_from_service_orders(self, service_orders, grouping=None):
+        """Create the customer invoices of many service orders at once.
+
+        With ``grouping`` left to ``None`` every order gets its own invoice.
+        Otherwise the orders of each customer share an invoice, split
+        further by the criteria of ``grouping``, a subset of
+        ``INVOICE_GROUPINGS``:
+
+        - ``period``: one invoice per month of completion (request date
+          for orders not completed)
+        - ``service_type``: one invoice per service type
+
+        All lines are built in memory, the moves are created with a single
+        ``create`` and the orders are marked invoiced with a single
+        ``write``. Orders already invoiced are an error, as invoicing one
+        order twice always was, and nothing is created then; the
+        ``action_create_invoice`` actions skip them instead.
+
+        :return: the created invoices
+        """
+        unknown = set(grouping or ()) - set(INVOICE_GROUPINGS)
+        if unknown:
+            raise ValueError(_("Unknown invoice grouping: %s") % ', '.join(sorted(unknown)))
+        if any(not order.partner_id for order in service_orders):
             raise ValueError(_("Customer is required to create an invoice"))
+        invoiced = service_orders.filtered('is_invoiced')
+        if invoiced:
+            raise UserError(_("Service orders already invoiced: %s") % ', '.join(invoiced.mapped('name')))
+        if not service_orders:
+            return self.env['account.move']
 
-        invoice_vals = {
-            'partner_id': service_order.partner_id.id,
-            'move_type': 'out_invoice',
-            'invoice_origin': service_order.name,
-            'invoice_line_ids': [],
-        }
+        groups = defaultdict(list)
+        for order in service_orders:
+            groups[self._get_invoice_key(order, grouping)].append(order)
+
+        vals_list = []
+        for orders in groups.values():
+            orders = service_orders.concat(*orders)
+            lines = []
+            for order in orders:
+                lines.extend(self._prepare_invoice_lines(order))
+            vals_list.append({
+                'partner_id': orders.partner_id.id,
+                'move_type': 'out_invoice',
+                'invoice_origin': ', '.join(orders.mapped('name')),
+                'invoice_line_ids': lines,
+            })
+        invoices = self.env['account.move'].create(vals_list)
+
+        service_orders.write({'is_invoiced': True})
+        service_orders._bulk_write_values('invoice_id', {
+            order.id: invoice.id for orders, invoice in zip(groups.values(), invoices) for order in orders
+        })
+        return invoices
 
-        # Add service type as invoice line
+    def _get_invoice_key(self, order, grouping):
+        """Orders with the same key share an invoice"""
+        if grouping is None:
+            return (order.id,)
+        date = order.date_completed or order.date_requested
+        return (
+            order.partner_id.id,
+            date.strftime('%Y-%m') if 'period' in grouping else None,
+            order.service_type_id.id if 'service_type' in grouping else None,
+        )
+
+    def _prepare_invoice_lines(self, service_order):
+        lines = []
+        # Add service type as invoice line, at the price frozen when the order was completed
         if service_order.service_type_id and service_order.service_type_id.product_id:
-            invoice_vals['invoice_line_ids'].append((0, 0, {
-                'product_id': service_order.service_type_id.product_id.id,
+            product = service_order.service_type_id.product_id
+            lines.append((0, 0, {
+                'product_id': product.id,
                 'quantity': 1,
-                'price_unit': service_order.service_type_id.product_id.lst_price,
+                'price_unit': service_order.service_price if service_order.state == 'completed' else product.lst_price,
             }))
 
         # Add refaction lines as invoice lines
         for line in service_order.refaction_line_ids:
-            invoice_vals['invoice_line_ids'].append((0, 0, {
+            lines.append((0, 0, {
                 'product_id': line.product_id.id,
                 'quantity': line.quantity,
                 'price_unit': line.unit_price,
             }))
-
-        invoice = self.env['account.move'].create(invoice_vals)
-        service_order.write({'invoice_id': invoice.id, 'is_invoiced': True})
-
-        return invoice
+        return lines
 
     def create_vendor_bill_for_refaction(self, refaction_line):
         """Create a vendor bill for a refaction line"""
@@ -12,11 +12,44 @@ class HrEmployee(models.Model):
     certification_expiry = fields.Date(string='Certification Expiry')
     service_order_count = fields.Integer(compute='_compute_service_order_count', string='Service Orders')
 
+    # Campos que determinan a qué tipos de servicio puede asignarse un técnico
+    _eligibility_fields = {'is_technician', 'active', 'specialization', 'certification', 'certification_expiry'}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        employees = super().create(vals_list)
+        if any(vals.get('is_technician') for vals in vals_list):
+            self.env['service.type']._invalidate_technician_eligibility()
+        return employees
+
+    def write(self, vals):
+        tracked = self._eligibility_fields & set(vals)
+        before = self._get_eligibility_values() if tracked else None
+        res = super().write(vals)
+        # Solo un cambio real de un técnico invalida la elegibilidad
+        if tracked and self._get_eligibility_values() != before:
+            self.env['service.type']._invalidate_technician_eligibility()
+        return res
+
+    def _get_eligibility_values(self):
+        """Eligibility fields of the technicians of the recordset, by id"""
+        return {
+            employee.id: tuple(employee[fname] for fname in sorted(self._eligibility_fields))
+            for employee in self if employee.is_technician
+        }
+
+    def unlink(self):
+        technicians = self.filtered('is_technician')
+        res = super().unlink()
+        if technicians:
+            self.env['service.type']._invalidate_technician_eligibility()
+        return res
+
     def _compute_service_order_count(self):
+        # Un solo conteo agrupado para todo el recordset
+        counts = dict(self.env['service.order']._read_group([('technician_id', 'in', self.ids)], ['technician_id'], ['__count']))
         for employee in self:
-            employee.service_order_count = self.env['service.order'].search_count([
-                ('technician_id', '=', employee.id)
-            ])
+            employee.service_order_count = counts.get(employee, 0)
 
     def action_view_service_orders(self):
         self.ensure_one()
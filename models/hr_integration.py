@@ -1,5 +1,92 @@
 from odoo import models, fields, api
-from datetime import datetime, timedelta
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+import pytz
+
+# Jornada usada para los técnicos sin calendario laboral
+DEFAULT_WORKDAY_START_HOUR = 8
+DEFAULT_WORKDAY_END_HOUR = 18
+DEFAULT_SCHEDULING_HORIZON_DAYS = 30
+
+
+def merge_intervals(intervals):
+    """Sorted union of ``(start, end)`` intervals"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def find_first_gap(work_intervals, busy_intervals, duration, start=None):
+    """Earliest start of a ``duration`` long slot inside one of the sorted
+    ``work_intervals`` that overlaps none of ``busy_intervals``.
+
+    Both lists are swept once, so the cost is linear in their size.
+    """
+    busy = merge_intervals(busy_intervals)
+    position = 0
+    for work_start, work_end in work_intervals:
+        cursor = max(work_start, start) if start else work_start
+        while cursor + duration <= work_end:
+            # Descartar los intervalos ocupados que terminan antes del cursor
+            while position < len(busy) and busy[position][1] <= cursor:
+                position += 1
+            if position < len(busy) and busy[position][0] < cursor + duration:
+                cursor = busy[position][1]
+                continue
+            return cursor
+    return None
+
+
+class TechnicianAvailabilityIndex(object):
+    """In-memory busy intervals per technician, built from a single query.
+
+    Intervals are kept sorted by start together with the running maximum of
+    their ends, so an overlap test is a bisection plus one comparison.
+    """
+
+    def __init__(self, intervals_by_technician=None):
+        self._intervals = {}
+        self._max_ends = {}
+        for technician_id, intervals in (intervals_by_technician or {}).items():
+            self._intervals[technician_id] = sorted(intervals)
+            self._reindex(technician_id)
+
+    def _reindex(self, technician_id):
+        self._max_ends[technician_id] = list(accumulate((end for _start, end in self._intervals[technician_id]), max))
+
+    def add(self, technician_id, start, end):
+        """Mark ``technician_id`` busy between ``start`` and ``end``"""
+        insort(self._intervals.setdefault(technician_id, []), (start, end))
+        self._reindex(technician_id)
+
+    def busy_intervals(self, technician_id):
+        return self._intervals.get(technician_id, [])
+
+    def conflict_end(self, technician_id, start, end):
+        """Return ``None`` when ``technician_id`` is free between ``start``
+        and ``end``, otherwise the earliest date a slot of the same length
+        may start without overlapping any of the intervals met so far"""
+        intervals = self._intervals.get(technician_id)
+        if not intervals:
+            return None
+        # Intervalos que empiezan antes del fin del hueco buscado
+        count = bisect_left(intervals, (end,))
+        if count and self._max_ends[technician_id][count - 1] > start:
+            return self._max_ends[technician_id][count - 1]
+        return None
+
+    def is_available(self, technician_id, start, end):
+        """Same semantics as the ``date_scheduled < end AND date_scheduled_end > start``
+        overlap query of ``hr.integration.check_technician_availability``"""
+        return self.conflict_end(technician_id, start, end) is None
+
 
 class HrIntegration(models.AbstractModel):
     _name = 'hr.integration'
@@ -8,33 +95,55 @@ class HrIntegration(models.AbstractModel):
     def assign_technician_to_service_order(self, service_order):
         """Automatically assign a technician to a service order"""
         if not service_order.technician_id:
-            # Find available technicians
+            # Técnicos con la especialidad y certificación que exige el tipo de servicio
+            eligible = service_order.service_type_id._get_eligible_technicians()
             technicians = self.env['hr.employee'].search([
-                ('is_technician', '=', True),
+                ('id', 'in', list(eligible)),
                 ('active', '=', True)
-            ])
+            ], limit=1)
 
             if technicians:
-                # Simple assignment: take the first available technician
-                # In a real scenario, this would consider availability, skills, etc.
                 service_order.technician_id = technicians[0].id
                 return technicians[0]
 
         return service_order.technician_id
 
-    def check_technician_availability(self, technician, start_date, end_date):
+    @api.model
+    def _build_availability_index(self, technicians, start_date=None):
+        """Load the busy intervals of ``technicians`` with one query.
+
+        Only intervals ending after ``start_date`` are loaded, so the index
+        answers like the query-based check for any slot from that date on.
+        """
+        domain = [
+            ('technician_id', 'in', technicians.ids),
+            ('state', 'in', ['scheduled', 'in_progress']),
+            ('date_scheduled', '!=', False),
+        ]
+        if start_date:
+            domain.append(('date_scheduled_end', '>', start_date))
+
+        intervals = defaultdict(list)
+        for order in self.env['service.order'].search_read(domain, ['technician_id', 'date_scheduled', 'date_scheduled_end']):
+            intervals[order['technician_id'][0]].append((order['date_scheduled'], order['date_scheduled_end']))
+        return TechnicianAvailabilityIndex(intervals)
+
+    def check_technician_availability(self, technician, start_date, end_date, index=None):
         """Check if a technician is available for a given time slot"""
+        if index is not None:
+            return index.is_available(technician.id, start_date, end_date)
+
         # Check for overlapping service orders
         overlapping_orders = self.env['service.order'].search([
             ('technician_id', '=', technician.id),
             ('state', 'in', ['scheduled', 'in_progress']),
             ('date_scheduled', '<', end_date),
-            ('date_completed', '>', start_date)
+            ('date_scheduled_end', '>', start_date)
         ])
 
         return len(overlapping_orders) == 0
 
-    def schedule_service_order(self, service_order, preferred_date=None):
+    def schedule_service_order(self, service_order, preferred_date=None, index=None):
         """Schedule a service order with an available technician"""
         if not preferred_date:
             preferred_date = fields.Datetime.now() + timedelta(days=1)
@@ -48,7 +157,7 @@ class HrIntegration(models.AbstractModel):
             start_date = preferred_date
             end_date = start_date + timedelta(hours=duration)
 
-            if self.check_technician_availability(technician, start_date, end_date):
+            if self.check_technician_availability(technician, start_date, end_date, index=index):
                 service_order.write({
                     'date_scheduled': start_date,
                     'state': 'scheduled'
@@ -56,7 +165,7 @@ class HrIntegration(models.AbstractModel):
                 return True
             else:
                 # Find next available slot
-                next_slot = self.find_next_available_slot(technician, duration)
+                next_slot = self.find_next_available_slot(technician, duration, index=index)
                 if next_slot:
                     service_order.write({
                         'date_scheduled': next_slot[0],
@@ -66,28 +175,77 @@ class HrIntegration(models.AbstractModel):
 
         return False
 
-    def find_next_available_slot(self, technician, duration_hours):
-        """Find the next available time slot for a technician"""
-        # Get all scheduled orders for the technician
-        orders = self.env['service.order'].search([
-            ('technician_id', '=', technician.id),
-            ('state', 'in', ['scheduled', 'in_progress']),
-            ('date_scheduled', '>=', fields.Datetime.now())
-        ], order='date_scheduled')
-
-        # Start checking from tomorrow
-        start_date = fields.Datetime.now() + timedelta(days=1)
-        start_date = start_date.replace(hour=8, minute=0, second=0, microsecond=0)  # Start at 8 AM
-
-        # Check for the next 7 days
-        for day in range(7):
-            current_date = start_date + timedelta(days=day)
-            end_date = current_date + timedelta(hours=duration_hours)
-
-            if end_date.hour > 18:  # Don't schedule after 6 PM
+    @api.model
+    def _get_scheduling_horizon(self):
+        """Number of days ahead the slot search looks for a free slot"""
+        horizon = self.env['ir.config_parameter'].sudo().get_param('modulo.scheduling_horizon_days')
+        try:
+            return max(int(horizon), 1) if horizon else DEFAULT_SCHEDULING_HORIZON_DAYS
+        except ValueError:
+            return DEFAULT_SCHEDULING_HORIZON_DAYS
+
+    @api.model
+    def _get_work_intervals(self, technicians, start_date, end_date):
+        """Working intervals (naive UTC) of ``technicians`` between the two
+        dates, as ``{technician_id: [(start, end), ...]}``.
+
+        They come from each technician's working calendar (or the company
+        one) with their leaves removed, one batch per calendar. Technicians
+        without any calendar work from 8:00 to 18:00 every day.
+        """
+        start_utc = pytz.utc.localize(start_date)
+        end_utc = pytz.utc.localize(end_date)
+        work_intervals = {}
+        by_calendar = defaultdict(lambda: self.env['hr.employee'])
+        for technician in technicians:
+            by_calendar[technician.resource_calendar_id or technician.company_id.resource_calendar_id] |= technician
+
+        for calendar, calendar_technicians in by_calendar.items():
+            if not calendar:
+                for technician in calendar_technicians:
+                    work_intervals[technician.id] = self._default_work_intervals(start_date, end_date)
                 continue
-
-            if self.check_technician_availability(technician, current_date, end_date):
-                return (current_date, end_date)
-
-        return None
+            intervals = calendar._work_intervals_batch(start_utc, end_utc, resources=calendar_technicians.resource_id)
+            for technician in calendar_technicians:
+                work_intervals[technician.id] = [
+                    (start.astimezone(pytz.utc).replace(tzinfo=None), stop.astimezone(pytz.utc).replace(tzinfo=None))
+                    for start, stop, _records in intervals[technician.resource_id.id]
+                ]
+        return work_intervals
+
+    @api.model
+    def _default_work_intervals(self, start_date, end_date):
+        intervals = []
+        day = start_date.date()
+        while day <= end_date.date():
+            work_start = max(datetime.combine(day, time(DEFAULT_WORKDAY_START_HOUR)), start_date)
+            work_end = min(datetime.combine(day, time(DEFAULT_WORKDAY_END_HOUR)), end_date)
+            if work_start < work_end:
+                intervals.append((work_start, work_end))
+            day += timedelta(days=1)
+        return intervals
+
+    def find_next_available_slot(self, technician, duration_hours, index=None, start_date=None, work_intervals=None):
+        """Find the next available time slot for a technician.
+
+        The earliest gap of ``duration_hours`` in the technician's working
+        hours, from tomorrow on and within the scheduling horizon, found by a
+        single sweep over the working and busy intervals.
+        """
+        if not start_date:
+            # Start checking from tomorrow
+            start_date = datetime.combine(fields.Date.context_today(self) + timedelta(days=1), time.min)
+        end_date = start_date + timedelta(days=self._get_scheduling_horizon())
+
+        # Busy intervals of the technician, loaded once instead of one query per candidate slot
+        if index is None:
+            index = self._build_availability_index(technician, start_date)
+        if work_intervals is None:
+            work_intervals = self._get_work_intervals(technician, start_date, end_date)
+
+        duration = timedelta(hours=duration_hours)
+        slot_start = find_first_gap(work_intervals.get(technician.id, []), index.busy_intervals(technician.id),
+                                    duration, start_date)
+        if slot_start is None:
+            return None
+        return (slot_start, slot_start + duration)
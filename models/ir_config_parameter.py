@@ -0,0 +1,46 @@
+from odoo import models, api, tools
+import hashlib
+import hmac
+
+API_KEY_PARAM = 'modulo.api_key'
+API_KEY_PARAM_PREFIX = 'modulo.api_key.'
+
+class IrConfigParameter(models.Model):
+    _inherit = 'ir.config_parameter'
+
+    @api.model
+    @tools.ormcache()
+    def _get_service_api_keys(self):
+        """Return the configured API keys as ``((name, sha256 digest), ...)``.
+
+        ``modulo.api_key`` is exposed as the ``default`` key and every
+        ``modulo.api_key.<name>`` parameter as a named key. The result is kept
+        in the registry cache, which ``ir.config_parameter`` already clears
+        (in every worker) whenever a parameter is created, written or deleted.
+        """
+        params = self.sudo().search_read([
+            '|', ('key', '=', API_KEY_PARAM), ('key', '=like', API_KEY_PARAM_PREFIX.replace('_', '\\_') + '%'),
+        ], ['key', 'value'])
+        keys = []
+        for param in params:
+            if not param['value']:
+                continue
+            name = 'default' if param['key'] == API_KEY_PARAM else param['key'][len(API_KEY_PARAM_PREFIX):]
+            keys.append((name, hashlib.sha256(param['value'].encode('utf-8')).digest()))
+        return tuple(sorted(keys))
+
+    @api.model
+    def _match_service_api_key(self, api_key):
+        """Return the name of the API key matching ``api_key``, or ``None``.
+
+        Keys are compared as digests in constant time, and every configured
+        key is always compared so timing does not reveal which one matched.
+        """
+        if not api_key:
+            return None
+        digest = hashlib.sha256(api_key.encode('utf-8')).digest()
+        match = None
+        for name, key_digest in self._get_service_api_keys():
+            if hmac.compare_digest(digest, key_digest) and match is None:
+                match = name
+        return match
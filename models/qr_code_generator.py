@@ -1,51 +1,358 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
 import logging
 import io
 import base64
+import json
+import struct
+import threading
+import zlib
 
 _logger = logging.getLogger(__name__)
 
+QR_RENDER_DEFAULTS = {
+    'version': 1,
+    'error_correction': 'L',
+    'box_size': 10,
+    'border': 4,
+    'fill_color': 'black',
+    'back_color': 'white',
+    'image_format': 'png',
+}
+
+QR_CACHE_SIZE = 2048
+QR_ATTACHMENT_MODEL = 'qr.code.generator'
+# Below this many cache misses a process pool costs more than it saves
+QR_POOL_MIN_BATCH = 64
+
+
+class QRImageCache(object):
+    """Bounded, thread-safe LRU of rendered QR images keyed by content hash.
+
+    The cache lives at process level, so it is shared by every database
+    served by the worker; keys are content hashes, which makes that safe.
+    """
+
+    def __init__(self, maxsize=QR_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.store_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'memory_hits': self.hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.store_hits) / lookups if lookups else 0.0,
+            }
+
+
+qr_image_cache = QRImageCache()
+
+
+def qr_render_params(**params):
+    """Return the full, normalised set of rendering parameters"""
+    unknown = set(params) - set(QR_RENDER_DEFAULTS)
+    if unknown:
+        raise ValueError("Unknown QR rendering parameters: %s" % ', '.join(sorted(unknown)))
+    return dict(QR_RENDER_DEFAULTS, **params)
+
+
+def qr_cache_key(payload, params):
+    """Content hash of a payload and its rendering parameters"""
+    blob = json.dumps([payload, sorted(params.items())], ensure_ascii=False)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def _png_chunk(tag, data):
+    chunk = tag + data
+    return struct.pack('>I', len(data)) + chunk + struct.pack('>I', zlib.crc32(chunk) & 0xffffffff)
+
+
+def encode_png_matrix(matrix, box_size):
+    """Encode a QR module matrix as a 1-bit grayscale PNG without PIL"""
+    size = len(matrix) * box_size
+    padding = '0' * (-size % 8)
+    raw = bytearray()
+    for row in matrix:
+        bits = ''.join(('0' if cell else '1') * box_size for cell in row) + padding
+        scanline = b'\x00' + int(bits, 2).to_bytes(len(bits) // 8, 'big')
+        raw += scanline * box_size
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 1, 0, 0, 0, 0)),
+        _png_chunk(b'IDAT', zlib.compress(bytes(raw))),
+        _png_chunk(b'IEND', b''),
+    ])
+
+
+def encode_svg_matrix(matrix, params):
+    """Encode a QR module matrix as an SVG document, one path run per row"""
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                path.append('M%d %dh%dv1h-%dz' % (start, y, x - start, x - start))
+            else:
+                x += 1
+    pixels = size * params['box_size']
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" viewBox="0 0 %d %d" '
+        'shape-rendering="crispEdges"><rect width="%d" height="%d" fill="%s"/>'
+        '<path d="%s" fill="%s"/></svg>' % (
+            pixels, pixels, size, size, size, size, params['back_color'],
+            ''.join(path), params['fill_color'],
+        )
+    ).encode('utf-8')
+
+
+def render_qr_image(payload, params):
+    """Render ``payload`` and return the raw image bytes"""
+    import qrcode
+    from qrcode import constants
+
+    qr = qrcode.QRCode(
+        version=params['version'],
+        error_correction=getattr(constants, 'ERROR_CORRECT_%s' % params['error_correction']),
+        box_size=params['box_size'],
+        border=params['border'],
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    if params['image_format'] == 'svg':
+        return encode_svg_matrix(qr.get_matrix(), params)
+    if params['image_format'] == 'png' and (params['fill_color'], params['back_color']) == ('black', 'white'):
+        return encode_png_matrix(qr.get_matrix(), params['box_size'])
+
+    img = qr.make_image(fill_color=params['fill_color'], back_color=params['back_color'])
+
+    buffer = io.BytesIO()
+    img.save(buffer, format=params['image_format'].upper())
+    return buffer.getvalue()
+
+
+def _render_qr_b64(item):
+    payload, params = item
+    return base64.b64encode(render_qr_image(payload, params))
+
+
+def render_qr_images(payloads, params, workers=0):
+    """Render several payloads, in a process pool when ``workers`` > 1"""
+    items = [(payload, params) for payload in payloads]
+    if workers > 1 and len(items) >= QR_POOL_MIN_BATCH:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(items) // (workers * 4))
+            return list(executor.map(_render_qr_b64, items, chunksize=chunksize))
+    return [_render_qr_b64(item) for item in items]
+
+
 class QRCodeGenerator(models.AbstractModel):
     _name = 'qr.code.generator'
     _description = 'QR Code Generator'
 
-    qr_code = fields.Binary(string='QR Code', compute='_generate_qr_code', store=True)
+    # Campos cuyo cambio invalida el código QR en los modelos que heredan el mixin
+    _qr_trigger_fields = ('name',)
 
-    @api.depends('name')
-    def _generate_qr_code(self):
+    qr_code_key = fields.Char(string='QR Code Key', readonly=True, copy=False,
+                              help="Content hash of the current QR image in the shared image store")
+    qr_code = fields.Binary(string='QR Code', compute='_compute_qr_code')
+
+    def init(self):
+        super().init()
+        # El almacén de imágenes se consulta por nombre, que ir.attachment no indexa
+        tools.create_index(self._cr, 'ir_attachment_qr_code_name_index', 'ir_attachment', ['name'],
+                           where="res_model = '%s'" % QR_ATTACHMENT_MODEL)
+
+    @api.depends('qr_code_key')
+    def _compute_qr_code(self):
+        """Read the images from the shared store, where each one is kept once
+        whatever the number of records showing it. In ``lazy`` mode records
+        without a current image are rendered on demand."""
+        params = qr_render_params()
+        images = self._load_qr_images({record.qr_code_key for record in self if record.qr_code_key}, params)
+        pending = self.filtered(lambda record: not record.qr_code_key)
+        rendered = {}
+        if pending and self._qr_code_mode() == 'lazy':
+            rendered = self._render_qr_codes([self._get_qr_data(record) for record in pending])
         for record in self:
-            try:
-                import qrcode
-                from qrcode import constants
-
-                qr_data = self._get_qr_data(record)
-                if qr_data:
-                    qr = qrcode.QRCode(
-                        version=1,
-                        error_correction=constants.ERROR_CORRECT_L,
-                        box_size=10,
-                        border=4,
-                    )
-                    qr.add_data(qr_data)
-                    qr.make(fit=True)
-
-                    img = qr.make_image(fill_color=_("black"), back_color=_("white"))
-
-                    # Convert to base64
-                    buffer = io.BytesIO()
-                    img.save(buffer, format=_("PNG"))
-                    img_str = base64.b64encode(buffer.getvalue())
-
-                    record.qr_code = img_str
-                else:
-                    record.qr_code = False
-            except ImportError:
-                _logger.warning("qrcode library not found. Please install it: pip install qrcode[pil]")
-                record.qr_code = False
-            except Exception as e:
-                _logger.error("Error generating QR code: %s", str(e))
-                record.qr_code = False
+            if record.qr_code_key:
+                record.qr_code = images.get(record.qr_code_key, False)
+            else:
+                record.qr_code = rendered.get(self._get_qr_data(record), False)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._refresh_qr_codes()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if any(fname in vals for fname in self._qr_trigger_fields):
+            self._refresh_qr_codes()
+        return res
+
+    def _refresh_qr_codes(self):
+        """Bring ``qr_code`` up to date according to ``modulo.qr_code_mode``.
+
+        In ``async`` mode the records are only queued, and keep their current
+        image until the queue cron renders the new one. In ``lazy`` mode the
+        current image is dropped, so the next read renders the new one.
+        """
+        mode = self._qr_code_mode()
+        if not self:
+            return
+        if mode == 'lazy':
+            self.filtered('qr_code_key').qr_code_key = False
+            self.invalidate_recordset(['qr_code'])
+        elif mode == 'async':
+            self.env['qr.code.queue']._enqueue(self)
+        else:
+            self._generate_qr_code()
+
+    def _generate_qr_code(self):
+        params = qr_render_params()
+        payloads = [self._get_qr_data(record) for record in self]
+        images = self._render_qr_codes(payloads)
+        for record, qr_data in zip(self, payloads):
+            record.qr_code_key = qr_cache_key(qr_data, params) if qr_data in images else False
 
     def _get_qr_data(self, record):
         """Override this method to provide QR data for specific models"""
         return None
+
+    @api.model
+    def _render_qr_code(self, payload, **params):
+        """Return the base64 encoded QR image for ``payload``"""
+        return self._render_qr_codes([payload], **params).get(payload, False)
+
+    @api.model
+    def _render_qr_codes(self, payloads, **params):
+        """Return a ``{payload: base64 image}`` dict for ``payloads``.
+
+        Payloads are deduplicated and looked up by content hash, first in the
+        in-memory LRU and then in the attachment store with a single query;
+        only the remaining misses are rendered, in one batch.
+        """
+        params = qr_render_params(**params)
+        keys = {payload: qr_cache_key(payload, params) for payload in set(payloads) if payload}
+        images = {}
+
+        stored = self._load_qr_images(set(keys.values()), params)
+        for payload, key in list(keys.items()):
+            if key in stored:
+                images[payload] = stored[key]
+                del keys[payload]
+        if not keys:
+            return images
+
+        missing = list(keys)
+        try:
+            rendered = render_qr_images(missing, params, workers=self._qr_render_workers())
+        except ImportError:
+            _logger.warning("qrcode library not found. Please install it: pip install qrcode[pil]")
+            return images
+        except Exception as e:
+            _logger.error("Error generating QR code: %s", str(e))
+            return images
+
+        vals_list = []
+        for payload, img_str in zip(missing, rendered):
+            qr_image_cache.count('misses')
+            qr_image_cache.put(keys[payload], img_str)
+            images[payload] = img_str
+            vals_list.append({
+                'name': self._qr_attachment_name(keys[payload], params),
+                'res_model': QR_ATTACHMENT_MODEL,
+                'datas': img_str,
+            })
+        self.env['ir.attachment'].sudo().create(vals_list)
+        return images
+
+    @api.model
+    def _load_qr_images(self, keys, params):
+        """Return a ``{key: base64 image}`` dict of the images of ``keys``
+        found in the in-memory LRU or, with one query, in the attachment store"""
+        images = {}
+        names = {}
+        for key in keys:
+            cached = qr_image_cache.get(key)
+            if cached is not None:
+                images[key] = cached
+            else:
+                names[self._qr_attachment_name(key, params)] = key
+        if names:
+            for stored in self.env['ir.attachment'].sudo().search([
+                ('res_model', '=', QR_ATTACHMENT_MODEL),
+                ('name', 'in', list(names)),
+            ]):
+                key = names.pop(stored.name, None)
+                if key is not None:
+                    qr_image_cache.count('store_hits')
+                    qr_image_cache.put(key, stored.datas)
+                    images[key] = stored.datas
+        return images
+
+    @api.model
+    def _qr_cache_key(self, payload, **params):
+        """Content hash identifying the image of ``payload``, usable as ETag"""
+        return qr_cache_key(payload, qr_render_params(**params))
+
+    @api.model
+    def _qr_code_mode(self):
+        """``stored`` renders QR codes on write, ``async`` through the render
+        queue and ``lazy`` only when the image is requested"""
+        return self.env['ir.config_parameter'].sudo().get_param('modulo.qr_code_mode', 'stored')
+
+    @api.model
+    def _qr_render_workers(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param('modulo.qr_render_workers', 0))
+
+    @api.model
+    def _qr_attachment_name(self, key, params):
+        return 'qr_%s.%s' % (key, params['image_format'])
+
+    @api.model
+    def get_qr_cache_stats(self):
+        """Hit/miss counters of the QR image cache for the current process"""
+        return qr_image_cache.stats()
@@ -0,0 +1,72 @@
+from odoo import models, fields, api
+from collections import defaultdict
+import logging
+import threading
+
+_logger = logging.getLogger(__name__)
+
+class QRCodeQueue(models.Model):
+    _name = 'qr.code.queue'
+    _description = 'QR Code Rendering Queue'
+    _order = 'id'
+
+    res_model = fields.Char(string='Model', required=True, index=True)
+    res_id = fields.Integer(string='Record ID', required=True)
+
+    _sql_constraints = [
+        ('record_uniq', 'unique(res_model, res_id)', 'A record can only be queued once.'),
+    ]
+
+    @api.model
+    def _enqueue(self, records):
+        """Queue ``records`` for QR (re)rendering in a single statement.
+
+        Already queued records are touched rather than skipped, so a job that
+        is being processed concurrently is re-created once that batch commits.
+        """
+        if not records:
+            return
+        self.env.cr.execute("""
+            INSERT INTO qr_code_queue (res_model, res_id, create_uid, create_date, write_uid, write_date)
+            SELECT %(model)s, unnest(%(ids)s), %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+            ON CONFLICT (res_model, res_id) DO UPDATE SET write_date = EXCLUDED.write_date
+        """, {'model': records._name, 'ids': records.ids, 'uid': self.env.uid})
+
+    @api.model
+    def _process_queue(self, batch_size=None):
+        """Render queued QR codes, committing after every batch.
+
+        Rows are claimed with ``SKIP LOCKED`` so several workers can drain the
+        queue in parallel; rendering itself honours ``modulo.qr_render_workers``.
+        """
+        if batch_size is None:
+            batch_size = int(self.env['ir.config_parameter'].sudo().get_param('modulo.qr_queue_batch_size', 500))
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+
+        processed = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id, res_model, res_id FROM qr_code_queue
+                ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+            """, (batch_size,))
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+
+            ids_by_model = defaultdict(list)
+            for _job_id, res_model, res_id in rows:
+                ids_by_model[res_model].append(res_id)
+            for res_model, res_ids in ids_by_model.items():
+                if res_model not in self.env:
+                    _logger.warning("Dropping QR jobs for unknown model %s", res_model)
+                    continue
+                self.env[res_model].sudo().browse(res_ids).exists()._generate_qr_code()
+
+            self.env.cr.execute("DELETE FROM qr_code_queue WHERE id IN %s", (tuple(row[0] for row in rows),))
+            processed += len(rows)
+            if auto_commit:
+                self.env.cr.commit()
+
+        if processed:
+            _logger.info("Rendered %s queued QR codes", processed)
+        return processed
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import split_every
+
+# Filas del historial por página impresa
+HISTORY_PAGE_SIZE = 40
+
+
+class ReportEquipmentHistory(models.AbstractModel):
+    _name = 'report.modulo.report_equipment_history_document'
+    _description = 'Equipment History Report'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        """Values of the history report of many equipment units.
+
+        Statistics come from one GROUP BY over the orders of all the units
+        and the history rows from one query returning plain values, so no
+        service order is loaded in the ORM cache whatever the batch size.
+        Each unit's history is split in pages of ``HISTORY_PAGE_SIZE`` rows.
+        """
+        docs = self.env['service.equipment'].browse(docids)
+        ServiceOrder = self.env['service.order']
+        ServiceOrder.flush_model(['equipment_id', 'name', 'date_requested', 'service_type_id',
+                                  'technician_id', 'state', 'duration'])
+        self.env['service.type'].flush_model(['name'])
+        self.env['hr.employee'].flush_model(['name'])
+        states = dict(ServiceOrder._fields['state']._description_selection(self.env))
+
+        self.env.cr.execute("""
+            SELECT equipment_id,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE state = 'completed'),
+                   AVG(duration) FILTER (WHERE duration > 0),
+                   (ARRAY_AGG(state ORDER BY date_requested DESC, id DESC))[1]
+              FROM service_order
+             WHERE equipment_id = ANY(%s)
+          GROUP BY equipment_id
+        """, (docs.ids,))
+        stats = {
+            equipment_id: {
+                'order_count': order_count,
+                'completed_count': completed_count,
+                'average_duration': round(average_duration or 0.0, 2),
+                'last_state': states.get(last_state, last_state),
+            }
+            for equipment_id, order_count, completed_count, average_duration, last_state in self.env.cr.fetchall()
+        }
+
+        self.env.cr.execute("""
+            SELECT so.equipment_id, so.name, so.date_requested, st.name, emp.name, so.state, so.duration
+              FROM service_order so
+         LEFT JOIN service_type st ON st.id = so.service_type_id
+         LEFT JOIN hr_employee emp ON emp.id = so.technician_id
+             WHERE so.equipment_id = ANY(%s)
+          ORDER BY so.equipment_id, so.date_requested DESC, so.id DESC
+        """, (docs.ids,))
+        history = {equipment_id: [] for equipment_id in docs.ids}
+        for equipment_id, name, date_requested, service_type, technician, state, duration in self.env.cr.fetchall():
+            history[equipment_id].append({
+                'name': name,
+                'date_requested': date_requested,
+                'service_type': service_type or '',
+                'technician': technician or '',
+                'state': state,
+                'state_label': states.get(state, state),
+                'duration': duration or 0.0,
+            })
+
+        empty = {'order_count': 0, 'completed_count': 0, 'average_duration': 0.0, 'last_state': ''}
+        return {
+            'doc_ids': docs.ids,
+            'doc_model': 'service.equipment',
+            'docs': docs,
+            'today': fields.Date.context_today(self),
+            'stats': {equipment_id: stats.get(equipment_id, empty) for equipment_id in docs.ids},
+            'history_pages': {
+                equipment_id: [list(page) for page in split_every(HISTORY_PAGE_SIZE, rows)]
+                for equipment_id, rows in history.items()
+            },
+        }
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from dateutil.relativedelta import relativedelta
+
+# Órdenes recientes listadas por técnico en el reporte
+RECENT_ORDERS_LIMIT = 20
+# Umbrales (%) para las fortalezas y áreas de mejora
+GOOD_RATE = 90.0
+POOR_RATE = 70.0
+
+
+class ReportTechnicianPerformance(models.AbstractModel):
+    _name = 'report.modulo.report_technician_performance_document'
+    _description = 'Technician Performance Report'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        """Values of the performance report of many technicians.
+
+        Figures come from the daily KPI lines and the capacity lines, each
+        read with one grouped query for all the technicians, so the cost does
+        not grow with the number of orders in the period. The period is
+        ``data['start_date']`` to ``data['end_date']``, the last twelve
+        months by default.
+        """
+        data = data or {}
+        docs = self.env['hr.employee'].browse(docids)
+        end_date = fields.Date.to_date(data.get('end_date')) or fields.Date.context_today(self)
+        start_date = fields.Date.to_date(data.get('start_date')) or end_date - relativedelta(years=1) + relativedelta(days=1)
+
+        kpis = self.env['service.technician.kpi'].get_kpis(docs, start_date, end_date)
+        utilization = self.env['service.technician.capacity'].get_utilization(docs, start_date, end_date)
+        recent_orders = self._get_recent_orders(docs, start_date, end_date)
+        return {
+            'doc_ids': docs.ids,
+            'doc_model': 'hr.employee',
+            'docs': docs,
+            'start_date': start_date,
+            'end_date': end_date,
+            'performance': {
+                doc.id: self._get_technician_values(kpis[doc.id], utilization.get(doc.id, {}), recent_orders[doc.id])
+                for doc in docs
+            },
+        }
+
+    @api.model
+    def _get_recent_orders(self, technicians, date_from, date_to):
+        """Latest completed orders of every technician, ``RECENT_ORDERS_LIMIT``
+        each, with one query"""
+        self.env['service.order'].flush_model(['technician_id', 'state', 'date_completed'])
+        self.env.cr.execute("""
+            SELECT technician_id, id
+              FROM (SELECT technician_id, id,
+                           ROW_NUMBER() OVER (PARTITION BY technician_id ORDER BY date_completed DESC, id DESC) AS position
+                      FROM service_order
+                     WHERE technician_id = ANY(%s)
+                       AND state = 'completed'
+                       AND date_completed >= %s AND date_completed < %s) AS ranked
+             WHERE position <= %s
+          ORDER BY technician_id, position
+        """, (technicians.ids, date_from, date_to + relativedelta(days=1), RECENT_ORDERS_LIMIT))
+        rows = self.env.cr.fetchall()
+        # Un solo browse para que la plantilla lea todas las órdenes en bloque
+        orders = self.env['service.order'].browse([order_id for _technician_id, order_id in rows])
+        recent = {technician_id: orders.browse() for technician_id in technicians.ids}
+        for (technician_id, _order_id), order in zip(rows, orders):
+            recent[technician_id] |= order
+        return recent
+
+    @api.model
+    def _get_technician_values(self, kpi_by_type, utilization, orders):
+        def rate(part, total):
+            return round(100.0 * part / total, 1) if total else 0.0
+
+        completed = sum(kpi['completed_count'] for kpi in kpi_by_type.values())
+        duration = sum(kpi['total_duration'] for kpi in kpi_by_type.values())
+        planned = sum(kpi['planned_count'] for kpi in kpi_by_type.values())
+        on_time = sum(kpi['on_time_count'] for kpi in kpi_by_type.values())
+        repeat_calls = sum(kpi['repeat_count'] for kpi in kpi_by_type.values())
+
+        values = {
+            'completed_orders_count': completed,
+            'avg_completion_time': round(duration / completed, 2) if completed else 0.0,
+            'first_time_fix_rate': rate(completed - repeat_calls, completed),
+            'repeat_calls': repeat_calls,
+            'on_time_completion_rate': rate(on_time, planned),
+            'revenue_generated': round(sum(kpi['revenue'] for kpi in kpi_by_type.values()), 2),
+            'utilization_rate': utilization.get('utilization_rate', 0.0),
+            'orders_per_day': utilization.get('orders_per_day', 0.0),
+            'service_type_stats': [],
+            'service_type_performance': [],
+            'service_orders': orders,
+        }
+        for service_type, kpi in sorted(kpi_by_type.items(), key=lambda item: -item[1]['completed_count']):
+            values['service_type_stats'].append({
+                'name': service_type.name,
+                'count': kpi['completed_count'],
+                'percentage': rate(kpi['completed_count'], completed),
+            })
+            values['service_type_performance'].append({
+                'name': service_type.name,
+                'avg_time': round(kpi['total_duration'] / kpi['completed_count'], 2) if kpi['completed_count'] else 0.0,
+                'first_time_fix_rate': rate(kpi['completed_count'] - kpi['repeat_count'], kpi['completed_count']),
+            })
+        values.update(self._get_assessment(values))
+        return values
+
+    @api.model
+    def _get_assessment(self, values):
+        strengths, improvements = [], []
+        if not values['completed_orders_count']:
+            return {
+                'strengths': strengths,
+                'improvements': improvements,
+                'overall_assessment': _("No completed service orders in the period."),
+            }
+        for key, label in (('first_time_fix_rate', _("First time fix")),
+                           ('on_time_completion_rate', _("On-time completion"))):
+            if values[key] >= GOOD_RATE:
+                strengths.append(_("%(metric)s rate of %(rate)s%%", metric=label, rate=values[key]))
+            elif values[key] < POOR_RATE:
+                improvements.append(_("%(metric)s rate of %(rate)s%%", metric=label, rate=values[key]))
+        if len(improvements) > len(strengths):
+            overall = _("Performance below target in the period.")
+        elif strengths and not improvements:
+            overall = _("Performance above target in the period.")
+        else:
+            overall = _("Performance within target in the period.")
+        return {'strengths': strengths, 'improvements': improvements, 'overall_assessment': overall}
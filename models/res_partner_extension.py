@@ -22,16 +22,15 @@ class ResPartner(models.Model):
     equipment_count = fields.Integer(compute='_compute_equipment_count', string='Equipment')
 
     def _compute_service_order_count(self):
+        # Un solo conteo agrupado para todo el recordset
+        counts = dict(self.env['service.order']._read_group([('partner_id', 'in', self.ids)], ['partner_id'], ['__count']))
         for partner in self:
-            partner.service_order_count = self.env['service.order'].search_count([
-                ('partner_id', '=', partner.id)
-            ])
+            partner.service_order_count = counts.get(partner, 0)
 
     def _compute_equipment_count(self):
+        counts = dict(self.env['service.equipment']._read_group([('partner_id', 'in', self.ids)], ['partner_id'], ['__count']))
         for partner in self:
-            partner.equipment_count = self.env['service.equipment'].search_count([
-                ('partner_id', '=', partner.id)
-            ])
+            partner.equipment_count = counts.get(partner, 0)
 
     def action_view_service_orders(self):
         self.ensure_one()
@@ -59,3 +58,12 @@ class ResPartner(models.Model):
                 if not vals.get('service_email'):
                     partner.service_email = partner.email
         return partners
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            # El nombre del cliente forma parte del contenido de los códigos QR
+            for model in ('service.order', 'service.equipment'):
+                if 'partner_id' in self.env[model]._qr_trigger_fields:
+                    self.env[model].sudo().search([('partner_id', 'in', self.ids)])._refresh_qr_codes()
+        return res
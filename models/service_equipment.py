@@ -1,5 +1,8 @@
 from odoo import models, fields, api, _
+from odoo.tools import groupby
+from collections import defaultdict
 from datetime import datetime, timedelta
+from markupsafe import Markup
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -7,8 +10,9 @@ _logger = logging.getLogger(__name__)
 class ServiceEquipment(models.Model):
     _name = 'service.equipment'
     _description = 'Service Equipment'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'qr.code.generator']
     _order = 'name'
+    _qr_trigger_fields = ('name', 'serial_number', 'partner_id')
 
     name = fields.Char(string='Equipment Name', required=True, tracking=True)
     serial_number = fields.Char(string='Serial Number', tracking=True)
@@ -17,6 +21,8 @@ class ServiceEquipment(models.Model):
     purchase_date = fields.Date(string='Purchase Date')
     warranty_start = fields.Date(string='Warranty Start')
     warranty_end = fields.Date(string='Warranty End')
+    warranty_notified_end = fields.Date(string='Warranty Expiration Notified', readonly=True, copy=False,
+                                        help="Warranty end date the owner was last notified about")
     partner_id = fields.Many2one('res.partner', string='Owner', required=True, tracking=True)
     location = fields.Char(string='Location')
     notes = fields.Text(string='Notes')
@@ -25,49 +31,24 @@ class ServiceEquipment(models.Model):
     last_service_date = fields.Datetime(string='Last Service Date')
     next_service_date = fields.Datetime(string='Next Service Date')
     service_interval = fields.Integer(string='Service Interval (days)', default=365)
-    qr_code = fields.Binary(string='QR Code', compute='_generate_qr_code', store=True)
 
     @api.model_create_multi
     def create(self, vals_list):
-        records = super(ServiceEquipment, self).create(vals_list)
-        for equipment, vals in zip(records, vals_list):
+        # Calcular la próxima fecha de servicio antes de crear, en el mismo INSERT
+        now = fields.Datetime.now()
+        for vals in vals_list:
             if vals.get('service_interval'):
-                next_service = fields.Datetime.now() + timedelta(days=vals.get('service_interval'))
-                equipment.write({'next_service_date': next_service})
-        return records
-
-    @api.depends('name', 'serial_number', 'partner_id')
-    def _generate_qr_code(self):
-        for equipment in self:
-            try:
-                import qrcode
-                from qrcode import constants
-                import io
-                import base64
-
-                qr_data = f"{equipment.name}|{equipment.serial_number}|{equipment.partner_id.name}"
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=constants.ERROR_CORRECT_L,
-                    box_size=10,
-                    border=4,
-                )
-                qr.add_data(qr_data)
-                qr.make(fit=True)
-
-                img = qr.make_image(fill_color="black", back_color="white")
-
-                buffer = io.BytesIO()
-                img.save(buffer, format="PNG")
-                img_str = base64.b64encode(buffer.getvalue())
-
-                equipment.qr_code = img_str
-            except ImportError:
-                _logger.warning("qrcode library not found. Please install it: pip install qrcode[pil]")
-                equipment.qr_code = False
-            except Exception as e:
-                _logger.error("Error generating QR code: %s", str(e))
-                equipment.qr_code = False
+                vals['next_service_date'] = now + timedelta(days=vals['service_interval'])
+        return super(ServiceEquipment, self).create(vals_list)
+
+    def write(self, vals):
+        if 'warranty_end' in vals and 'warranty_notified_end' not in vals:
+            # Una garantía nueva o prorrogada se vuelve a notificar
+            vals = dict(vals, warranty_notified_end=False)
+        return super().write(vals)
+
+    def _get_qr_data(self, record):
+        return f"{record.name}|{record.serial_number}|{record.partner_id.name}"
 
     def action_schedule_service(self):
         self.ensure_one()
@@ -97,28 +78,56 @@ class ServiceEquipment(models.Model):
         self.ensure_one()
         return self.env.ref('modulo.action_report_equipment_history').report_action(self)
 
+    @api.model
     def _check_warranty_expiration(self):
-        """Check for equipment with expiring warranty"""
+        """Notify owners of equipment whose warranty expires within 30 days.
+
+        Each owner gets a single digest mail listing all their expiring units
+        (rendered for every owner in one batch) and a single activity for
+        their salesperson. Notified equipment is marked with the warranty end
+        it was notified for, so the next runs skip it.
+        """
         today = fields.Date.today()
         warning_date = today + timedelta(days=30)  # Warn 30 days before expiration
 
         expiring_equipment = self.search([
             ('warranty_end', '<=', warning_date),
             ('warranty_end', '>=', today),
+            ('warranty_notified_end', '=', False),
             ('active', '=', True)
-        ])
+        ], order='partner_id, warranty_end, name')
+        if not expiring_equipment:
+            return 0
 
+        equipment_by_partner = defaultdict(list)
         for equipment in expiring_equipment:
-            if equipment.partner_id.email:
-                template = self.env.ref('modulo.email_template_warranty_expiration')
-                if template:
-                    template.send_mail(equipment.id)
-
-            self.env['mail.activity'].create({
-                'res_id': equipment.id,
-                'res_model_id': self.env['ir.model']._get('service.equipment').id,
-                'activity_type_id': self.env.ref('mail.mail_activity_data_todo').id,
-                'summary': 'Warranty expiration notification',
-                'note': f'The warranty for {equipment.name} will expire on {equipment.warranty_end}',
-                'user_id': self.env.user.id,
+            equipment_by_partner[equipment.partner_id.id].append({
+                'name': equipment.name,
+                'serial_number': equipment.serial_number or '',
+                'warranty_end': fields.Date.to_string(equipment.warranty_end),
             })
+
+        partners = expiring_equipment.partner_id
+        template = self.env.ref('modulo.email_template_warranty_expiration_digest', raise_if_not_found=False)
+        to_email = partners.filtered('email')
+        if template and to_email:
+            template.with_context(warranty_equipment=equipment_by_partner).send_mail_batch(to_email.ids)
+
+        activity_type = self.env.ref('mail.mail_activity_data_todo', raise_if_not_found=False)
+        res_model_id = self.env['ir.model']._get_id('res.partner')
+        self.env['mail.activity'].create([{
+            'res_id': partner.id,
+            'res_model_id': res_model_id,
+            'activity_type_id': activity_type.id if activity_type else False,
+            'summary': _('Warranty expiration: %s units', len(equipment_by_partner[partner.id])),
+            'note': Markup('<ul>%s</ul>') % Markup().join(
+                Markup('<li>%s</li>') % _('%(name)s expires on %(warranty_end)s', **line)
+                for line in equipment_by_partner[partner.id]
+            ),
+            'user_id': partner.user_id.id or self.env.user.id,
+        } for partner in partners])
+
+        # Marcar lo notificado: una escritura por fecha de fin de garantía
+        for warranty_end, equipment in groupby(expiring_equipment, key=lambda e: e.warranty_end):
+            self.concat(*equipment).write({'warranty_notified_end': warranty_end})
+        return len(expiring_equipment)
@@ -1,22 +1,46 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError
+from odoo.tools import groupby, split_every
+from odoo.tools.misc import hmac as hmac_tool
+from .service_order_reminder import REMINDER_LEAD_TIMES
+from .service_technician_capacity import CAPACITY_TRIGGER_FIELDS
+from .service_technician_kpi import KPI_TRIGGER_FIELDS, REPEAT_CALL_DAYS
 from datetime import datetime, timedelta
+from psycopg2.extras import execute_values
+import hmac
 import logging
+import threading
 
 _logger = logging.getLogger(__name__)
 
+# Longitud (caracteres hex) de la firma de los tokens QR de las órdenes
+QR_TOKEN_SIGNATURE_LENGTH = 16
+# Órdenes recordadas por transacción en la tarea de recordatorios
+REMINDER_BATCH_SIZE = 500
+# Campos relacionales aceptados por la API de creación -> modelo referenciado
+API_ORDER_RELATIONS = {
+    'partner_id': 'res.partner',
+    'service_type_id': 'service.type',
+    'equipment_id': 'service.equipment',
+    'technician_id': 'hr.employee',
+}
+
 class ServiceOrder(models.Model):
     _name = 'service.order'
     _description = 'Service Order'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'qr.code.generator']
     _order = 'date_requested desc'
+    # El token QR solo depende del id de la orden
+    _qr_trigger_fields = ()
 
-    name = fields.Char(string='Order Reference', required=True, copy=False, readonly=True, default=lambda self: _('New'))
+    name = fields.Char(string='Order Reference', required=True, copy=False, readonly=True, index=True, default=lambda self: _('New'))
     partner_id = fields.Many2one('res.partner', string='Customer', required=True, tracking=True)
     service_type_id = fields.Many2one('service.type', string='Service Type', required=True, tracking=True)
     equipment_id = fields.Many2one('service.equipment', string='Equipment', tracking=True)
     technician_id = fields.Many2one('hr.employee', string='Technician', tracking=True)
     date_requested = fields.Datetime(string='Requested Date', default=fields.Datetime.now, required=True)
     date_scheduled = fields.Datetime(string='Scheduled Date')
+    date_scheduled_end = fields.Datetime(string='Scheduled End', compute='_compute_date_scheduled_end', store=True)
     date_started = fields.Datetime(string='Start Date')
     date_completed = fields.Datetime(string='Completion Date')
     description = fields.Text(string='Description')
@@ -38,17 +62,356 @@ class ServiceOrder(models.Model):
     invoice_id = fields.Many2one('account.move', string='Invoice')
     is_invoiced = fields.Boolean(string='Invoiced', default=False)
     duration = fields.Float(string='Duration (hours)', compute='_compute_duration', store=True)
-    qr_code = fields.Binary(string='QR Code', compute='_generate_qr_code', store=True)
+    service_price = fields.Float(string='Service Price', readonly=True, copy=False,
+                                 help="Price of the service type's product when the order was completed, "
+                                      "used for its invoice and the technician KPIs")
+    reminder_ids = fields.One2many('service.order.reminder', 'order_id', string='Reminders Sent')
+
+    def init(self):
+        super().init()
+        # Feed de cambios incremental (/api/service-order/changes): cada escritura guarda el id
+        # de su transacción, que el feed compara con las transacciones aún en curso
+        self._cr.execute("""
+            ALTER TABLE service_order ADD COLUMN IF NOT EXISTS change_txid bigint DEFAULT 0;
+            CREATE OR REPLACE FUNCTION service_order_set_change_txid() RETURNS trigger AS $$
+            BEGIN
+                NEW.change_txid := txid_current();
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            DROP TRIGGER IF EXISTS service_order_change_txid ON service_order;
+            CREATE TRIGGER service_order_change_txid BEFORE INSERT OR UPDATE ON service_order
+                FOR EACH ROW EXECUTE PROCEDURE service_order_set_change_txid();
+        """)
+        tools.create_index(self._cr, 'service_order_change_txid_id_index', self._table, ['change_txid', 'id'])
+        # Índices para las consultas de solapamiento por técnico y por equipo
+        tools.create_index(self._cr, 'service_order_technician_schedule_index', self._table,
+                           ['technician_id', 'date_scheduled', 'date_scheduled_end'])
+        tools.create_index(self._cr, 'service_order_equipment_schedule_index', self._table,
+                           ['equipment_id', 'date_scheduled', 'date_scheduled_end'])
 
     @api.model_create_multi
     def create(self, vals_list):
-        # Asignar número de secuencia para cada registro si aún no lo tiene
+        # Asignar número de secuencia a los registros que aún no lo tienen, reservando un solo bloque
+        pending = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        if pending:
+            for vals, name in zip(pending, self._reserve_order_names(len(pending))):
+                vals['name'] = name
         for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                vals['name'] = self.env['ir.sequence'].next_by_code('service.order') or _('New')
+            # Las órdenes creadas ya completadas congelan también su precio
+            if vals.get('state') == 'completed' and 'service_price' not in vals and vals.get('service_type_id'):
+                vals['service_price'] = self.env['service.type'].browse(vals['service_type_id']).product_id.lst_price
         records = super(ServiceOrder, self).create(vals_list)
+        self.env['service.technician.capacity']._refresh(records._capacity_keys())
+        self.env['service.technician.kpi']._refresh(records._kpi_keys())
         return records
 
+    def write(self, vals):
+        if 'state' in vals and 'service_price' not in vals:
+            if vals['state'] != 'completed':
+                vals = dict(vals, service_price=0.0)
+            elif any(order.state != 'completed' for order in self):
+                # El precio se congela al completar la orden: un cambio posterior del precio
+                # de lista no altera su factura ni los indicadores
+                completing = self.filtered(lambda order: order.state != 'completed')
+                service_type = self.env['service.type'].browse(vals['service_type_id']) if vals.get('service_type_id') else None
+                for price, orders in groupby(
+                        completing, key=lambda order: (service_type or order.service_type_id).product_id.lst_price):
+                    self.concat(*orders).write(dict(vals, service_price=price))
+                if self - completing:
+                    (self - completing).write(vals)
+                return True
+        if 'date_scheduled' in vals:
+            # Una orden reprogramada vuelve a recibir sus recordatorios
+            self.env['service.order.reminder']._release(self.ids)
+        refresh_capacity = bool(CAPACITY_TRIGGER_FIELDS & set(vals))
+        refresh_kpi = bool(KPI_TRIGGER_FIELDS & set(vals))
+        if not refresh_capacity and not refresh_kpi:
+            return super().write(vals)
+        # Días afectados antes y después del cambio
+        keys = self._capacity_keys() if refresh_capacity else set()
+        kpi_keys = self._kpi_keys() if refresh_kpi else set()
+        res = super().write(vals)
+        if refresh_capacity:
+            self.env['service.technician.capacity']._refresh(keys | self._capacity_keys())
+        if refresh_kpi:
+            self.env['service.technician.kpi']._refresh(kpi_keys | self._kpi_keys())
+        return res
+
+    def unlink(self):
+        keys = self._capacity_keys()
+        kpi_keys = self._kpi_keys()
+        res = super().unlink()
+        self.env['service.technician.capacity']._refresh(keys)
+        self.env['service.technician.kpi']._refresh(kpi_keys)
+        return res
+
+    def _capacity_keys(self):
+        """``(technician_id, date)`` of the capacity lines the orders count in"""
+        return {
+            (order.technician_id.id, order.date_scheduled.date())
+            for order in self if order.technician_id and order.date_scheduled
+        }
+
+    def _kpi_keys(self, repeat_calls=True):
+        """``(technician_id, service_type_id, date)`` of the KPI lines the
+        orders count in.
+
+        With ``repeat_calls``, the lines of the earlier visits to the same
+        equipment the orders may be a repeat call of are included too, found
+        with one query.
+        """
+        keys = {
+            (order.technician_id.id, order.service_type_id.id, order.date_completed.date())
+            for order in self if order.state == 'completed' and order.technician_id and order.date_completed
+        }
+        requests = [(order.equipment_id.id, order.date_requested) for order in self
+                    if repeat_calls and order.equipment_id and order.date_requested]
+        if requests:
+            self.flush_model(['equipment_id', 'state', 'technician_id', 'service_type_id', 'date_completed'])
+            self.env.cr.execute("""
+                SELECT DISTINCT p.technician_id, p.service_type_id, p.date_completed::date
+                  FROM unnest(%s::int[], %s::timestamp[]) AS v(equipment_id, date_requested)
+                  JOIN service_order p ON p.equipment_id = v.equipment_id
+                 WHERE p.state = 'completed'
+                   AND p.technician_id IS NOT NULL
+                   AND p.date_completed < v.date_requested
+                   AND p.date_completed >= v.date_requested - %s * interval '1 day'
+            """, ([equipment_id for equipment_id, _date in requests],
+                  [date for _equipment_id, date in requests], REPEAT_CALL_DAYS))
+            keys.update(self.env.cr.fetchall())
+        return keys
+
+    @api.model
+    def _reserve_order_names(self, count):
+        """Allocate ``count`` references of the ``service.order`` sequence.
+
+        Instead of one ``next_by_code`` round trip (and ``ir_sequence`` row
+        lock) per order, the whole block is reserved with a single statement.
+        """
+        sequence = self.env['ir.sequence'].sudo().search([
+            ('code', '=', 'service.order'),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            _logger.warning("No ir.sequence has been found for code 'service.order'")
+            return [_('New')] * count
+        if sequence.use_date_range:
+            # Los rangos de fechas llevan su propio contador por rango
+            return [sequence._next() for _i in range(count)]
+
+        if sequence.implementation == 'standard':
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ('ir_sequence_%03d' % sequence.id, count),
+            )
+            numbers = sorted(row[0] for row in self.env.cr.fetchall())
+        else:
+            self.env.cr.execute("""
+                UPDATE ir_sequence SET number_next = number_next + number_increment * %s
+                WHERE id = %s RETURNING number_next
+            """, (count, sequence.id))
+            number_next = self.env.cr.fetchone()[0]
+            increment = sequence.number_increment
+            numbers = [number_next - increment * (count - i) for i in range(count)]
+            sequence.invalidate_recordset(['number_next', 'number_next_actual'])
+
+        return [sequence.get_next_char(number) for number in numbers]
+
+    @api.depends('date_scheduled', 'service_type_id.duration')
+    def _compute_date_scheduled_end(self):
+        for order in self:
+            if order.date_scheduled:
+                order.date_scheduled_end = order.date_scheduled + timedelta(hours=order._get_planned_duration())
+            else:
+                order.date_scheduled_end = False
+
+    def _get_planned_duration(self):
+        """Planned duration in hours, from the service type"""
+        self.ensure_one()
+        return self.service_type_id.duration or 2.0
+
+    def _bulk_write_values(self, fname, values_by_id):
+        """Write a different value of ``fname`` on every record in one UPDATE.
+
+        Only meant for untracked stored columns: the column is updated in SQL,
+        together with ``write_date`` and ``write_uid`` as ``write()`` would,
+        and the cache and dependent computed fields are then invalidated.
+        """
+        records = self.browse(list(values_by_id))
+        if not records:
+            return
+        if fname == 'date_scheduled':
+            # Igual que en write(): las órdenes que cambian de fecha vuelven a recibir sus recordatorios
+            self.env['service.order.reminder']._release(
+                [record.id for record in records if record.date_scheduled != values_by_id[record.id]])
+        keys = records._capacity_keys() if fname in CAPACITY_TRIGGER_FIELDS else set()
+        kpi_keys = records._kpi_keys() if fname in KPI_TRIGGER_FIELDS else set()
+        self.flush_model([fname, 'write_date', 'write_uid'])
+        # Tipo explícito: un lote de solo NULL o de fechas no depende de conversiones implícitas
+        column_type = self._fields[fname].column_type[1]
+        execute_values(self.env.cr._obj, f'''
+            UPDATE "{self._table}"
+               SET "{fname}" = v.value::{column_type},
+                   write_date = (now() at time zone 'UTC'),
+                   write_uid = {int(self.env.uid)}
+              FROM (VALUES %s) AS v(id, value)
+             WHERE "{self._table}".id = v.id
+        ''', list(values_by_id.items()))
+        records.invalidate_recordset([fname, 'write_date', 'write_uid'])
+        records.modified([fname])
+        if fname in CAPACITY_TRIGGER_FIELDS:
+            self.env['service.technician.capacity']._refresh(keys | records._capacity_keys())
+        if fname in KPI_TRIGGER_FIELDS:
+            self.env['service.technician.kpi']._refresh(kpi_keys | records._kpi_keys())
+
+    @api.model
+    def _get_changes(self, after=(0, 0), limit=200):
+        """Orders written after the ``(change_txid, id)`` position ``after``.
+
+        ``change_txid`` is the id of the last transaction that wrote the row,
+        set by a trigger on every INSERT and UPDATE, including the ones made in
+        SQL. Only rows of transactions older than every transaction still in
+        progress are returned: those are final, and no row can be committed
+        later with a smaller position, so the last one returned is a safe
+        cursor whatever the commit order of concurrent transactions.
+
+        :return: ``(orders, position of the last order or after)``
+        """
+        self.env.cr.execute("""
+            SELECT change_txid, id
+              FROM service_order
+             WHERE (change_txid, id) > (%s, %s)
+               AND change_txid < txid_snapshot_xmin(txid_current_snapshot())
+          ORDER BY change_txid, id
+             LIMIT %s
+        """, (after[0], after[1], limit))
+        rows = self.env.cr.fetchall()
+        return self.browse([order_id for _txid, order_id in rows]), rows[-1] if rows else tuple(after)
+
+    @api.model
+    def _get_change_version(self, domain):
+        """Version of the set of orders matching ``domain``.
+
+        The version hashes the ``(id, change_txid)`` pairs of the set, so any
+        committed write changes it, whatever ``write_date`` the writing
+        transaction stamped: a transaction that started earlier but commits
+        later than the previous read still yields a new version. The last
+        modification date is the ``write_date`` of the row written by the
+        latest transaction.
+
+        :return: ``(version, count, last_modified)``
+        """
+        self.flush_model(['write_date'])
+        self.env.cr.execute("""
+            SELECT md5(COALESCE(string_agg(id || ':' || change_txid, ',' ORDER BY id), '')),
+                   COUNT(*),
+                   (array_agg(write_date ORDER BY change_txid DESC, id DESC))[1]
+              FROM service_order
+             WHERE id = ANY(%s)
+        """, (self.search(domain).ids,))
+        return self.env.cr.fetchone()
+
+    @api.model
+    def _prepare_api_vals(self, data):
+        """Build create values from the data of an API call.
+
+        Returns a ``(vals, error)`` tuple, ``error`` being ``None`` when the
+        data is valid. Relational values must be integer ids; the optional
+        ones may also be empty.
+        """
+        if not isinstance(data, dict):
+            return None, _('Invalid order data')
+        for field in ('partner_id', 'service_type_id'):
+            if field not in data:
+                return None, _('Missing required field: %s') % field
+
+        vals = {
+            'description': data.get('description', ''),
+            'priority': data.get('priority', 'medium'),
+        }
+        for field in API_ORDER_RELATIONS:
+            if field not in data:
+                continue
+            value = data[field]
+            if field in ('equipment_id', 'technician_id') and value in (None, False):
+                continue
+            if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+                return None, _('Invalid value for field %s: %s') % (field, value)
+            vals[field] = value
+        return vals, None
+
+    @api.model
+    def _check_api_references(self, indexed_vals):
+        """Check the relational values of ``(index, vals)`` pairs with one
+        query per related model; returns ``{index: error}``"""
+        errors = {}
+        for field, model in API_ORDER_RELATIONS.items():
+            ids = {vals[field] for _index, vals in indexed_vals if field in vals}
+            existing = set(self.env[model].sudo().browse(ids).exists().ids)
+            for index, vals in indexed_vals:
+                if field in vals and vals[field] not in existing and index not in errors:
+                    errors[index] = _('Invalid value for field %s: %s') % (field, vals[field])
+        return errors
+
+    @api.model
+    def _create_api_batch(self, items, atomic=True):
+        """Create the orders of a batch API call with one ``create(vals_list)``.
+
+        Every item is validated up front. With ``atomic`` any invalid item
+        aborts the whole batch; otherwise valid items are created, falling
+        back to one creation per item if the batch fails, and invalid ones
+        are reported individually.
+
+        :return: ``{'success', 'created', 'results'}``, one result per item
+        """
+        results = [None] * len(items)
+        valid = []
+        for index, data in enumerate(items):
+            vals, error = self._prepare_api_vals(data)
+            if error:
+                results[index] = {'index': index, 'success': False, 'error': error}
+            else:
+                valid.append((index, vals))
+
+        for index, error in self._check_api_references(valid).items():
+            results[index] = {'index': index, 'success': False, 'error': error}
+        valid = [(index, vals) for index, vals in valid if results[index] is None]
+
+        if atomic and len(valid) < len(items):
+            return {'success': False, 'created': 0, 'results': [result for result in results if result]}
+
+        try:
+            with self.env.cr.savepoint():
+                created = list(zip(valid, self.create([vals for _index, vals in valid])))
+        except Exception as e:
+            if atomic:
+                raise
+            # Aislar los elementos que fallan en la creación
+            _logger.warning("Batch service order creation failed, retrying item by item: %s", str(e))
+            created = []
+            for index, vals in valid:
+                try:
+                    with self.env.cr.savepoint():
+                        created.append(((index, vals), self.create(vals)))
+                except Exception as item_error:
+                    results[index] = {'index': index, 'success': False, 'error': str(item_error)}
+
+        for (index, _vals), service_order in created:
+            results[index] = {
+                'index': index,
+                'success': True,
+                'id': service_order.id,
+                'name': service_order.name,
+                'state': service_order.state,
+            }
+        _logger.info("%s service orders created via batch API", len(created))
+        return {
+            'success': len(created) == len(items),
+            'created': len(created),
+            'results': results,
+        }
+
     @api.depends('date_started', 'date_completed')
     def _compute_duration(self):
         for order in self:
@@ -56,47 +419,34 @@ class ServiceOrder(models.Model):
                 delta = order.date_completed - order.date_started
                 order.duration = delta.total_seconds() / 3600
 
-    @api.depends('name', 'partner_id', 'date_requested')
-    def _generate_qr_code(self):
-        for order in self:
-            try:
-                import qrcode
-                from qrcode import constants
-                import io
-                import base64
-
-                qr_data = f"{order.name}|{order.partner_id.name}|{order.date_requested}"
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=constants.ERROR_CORRECT_L,
-                    box_size=10,
-                    border=4,
-                )
-                qr.add_data(qr_data)
-                qr.make(fit=True)
-
-                img = qr.make_image(fill_color="black", back_color="white")
-
-                buffer = io.BytesIO()
-                img.save(buffer, format="PNG")
-                img_str = base64.b64encode(buffer.getvalue())
-
-                order.qr_code = img_str
-            except ImportError:
-                _logger.warning("qrcode library not found. Please install it: pip install qrcode[pil]")
-                order.qr_code = False
-            except Exception as e:
-                _logger.error("Error generating QR code: %s", str(e))
-                order.qr_code = False
+    def _get_qr_data(self, record):
+        return record._get_qr_token()
+
+    def _get_qr_token(self):
+        """Compact signed token (``<id>.<signature>``) printed in the QR code"""
+        self.ensure_one()
+        return '%s.%s' % (self.id, self._sign_qr_token(self.id))
+
+    @api.model
+    def _sign_qr_token(self, order_id):
+        return hmac_tool(self.env(su=True), 'modulo.service_order_qr', order_id)[:QR_TOKEN_SIGNATURE_LENGTH]
+
+    @api.model
+    def _resolve_qr_token(self, token):
+        """Return the order id of a signed QR token, or ``None`` when the
+        token is malformed or its signature does not match"""
+        order_id, _sep, signature = token.partition('.')
+        if not order_id.isdigit() or len(signature) != QR_TOKEN_SIGNATURE_LENGTH:
+            return None
+        if not hmac.compare_digest(signature, self._sign_qr_token(int(order_id))):
+            return None
+        return int(order_id)
 
     def action_schedule(self):
-        for order in self:
-            if not order.technician_id:
-                self.env['hr.integration'].assign_technician_to_service_order(order)
-            if not order.date_scheduled:
-                self.env['hr.integration'].schedule_service_order(order)
-            else:
-                order.write({'state': 'scheduled'})
+        if any(order.state != 'draft' for order in self):
+            raise UserError(_("Only draft service orders can be scheduled."))
+        # Todas las órdenes del lote se asignan de una vez, repartiendo la carga entre los técnicos
+        self.env['service.order.scheduler'].schedule_orders(self)
         return True
 
     def action_start(self):
@@ -134,12 +484,16 @@ class ServiceOrder(models.Model):
             'context': {'default_order_id': self.id},
         }
 
-    def action_create_invoice(self):
-        for order in self:
-            if not order.is_invoiced:
-                self.env['account.integration'].create_invoice_from_service_order(order)
+    def action_create_invoice(self, grouping=None):
+        # Todas las facturas se crean de una vez; con ``grouping`` las órdenes de cada cliente
+        # comparten factura. Las órdenes ya facturadas se omiten
+        orders = self.filtered(lambda order: not order.is_invoiced)
+        self.env['account.integration'].create_invoices_from_service_orders(orders, grouping)
         return True
 
+    def action_create_grouped_invoice(self):
+        return self.action_create_invoice(grouping=('period',))
+
     def action_view_invoice(self):
         self.ensure_one()
         return {
@@ -157,28 +511,56 @@ class ServiceOrder(models.Model):
         self.ensure_one()
         return self.env.ref('modulo.action_report_service_certificate').report_action(self)
 
-    def _send_service_reminders(self):
-        today = fields.Datetime.now()
-        reminder_date = today + timedelta(days=1)
+    @api.model
+    def _send_service_reminders(self, batch_size=None, kind='day_before'):
+        """Remind customers and technicians of their upcoming orders.
 
+        Only scheduled orders entering the reminder window that have no
+        ``kind`` entry in the reminder ledger are selected, so the cron can
+        run often and never notifies an order twice. Orders are handled in
+        chunks: each chunk is claimed in the ledger, the template is
+        rendered once for it, its activities are created with a single
+        ``create`` and the transaction is committed, which also makes a run
+        killed midway resume with the orders left.
+        """
+        if batch_size is None:
+            batch_size = int(self.env['ir.config_parameter'].sudo().get_param('modulo.reminder_batch_size', REMINDER_BATCH_SIZE))
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+
+        now = fields.Datetime.now()
         upcoming_orders = self.search([
-            ('date_scheduled', '<=', reminder_date),
-            ('date_scheduled', '>=', today),
+            ('date_scheduled', '<=', now + timedelta(hours=REMINDER_LEAD_TIMES[kind])),
+            ('date_scheduled', '>=', now),
             ('state', '=', 'scheduled'),
-        ])
-
-        for order in upcoming_orders:
-            if order.partner_id.email:
-                template = self.env.ref('modulo.email_template_service_scheduled')
-                if template:
-                    template.send_mail(order.id)
-
-            if order.technician_id.user_id:
-                self.env['mail.activity'].create({
-                    'res_id': order.id,
-                    'res_model_id': self.env['ir.model']._get('service.order').id,
-                    'activity_type_id': self.env.ref('mail.mail_activity_data_todo').id,
-                    'summary': 'Service order reminder',
-                    'note': f'Service order {order.name} is scheduled for {order.date_scheduled}',
-                    'user_id': order.technician_id.user_id.id,
-                })
+            ('reminder_ids', 'not any', [('kind', '=', kind)]),
+        ], order='id')
+
+        Reminder = self.env['service.order.reminder']
+        template = self.env.ref('modulo.email_template_service_reminder', raise_if_not_found=False)
+        activity_type = self.env.ref('mail.mail_activity_data_todo', raise_if_not_found=False)
+        res_model_id = self.env['ir.model']._get_id('service.order')
+        sent = 0
+        for chunk in split_every(batch_size, upcoming_orders.ids):
+            orders = self.browse(Reminder._claim(chunk, kind))
+            # Precargar clientes y técnicos de todo el lote
+            orders.partner_id.mapped('email')
+            orders.technician_id.mapped('user_id')
+
+            to_email = orders.filtered(lambda order: order.partner_id.email)
+            if template and to_email:
+                template.send_mail_batch(to_email.ids)
+
+            self.env['mail.activity'].create([{
+                'res_id': order.id,
+                'res_model_id': res_model_id,
+                'activity_type_id': activity_type.id if activity_type else False,
+                'summary': _('Service order reminder'),
+                'note': _('Service order %s is scheduled for %s') % (order.name, order.date_scheduled),
+                'user_id': order.technician_id.user_id.id,
+            } for order in orders if order.technician_id.user_id])
+
+            sent += len(orders)
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        return sent
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
 import logging
 _logger = logging.getLogger(__name__)
 
@@ -25,3 +27,116 @@ class ServiceOrderBusinessLogic(models.AbstractModel):
             errors.append(_("Technician is required for this service type"))
         
         return errors
+
+    @api.model
+    def check_service_order_conflicts(self, order, technician=None, start=None, duration=None):
+        """Conflicts ``order`` would have if ``technician`` did it at ``start``
+        for ``duration`` hours (the order's own values by default).
+
+        Nothing is written: the order itself is never modified or copied.
+        """
+        return self.check_service_order_conflicts_batch([(
+            order,
+            order.technician_id if technician is None else technician,
+            start or order.date_scheduled,
+            duration or order._get_planned_duration(),
+        )])[0]
+
+    @api.model
+    def check_service_order_conflicts_batch(self, candidates):
+        """Check many hypothetical ``(order, technician, start, duration)``
+        tuples at once, e.g. every candidate date of a reprogramming.
+
+        Technician overlaps and equipment double-bookings are each found by
+        a single indexed query for all the candidates; working hours are read
+        once per calendar.
+
+        :return: one list of conflicts per candidate, each conflict being a
+                 dict with ``type`` (``technician``, ``equipment`` or
+                 ``working_hours``), ``reason`` and ``order_id``
+        """
+        rows = []
+        for position, (order, technician, start, duration) in enumerate(candidates):
+            if start:
+                rows.append((position, order, technician, start, start + timedelta(hours=duration)))
+        conflicts = [[] for _candidate in candidates]
+        if not rows:
+            return conflicts
+
+        ServiceOrder = self.env['service.order']
+        ServiceOrder.flush_model(['technician_id', 'equipment_id', 'state', 'date_scheduled', 'date_scheduled_end'])
+        for field_name in ('technician_id', 'equipment_id'):
+            keyed = [(position, order, start, end, order.equipment_id.id if field_name == 'equipment_id' else technician.id)
+                     for position, order, technician, start, end in rows]
+            keyed = [row for row in keyed if row[4]]
+            if not keyed:
+                continue
+            self.env.cr.execute(f"""
+                SELECT v.position, so.id
+                  FROM unnest(%s::int[], %s::int[], %s::timestamp[], %s::timestamp[], %s::int[])
+                       AS v(position, key_id, date_start, date_end, order_id)
+                  JOIN service_order so ON so."{field_name}" = v.key_id
+                 WHERE so.state IN ('scheduled', 'in_progress')
+                   AND so.date_scheduled < v.date_end
+                   AND so.date_scheduled_end > v.date_start
+                   AND so.id != v.order_id
+                 ORDER BY v.position, so.date_scheduled
+            """, (
+                [row[0] for row in keyed],
+                [row[4] for row in keyed],
+                [row[2] for row in keyed],
+                [row[3] for row in keyed],
+                [row[1].id or 0 for row in keyed],
+            ))
+            for position, conflicting_id in self.env.cr.fetchall():
+                conflicting = ServiceOrder.browse(conflicting_id)
+                if field_name == 'technician_id':
+                    reason = _("Overlapping service order %s for technician %s (%s - %s)") % (
+                        conflicting.name, conflicting.technician_id.name,
+                        conflicting.date_scheduled, conflicting.date_scheduled_end)
+                else:
+                    reason = _("Equipment %s is already booked by service order %s (%s - %s)") % (
+                        conflicting.equipment_id.name, conflicting.name,
+                        conflicting.date_scheduled, conflicting.date_scheduled_end)
+                conflicts[position].append({
+                    'type': 'technician' if field_name == 'technician_id' else 'equipment',
+                    'reason': reason,
+                    'order_id': conflicting_id,
+                })
+
+        # Horario laboral: intervalos de todos los técnicos en un solo rango
+        technicians = self.env['hr.employee'].concat(*(row[2] for row in rows))
+        if technicians:
+            work_intervals = self.env['hr.integration']._get_work_intervals(
+                technicians, min(row[3] for row in rows), max(row[4] for row in rows))
+            for position, order, technician, start, end in rows:
+                if technician and not any(work_start <= start and end <= work_end
+                                          for work_start, work_end in work_intervals.get(technician.id, [])):
+                    conflicts[position].append({
+                        'type': 'working_hours',
+                        'reason': _("Outside the working hours of technician %s") % technician.name,
+                        'order_id': False,
+                    })
+        return conflicts
+
+    @api.model
+    def _generate_monthly_service_report(self, month=None):
+        """Snapshot the figures of ``month`` (the previous month by default,
+        the cron running on the first day) and mail the summary to the
+        company.
+
+        :return: the summary values passed to the mail template
+        """
+        month = (month or fields.Date.context_today(self) - relativedelta(months=1)).replace(day=1)
+        Report = self.env['service.report.monthly']
+        Report._refresh_month(month)
+        summary = Report.get_month_summary(month)
+        summary['report_month'] = month.strftime('%B %Y')
+
+        company = self.env.company
+        template = self.env.ref('modulo.email_template_monthly_service_report_modulo', raise_if_not_found=False)
+        if template and company.email:
+            template.with_context(**summary).send_mail(company.id)
+        else:
+            _logger.info("Monthly service report for %s stored without mail", summary['report_month'])
+        return summary
@@ -11,6 +11,32 @@ class ServiceOrderRefactionLine(models.Model):
     subtotal = fields.Float(string='Subtotal', compute='_compute_subtotal', store=True)
     notes = fields.Text(string='Notes')
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines._refresh_technician_kpi()
+        return lines
+
+    def write(self, vals):
+        orders = self.order_id
+        res = super().write(vals)
+        if {'order_id', 'quantity', 'unit_price'} & set(vals):
+            self._refresh_technician_kpi(orders | self.order_id)
+        return res
+
+    def unlink(self):
+        orders = self.order_id
+        res = super().unlink()
+        self.browse()._refresh_technician_kpi(orders)
+        return res
+
+    def _refresh_technician_kpi(self, orders=None):
+        # Los importes de las órdenes completadas forman parte de los ingresos del técnico
+        orders = (self.order_id if orders is None else orders).exists()
+        completed = orders.filtered(lambda order: order.state == 'completed')
+        if completed:
+            self.env['service.technician.kpi']._refresh(completed._kpi_keys(repeat_calls=False))
+
     @api.depends('quantity', 'unit_price')
     def _compute_subtotal(self):
         for line in self:
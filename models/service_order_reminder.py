@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+# Recordatorios disponibles y su antelación respecto a la fecha programada
+REMINDER_KINDS = [('day_before', 'Day Before')]
+REMINDER_LEAD_TIMES = {'day_before': 24}
+
+
+class ServiceOrderReminder(models.Model):
+    _name = 'service.order.reminder'
+    _description = 'Service Order Reminder Ledger'
+    _order = 'date_sent desc, id desc'
+
+    order_id = fields.Many2one('service.order', string='Service Order', required=True, index=True, ondelete='cascade')
+    kind = fields.Selection(REMINDER_KINDS, string='Reminder', required=True)
+    date_sent = fields.Datetime(string='Sent On', required=True, default=fields.Datetime.now)
+
+    _sql_constraints = [
+        ('order_kind_uniq', 'unique(order_id, kind)', 'A reminder of each kind is sent only once per order.'),
+    ]
+
+    @api.model
+    def _claim(self, order_ids, kind):
+        """Record ``kind`` as sent for ``order_ids`` and return the ids that
+        were not recorded yet.
+
+        The rows are inserted in one statement; orders already claimed, by
+        an earlier run or a concurrent one, are skipped by the unique
+        constraint, so every reminder goes out at most once.
+        """
+        if not order_ids:
+            return []
+        self.env.cr.execute("""
+            INSERT INTO service_order_reminder (order_id, kind, date_sent, create_uid, write_uid, create_date, write_date)
+            SELECT order_id, %(kind)s, %(now)s, %(uid)s, %(uid)s, %(now)s, %(now)s
+              FROM unnest(%(order_ids)s::int[]) AS order_id
+            ON CONFLICT (order_id, kind) DO NOTHING
+            RETURNING order_id
+        """, {'kind': kind, 'now': fields.Datetime.now(), 'uid': self.env.uid, 'order_ids': list(order_ids)})
+        claimed = {row[0] for row in self.env.cr.fetchall()}
+        self.invalidate_model()
+        self.env['service.order'].invalidate_model(['reminder_ids'])
+        return [order_id for order_id in order_ids if order_id in claimed]
+
+    @api.model
+    def _release(self, order_ids):
+        """Forget the reminders sent for ``order_ids``, e.g. once they are
+        rescheduled, so they are reminded again"""
+        if not order_ids:
+            return
+        self.env.cr.execute("DELETE FROM service_order_reminder WHERE order_id = ANY(%s)", (list(order_ids),))
+        self.invalidate_model()
+        self.env['service.order'].invalidate_model(['reminder_ids'])
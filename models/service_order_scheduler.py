@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+import heapq
+import logging
+from .hr_integration import find_first_gap
+_logger = logging.getLogger(__name__)
+
+# Orden de atención de las prioridades (menor primero)
+PRIORITY_RANK = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+
+class ServiceOrderScheduler(models.AbstractModel):
+    _name = 'service.order.scheduler'
+    _description = 'Batch Scheduler for Service Orders'
+
+    @api.model
+    def schedule_orders(self, orders, start_date=None, horizon_days=None):
+        """Assign a technician and a date to many orders in one pass.
+
+        Orders are placed by priority then request date. Each one goes to
+        the least loaded technician (booked hours) qualified for its service
+        type that has a free slot in its working calendar within the
+        horizon (``modulo.scheduling_horizon_days`` by default); a technician
+        or a date already set on the order is kept. Availability, working
+        hours and eligibility are read once for all technicians and results
+        are written in bulk.
+
+        :return: the orders that could not be scheduled
+        """
+        if not orders:
+            return orders
+        hr_integration = self.env['hr.integration']
+        if not start_date:
+            start_date = datetime.combine(fields.Date.context_today(self) + timedelta(days=1), time.min)
+        horizon_end = start_date + timedelta(days=horizon_days or hr_integration._get_scheduling_horizon())
+
+        technicians = self.env['hr.employee'].search([('is_technician', '=', True)])
+        pool = set(technicians.ids)
+        index = hr_integration._build_availability_index(technicians | orders.technician_id, start_date)
+        work_intervals = hr_integration._get_work_intervals(technicians | orders.technician_id, start_date, horizon_end)
+
+        # Carga actual (horas) de cada técnico a partir de sus intervalos ocupados
+        loads = {}
+        for technician_id in (technicians | orders.technician_id).ids:
+            loads[technician_id] = sum(
+                (end - max(start, start_date)).total_seconds() / 3600
+                for start, end in index.busy_intervals(technician_id)
+            )
+        heap = [(loads[technician_id], technician_id) for technician_id in pool]
+        heapq.heapify(heap)
+        # Técnicos válidos por tipo de servicio, en la caché del registro
+        eligibility = self.env['service.type']._get_technician_eligibility(fields.Date.context_today(self))
+
+        assignments = {}
+        unscheduled = self.env['service.order']
+        for order in orders.sorted(lambda o: (PRIORITY_RANK.get(o.priority, len(PRIORITY_RANK)), o.date_requested, o.id)):
+            duration = timedelta(hours=order._get_planned_duration())
+            if order.technician_id and order.date_scheduled:
+                # Técnico y fecha elegidos a mano: se respetan tal cual
+                technician_id, slot = order.technician_id.id, order.date_scheduled
+            elif order.technician_id:
+                technician_id = order.technician_id.id
+                slot = self._find_slot(index, work_intervals, technician_id, duration, start_date)
+            else:
+                technician_id, slot = self._pick_technician(heap, loads, index, work_intervals, duration,
+                                                            order.date_scheduled or start_date,
+                                                            fixed=bool(order.date_scheduled),
+                                                            eligible=eligibility.get(order.service_type_id.id, ()))
+            if not slot:
+                unscheduled |= order
+                continue
+
+            index.add(technician_id, slot, slot + duration)
+            loads[technician_id] += duration.total_seconds() / 3600
+            if technician_id in pool:
+                heapq.heappush(heap, (loads[technician_id], technician_id))
+            assignments[order.id] = (technician_id, slot)
+
+        self._write_assignments(assignments)
+        if unscheduled:
+            _logger.info("Batch scheduler could not place %d service orders", len(unscheduled))
+        return unscheduled
+
+    @api.model
+    def _pick_technician(self, heap, loads, index, work_intervals, duration, start, fixed=False, eligible=()):
+        """Pop technicians from least to most loaded until an ``eligible``
+        one has a slot.
+
+        Entries whose load is outdated are dropped; the ones examined are
+        pushed back so the heap stays complete for the next order.
+        """
+        examined = []
+        found = (None, None)
+        while heap:
+            load, technician_id = heapq.heappop(heap)
+            if load != loads[technician_id]:
+                continue
+            examined.append((load, technician_id))
+            if technician_id not in eligible:
+                continue
+            slot = self._find_slot(index, work_intervals, technician_id, duration, start, fixed=fixed)
+            if slot:
+                found = (technician_id, slot)
+                break
+        for entry in examined:
+            heapq.heappush(heap, entry)
+        return found
+
+    @api.model
+    def _find_slot(self, index, work_intervals, technician_id, duration, start, fixed=False):
+        """Earliest start from ``start`` on where ``technician_id`` is free
+        for ``duration`` within its working intervals, or ``None``.
+
+        With ``fixed`` only ``start`` itself is checked.
+        """
+        intervals = work_intervals.get(technician_id, [])
+        if fixed:
+            in_working_hours = any(work_start <= start and start + duration <= work_end
+                                   for work_start, work_end in intervals)
+            return start if in_working_hours and index.is_available(technician_id, start, start + duration) else None
+        return find_first_gap(intervals, index.busy_intervals(technician_id), duration, start)
+
+    @api.model
+    def _write_assignments(self, assignments):
+        """Write ``{order_id: (technician_id, date)}`` with one write per
+        technician and a single UPDATE for all the dates"""
+        orders = self.env['service.order'].browse(list(assignments))
+        by_technician = defaultdict(list)
+        for order in orders:
+            technician_id = assignments[order.id][0]
+            if order.technician_id.id != technician_id:
+                by_technician[technician_id].append(order.id)
+        for technician_id, order_ids in by_technician.items():
+            orders.browse(order_ids).write({'technician_id': technician_id})
+
+        orders.write({'state': 'scheduled'})
+        orders._bulk_write_values('date_scheduled', {
+            order_id: date for order_id, (_technician_id, date) in assignments.items()
+        })
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from dateutil.relativedelta import relativedelta
+
+
+class ServiceReportMonthly(models.Model):
+    _name = 'service.report.monthly'
+    _description = 'Monthly Service Report Snapshot'
+    _order = 'month desc, service_type_id, technician_id'
+
+    month = fields.Date(string='Month', required=True, index=True, readonly=True)
+    service_type_id = fields.Many2one('service.type', string='Service Type', readonly=True, ondelete='cascade')
+    technician_id = fields.Many2one('hr.employee', string='Technician', readonly=True, ondelete='set null')
+    order_count = fields.Integer(string='Orders', readonly=True)
+    completed_count = fields.Integer(string='Completed Orders', readonly=True)
+    total_duration = fields.Float(string='Total Duration (hours)', readonly=True)
+    average_duration = fields.Float(string='Average Duration (hours)', readonly=True, group_operator='avg')
+    refaction_amount = fields.Float(string='Refactions', readonly=True)
+    invoiced_amount = fields.Float(string='Invoiced', readonly=True)
+
+    @api.model
+    def _refresh_month(self, month):
+        """Rebuild the snapshot lines of ``month`` (any date within it).
+
+        Orders requested in the month, except cancelled ones, are aggregated
+        by service type and technician in a single statement together with
+        their refaction lines and their share of the (non cancelled) invoice
+        amount, an invoice grouping several orders being split evenly.
+        """
+        month_start = month.replace(day=1)
+        month_end = month_start + relativedelta(months=1)
+        self.env['service.order'].flush_model()
+        self.env['service.order.refaction.line'].flush_model(['order_id', 'subtotal'])
+        self.env['account.move'].flush_model(['state', 'amount_untaxed_signed'])
+
+        self.env.cr.execute("DELETE FROM service_report_monthly WHERE month = %s", (month_start,))
+        self.env.cr.execute("""
+            WITH orders AS (
+                SELECT id, service_type_id, technician_id, state, duration, invoice_id
+                  FROM service_order
+                 WHERE date_requested >= %(start)s AND date_requested < %(end)s
+                   AND state != 'cancelled'
+            ), refactions AS (
+                SELECT order_id, SUM(subtotal) AS amount
+                  FROM service_order_refaction_line
+                 WHERE order_id IN (SELECT id FROM orders)
+              GROUP BY order_id
+            ), invoices AS (
+                SELECT am.id, am.amount_untaxed_signed / COUNT(so.id) FILTER (WHERE so.state != 'cancelled') AS amount
+                  FROM account_move am
+                  JOIN service_order so ON so.invoice_id = am.id
+                 WHERE am.id IN (SELECT invoice_id FROM orders)
+                   AND am.state != 'cancel'
+              GROUP BY am.id
+            )
+            INSERT INTO service_report_monthly
+                   (month, service_type_id, technician_id, order_count, completed_count, total_duration,
+                    average_duration, refaction_amount, invoiced_amount,
+                    create_uid, write_uid, create_date, write_date)
+            SELECT %(start)s, o.service_type_id, o.technician_id,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE o.state = 'completed'),
+                   COALESCE(SUM(o.duration) FILTER (WHERE o.state = 'completed'), 0),
+                   COALESCE(AVG(o.duration) FILTER (WHERE o.state = 'completed' AND o.duration > 0), 0),
+                   COALESCE(SUM(r.amount), 0),
+                   COALESCE(SUM(i.amount), 0),
+                   %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM orders o
+         LEFT JOIN refactions r ON r.order_id = o.id
+         LEFT JOIN invoices i ON i.id = o.invoice_id
+          GROUP BY o.service_type_id, o.technician_id
+        """, {'start': month_start, 'end': month_end, 'uid': self.env.uid})
+        self.invalidate_model()
+        return self.search([('month', '=', month_start)])
+
+    @api.model
+    def get_month_summary(self, month):
+        """Totals of the snapshot of ``month`` with one grouped query"""
+        [(order_count, completed_count, total_duration, refaction_amount, invoiced_amount)] = self._read_group(
+            [('month', '=', month.replace(day=1))], [],
+            ['order_count:sum', 'completed_count:sum', 'total_duration:sum',
+             'refaction_amount:sum', 'invoiced_amount:sum'],
+        )
+        completed_count = completed_count or 0
+        total_duration = total_duration or 0.0
+        return {
+            'total_orders': order_count or 0,
+            'completed_orders': completed_count,
+            'average_duration': round(total_duration / completed_count, 2) if completed_count else 0.0,
+            'total_revenue': round(invoiced_amount or 0.0, 2),
+            'refaction_amount': round(refaction_amount or 0.0, 2),
+        }
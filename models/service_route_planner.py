@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import groupby
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from math import asin, cos, radians, sin, sqrt
+import logging
+from .hr_integration import merge_intervals
+_logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+# Velocidad media (km/h) usada para convertir distancias en tiempo de viaje
+DEFAULT_AVERAGE_SPEED = 40.0
+# Las horas de visita se redondean a este número de minutos
+ROUTE_TIME_STEP = 5
+
+
+def haversine_km(origin, destination):
+    """Great-circle distance in km between two ``(latitude, longitude)`` points"""
+    lat1, lon1 = map(radians, origin)
+    lat2, lon2 = map(radians, destination)
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def distance_matrix(points):
+    return [[haversine_km(origin, destination) for destination in points] for origin in points]
+
+
+def route_length(route, matrix):
+    return sum(matrix[a][b] for a, b in zip(route, route[1:]))
+
+
+def nearest_neighbour_route(matrix, start=0):
+    """Open route visiting every point, always going to the closest unvisited one"""
+    unvisited = set(range(len(matrix))) - {start}
+    route = [start]
+    while unvisited:
+        last = matrix[route[-1]]
+        closest = min(unvisited, key=lambda point: (last[point], point))
+        unvisited.remove(closest)
+        route.append(closest)
+    return route
+
+
+def two_opt(route, matrix):
+    """Improve an open route by reversing segments while it gets shorter.
+
+    The first point (the start of the day) never moves.
+    """
+    route = list(route)
+    size = len(route)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, size - 1):
+            for j in range(i + 1, size):
+                before = matrix[route[i - 1]][route[i]]
+                after = matrix[route[i - 1]][route[j]]
+                if j + 1 < size:
+                    before += matrix[route[j]][route[j + 1]]
+                    after += matrix[route[i]][route[j + 1]]
+                if after < before - 1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route
+
+
+def round_up_time(date):
+    """Round ``date`` up to the next multiple of ``ROUTE_TIME_STEP`` minutes"""
+    step = timedelta(minutes=ROUTE_TIME_STEP)
+    remainder = (date - datetime.min) % step
+    return date + (step - remainder) if remainder else date
+
+
+class ServiceRoutePlanner(models.AbstractModel):
+    _name = 'service.route.planner'
+    _description = 'Daily Route Planner for Technicians'
+
+    @api.model
+    def _cron_plan_routes(self):
+        self.plan_routes()
+
+    @api.model
+    def plan_routes(self, day=None, technicians=None):
+        """Reorder the scheduled visits of every technician on ``day``
+        (tomorrow by default) to minimise travel and write the new times.
+
+        Orders in progress are not moved: a technician's visits are left
+        as they are when the new route would overlap one of them or fall
+        outside working hours.
+
+        :return: ``{order_id: date_scheduled}`` of the planned orders
+        """
+        day = day or fields.Date.context_today(self) + timedelta(days=1)
+        day_start = datetime.combine(day, time.min)
+        day_end = day_start + timedelta(days=1)
+        domain = [
+            ('state', '=', 'scheduled'),
+            ('technician_id', '!=', False),
+            ('date_scheduled', '>=', day_start),
+            ('date_scheduled', '<', day_end),
+        ]
+        if technicians:
+            domain.append(('technician_id', 'in', technicians.ids))
+        orders = self.env['service.order'].search(domain, order='date_scheduled, id')
+
+        busy_intervals = defaultdict(list)
+        for order in self.env['service.order'].search_read([
+            ('state', '=', 'in_progress'),
+            ('technician_id', 'in', orders.technician_id.ids),
+            ('date_scheduled', '<', day_end),
+            ('date_scheduled_end', '>', day_start),
+        ], ['technician_id', 'date_scheduled', 'date_scheduled_end']):
+            busy_intervals[order['technician_id'][0]].append((order['date_scheduled'], order['date_scheduled_end']))
+
+        speed = self._get_average_speed()
+        schedule = {}
+        for technician, technician_orders in groupby(orders, key=lambda order: order.technician_id):
+            technician_orders = self.env['service.order'].concat(*technician_orders)
+            schedule.update(self._plan_technician_route(
+                technician, technician_orders, speed, busy_intervals[technician.id]))
+        orders._bulk_write_values('date_scheduled', schedule)
+        return schedule
+
+    @api.model
+    def _get_average_speed(self):
+        speed = self.env['ir.config_parameter'].sudo().get_param('modulo.route_average_speed')
+        try:
+            return float(speed) if speed and float(speed) > 0 else DEFAULT_AVERAGE_SPEED
+        except ValueError:
+            return DEFAULT_AVERAGE_SPEED
+
+    @api.model
+    def _plan_technician_route(self, technician, orders, speed, busy_intervals=()):
+        """Route of one technician's day, starting at the current first visit.
+
+        Orders whose customer is not geolocated keep their relative order
+        and are visited after the routed ones; the technician's work address,
+        when geolocated, is used as the starting point of the route. An
+        empty schedule is returned when a visit of the route would overlap
+        one of the fixed ``busy_intervals`` or fall outside working hours.
+        """
+        located = orders.filtered(lambda order: order.partner_id.partner_latitude or order.partner_id.partner_longitude)
+        points = [(order.partner_id.partner_latitude, order.partner_id.partner_longitude) for order in located]
+        address = technician.address_id
+        depot = bool(address.partner_latitude or address.partner_longitude)
+        if depot:
+            points.insert(0, (address.partner_latitude, address.partner_longitude))
+
+        matrix = distance_matrix(points)
+        route = two_opt(nearest_neighbour_route(matrix), matrix) if points else []
+        if depot:
+            route = [point - 1 for point in route[1:]]
+        route = [located[point] for point in route]
+        visits = route + list(orders - located)
+
+        schedule = {}
+        current = orders[0].date_scheduled
+        previous_point = None
+        for order in visits:
+            point = (order.partner_id.partner_latitude, order.partner_id.partner_longitude) if order in located else None
+            if previous_point and point:
+                current += timedelta(hours=haversine_km(previous_point, point) / speed)
+                current = round_up_time(current)
+            schedule[order.id] = current
+            current += timedelta(hours=order._get_planned_duration())
+            previous_point = point or previous_point
+
+        day = orders[0].date_scheduled.date()
+        day_start = datetime.combine(day, time.min)
+        work_intervals = merge_intervals(self.env['hr.integration']._get_work_intervals(
+            technician, day_start, day_start + timedelta(days=1)).get(technician.id, []))
+        for order in visits:
+            start = schedule[order.id]
+            end = start + timedelta(hours=order._get_planned_duration())
+            if any(busy_start < end and start < busy_end for busy_start, busy_end in busy_intervals):
+                _logger.warning("Route of %s on %s overlaps an order in progress, visits left unchanged",
+                                technician.name, day)
+                return {}
+            if not any(work_start <= start and end <= work_end for work_start, work_end in work_intervals):
+                _logger.warning("Route of %s on %s falls outside working hours, visits left unchanged",
+                                technician.name, day)
+                return {}
+        return schedule
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+# Estados de orden que ocupan horas del técnico
+CAPACITY_STATES = ('scheduled', 'in_progress', 'completed')
+# Campos de la orden que cambian la capacidad ocupada
+CAPACITY_TRIGGER_FIELDS = {'technician_id', 'date_scheduled', 'service_type_id', 'state'}
+
+
+class ServiceTechnicianCapacity(models.Model):
+    _name = 'service.technician.capacity'
+    _description = 'Technician Daily Capacity'
+    _order = 'date desc, technician_id'
+
+    technician_id = fields.Many2one('hr.employee', string='Technician', required=True, index=True, ondelete='cascade')
+    date = fields.Date(string='Date', required=True, index=True)
+    order_count = fields.Integer(string='Orders', readonly=True)
+    scheduled_hours = fields.Float(string='Scheduled Hours', readonly=True)
+    capacity_hours = fields.Float(string='Working Hours', readonly=True)
+    utilization = fields.Float(string='Utilization (%)', readonly=True, group_operator='avg')
+
+    _sql_constraints = [
+        ('technician_date_uniq', 'unique(technician_id, date)', 'Only one capacity line per technician and day.'),
+    ]
+
+    @api.model
+    def _refresh(self, keys):
+        """Recompute the lines of the given ``(technician_id, date)`` keys.
+
+        Scheduled hours come from one GROUP BY over ``service_order`` and
+        working hours from the technicians' calendars, then every line is
+        upserted with a single statement.
+        """
+        keys = {(technician_id, date) for technician_id, date in keys if technician_id and date}
+        if not keys:
+            return
+        technician_ids = sorted({technician_id for technician_id, _date in keys})
+        date_from = min(date for _technician_id, date in keys)
+        date_to = max(date for _technician_id, date in keys) + timedelta(days=1)
+        start = datetime.combine(date_from, time.min)
+        end = datetime.combine(date_to, time.min)
+
+        self.env['service.order'].flush_model(['technician_id', 'date_scheduled', 'date_scheduled_end', 'state'])
+        self.env.cr.execute("""
+            SELECT technician_id, date_scheduled::date,
+                   COUNT(*), SUM(EXTRACT(EPOCH FROM date_scheduled_end - date_scheduled)) / 3600.0
+              FROM service_order
+             WHERE technician_id = ANY(%s)
+               AND state IN %s
+               AND date_scheduled >= %s AND date_scheduled < %s
+          GROUP BY 1, 2
+        """, (technician_ids, CAPACITY_STATES, start, end))
+        scheduled = {(technician_id, date): (count, hours or 0.0) for technician_id, date, count, hours in self.env.cr.fetchall()}
+
+        capacity = defaultdict(float)
+        technicians = self.env['hr.employee'].browse(technician_ids).exists()
+        for technician_id, intervals in self.env['hr.integration']._get_work_intervals(technicians, start, end).items():
+            for work_start, work_end in intervals:
+                capacity[technician_id, work_start.date()] += (work_end - work_start).total_seconds() / 3600
+
+        technician_ids = set(technicians.ids)
+        rows = []
+        for technician_id, date in keys:
+            if technician_id not in technician_ids:
+                continue
+            count, hours = scheduled.get((technician_id, date), (0, 0.0))
+            capacity_hours = capacity[technician_id, date]
+            utilization = 100.0 * hours / capacity_hours if capacity_hours else 0.0
+            rows.append((technician_id, date, count, hours, capacity_hours, utilization))
+        if not rows:
+            return
+
+        self.env.cr.execute("""
+            INSERT INTO service_technician_capacity
+                   (technician_id, date, order_count, scheduled_hours, capacity_hours, utilization,
+                    create_uid, write_uid, create_date, write_date)
+            SELECT technician_id, date, order_count, scheduled_hours, capacity_hours, utilization,
+                   %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM unnest(%(technician_ids)s::int[], %(dates)s::date[], %(counts)s::int[],
+                          %(hours)s::float8[], %(capacities)s::float8[], %(utilizations)s::float8[])
+                   AS v(technician_id, date, order_count, scheduled_hours, capacity_hours, utilization)
+            ON CONFLICT (technician_id, date) DO UPDATE
+               SET order_count = EXCLUDED.order_count,
+                   scheduled_hours = EXCLUDED.scheduled_hours,
+                   capacity_hours = EXCLUDED.capacity_hours,
+                   utilization = EXCLUDED.utilization,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'uid': self.env.uid,
+            'technician_ids': [row[0] for row in rows],
+            'dates': [row[1] for row in rows],
+            'counts': [row[2] for row in rows],
+            'hours': [row[3] for row in rows],
+            'capacities': [row[4] for row in rows],
+            'utilizations': [row[5] for row in rows],
+        })
+        self.invalidate_model()
+
+    @api.model
+    def _cron_refresh_capacity(self):
+        """Rebuild the lines of every technician over the scheduling horizon,
+        so calendar and leave changes are reflected"""
+        technicians = self.env['hr.employee'].search([('is_technician', '=', True)])
+        today = fields.Date.context_today(self)
+        days = self.env['hr.integration']._get_scheduling_horizon()
+        self._refresh({
+            (technician_id, today + timedelta(days=day))
+            for technician_id in technicians.ids for day in range(days)
+        })
+
+    @api.model
+    def get_utilization(self, technicians, date_from, date_to):
+        """Utilization figures of ``technicians`` between the two dates
+        (included), read from the capacity lines with one grouped query.
+
+        :return: ``{technician_id: {'scheduled_hours', 'capacity_hours',
+                 'order_count', 'utilization_rate', 'orders_per_day'}}``
+        """
+        groups = self._read_group(
+            [('technician_id', 'in', technicians.ids), ('date', '>=', date_from), ('date', '<=', date_to)],
+            ['technician_id'],
+            ['scheduled_hours:sum', 'capacity_hours:sum', 'order_count:sum'],
+        )
+        days = (date_to - date_from).days + 1
+        utilization = {}
+        for technician, scheduled_hours, capacity_hours, order_count in groups:
+            utilization[technician.id] = {
+                'scheduled_hours': scheduled_hours,
+                'capacity_hours': capacity_hours,
+                'order_count': order_count,
+                'utilization_rate': round(100.0 * scheduled_hours / capacity_hours, 1) if capacity_hours else 0.0,
+                'orders_per_day': round(order_count / days, 2) if days > 0 else 0.0,
+            }
+        return utilization
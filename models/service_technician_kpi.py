@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+# Días tras una visita en los que una nueva orden del mismo equipo cuenta como llamada repetida
+REPEAT_CALL_DAYS = 30
+# Campos de la orden que cambian los indicadores del técnico
+KPI_TRIGGER_FIELDS = {'state', 'technician_id', 'service_type_id', 'equipment_id',
+                      'date_requested', 'date_started', 'date_completed'}
+
+
+class ServiceTechnicianKpi(models.Model):
+    _name = 'service.technician.kpi'
+    _description = 'Technician Daily KPI'
+    _order = 'date desc, technician_id, service_type_id'
+
+    technician_id = fields.Many2one('hr.employee', string='Technician', required=True, index=True, ondelete='cascade')
+    service_type_id = fields.Many2one('service.type', string='Service Type', required=True, ondelete='cascade')
+    date = fields.Date(string='Completion Date', required=True, index=True)
+    completed_count = fields.Integer(string='Completed Orders', readonly=True)
+    total_duration = fields.Float(string='Total Duration (hours)', readonly=True)
+    planned_count = fields.Integer(string='Scheduled Orders', readonly=True,
+                                   help="Completed orders that had a scheduled end")
+    on_time_count = fields.Integer(string='On Time', readonly=True)
+    repeat_count = fields.Integer(string='Repeat Calls', readonly=True,
+                                  help="Visits followed by a new order for the same equipment within %s days" % REPEAT_CALL_DAYS)
+    revenue = fields.Float(string='Revenue', readonly=True,
+                           help="Service prices frozen at completion plus refaction lines of the completed orders")
+
+    _sql_constraints = [
+        ('technician_type_date_uniq', 'unique(technician_id, service_type_id, date)',
+         'Only one KPI line per technician, service type and day.'),
+    ]
+
+    @api.model
+    def _rebuild(self):
+        """Recompute the lines of every completed order, used by the upgrade
+        that introduces the table"""
+        self.env['service.order'].flush_model(['state', 'technician_id', 'service_type_id', 'date_completed'])
+        self.env.cr.execute("""
+            SELECT DISTINCT technician_id, service_type_id, date_completed::date
+              FROM service_order
+             WHERE state = 'completed' AND technician_id IS NOT NULL AND date_completed IS NOT NULL
+        """)
+        self._refresh(set(self.env.cr.fetchall()))
+
+    @api.model
+    def _refresh(self, keys):
+        """Recompute the lines of the given ``(technician_id, service_type_id,
+        date)`` keys: lines of keys left without completed orders are
+        deleted and the others upserted with one aggregation over the
+        completed orders of those days.
+        """
+        keys = {key for key in keys if all(key)}
+        if not keys:
+            return
+        technician_ids, service_type_ids, dates = (list(column) for column in zip(*keys))
+        self.env['service.order'].flush_model()
+        self.env['service.order.refaction.line'].flush_model(['order_id', 'subtotal'])
+
+        self.env.cr.execute("""
+            DELETE FROM service_technician_kpi kpi
+             USING unnest(%s::int[], %s::int[], %s::date[]) AS k(technician_id, service_type_id, date)
+             WHERE kpi.technician_id = k.technician_id
+               AND kpi.service_type_id = k.service_type_id
+               AND kpi.date = k.date
+               AND NOT EXISTS (
+                   SELECT 1
+                     FROM service_order so
+                    WHERE so.technician_id = k.technician_id
+                      AND so.service_type_id = k.service_type_id
+                      AND so.state = 'completed'
+                      AND so.date_completed >= k.date
+                      AND so.date_completed < k.date + 1
+               )
+        """, (technician_ids, service_type_ids, dates))
+        self.env.cr.execute("""
+            WITH orders AS (
+                SELECT so.*
+                  FROM unnest(%(technician_ids)s::int[], %(service_type_ids)s::int[], %(dates)s::date[])
+                       AS k(technician_id, service_type_id, date)
+                  JOIN service_order so ON so.technician_id = k.technician_id
+                                       AND so.service_type_id = k.service_type_id
+                                       AND so.date_completed >= k.date
+                                       AND so.date_completed < k.date + 1
+                 WHERE so.state = 'completed'
+            ), refactions AS (
+                SELECT order_id, SUM(subtotal) AS amount
+                  FROM service_order_refaction_line
+                 WHERE order_id IN (SELECT id FROM orders)
+              GROUP BY order_id
+            )
+            INSERT INTO service_technician_kpi
+                   (technician_id, service_type_id, date, completed_count, total_duration, planned_count,
+                    on_time_count, repeat_count, revenue, create_uid, write_uid, create_date, write_date)
+            SELECT o.technician_id, o.service_type_id, o.date_completed::date,
+                   COUNT(*),
+                   COALESCE(SUM(o.duration), 0),
+                   COUNT(*) FILTER (WHERE o.date_scheduled_end IS NOT NULL),
+                   COUNT(*) FILTER (WHERE o.date_completed <= o.date_scheduled_end),
+                   COUNT(*) FILTER (WHERE EXISTS (
+                       SELECT 1
+                         FROM service_order n
+                        WHERE n.equipment_id = o.equipment_id
+                          AND n.id != o.id
+                          AND n.state != 'cancelled'
+                          AND n.date_requested > o.date_completed
+                          AND n.date_requested <= o.date_completed + %(repeat_days)s * interval '1 day'
+                   )),
+                   COALESCE(SUM(COALESCE(r.amount, 0) + COALESCE(o.service_price, 0)), 0),
+                   %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM orders o
+         LEFT JOIN refactions r ON r.order_id = o.id
+          GROUP BY o.technician_id, o.service_type_id, o.date_completed::date
+            ON CONFLICT (technician_id, service_type_id, date) DO UPDATE
+               SET completed_count = EXCLUDED.completed_count,
+                   total_duration = EXCLUDED.total_duration,
+                   planned_count = EXCLUDED.planned_count,
+                   on_time_count = EXCLUDED.on_time_count,
+                   repeat_count = EXCLUDED.repeat_count,
+                   revenue = EXCLUDED.revenue,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'technician_ids': technician_ids,
+            'service_type_ids': service_type_ids,
+            'dates': dates,
+            'repeat_days': REPEAT_CALL_DAYS,
+            'uid': self.env.uid,
+        })
+        self.invalidate_model()
+
+    @api.model
+    def get_kpis(self, technicians, date_from, date_to):
+        """KPIs of ``technicians`` between the two dates (included), read
+        from the daily lines with one grouped query.
+
+        :return: ``{technician_id: {service_type: {'completed_count',
+                 'total_duration', 'planned_count', 'on_time_count',
+                 'repeat_count', 'revenue'}}}``
+        """
+        groups = self._read_group(
+            [('technician_id', 'in', technicians.ids), ('date', '>=', date_from), ('date', '<=', date_to)],
+            ['technician_id', 'service_type_id'],
+            ['completed_count:sum', 'total_duration:sum', 'planned_count:sum',
+             'on_time_count:sum', 'repeat_count:sum', 'revenue:sum'],
+        )
+        kpis = {technician_id: {} for technician_id in technicians.ids}
+        for technician, service_type, completed, duration, planned, on_time, repeat, revenue in groups:
+            kpis[technician.id][service_type] = {
+                'completed_count': completed,
+                'total_duration': duration,
+                'planned_count': planned,
+                'on_time_count': on_time,
+                'repeat_count': repeat,
+                'revenue': revenue,
+            }
+        return kpis
@@ -1,4 +1,13 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools
+from odoo.tools import frozendict
+
+# Secuencia que versiona la elegibilidad de técnicos en la caché del registro
+ELIGIBILITY_VERSION_SEQUENCE = 'service_type_eligibility_version_seq'
+
+def _split_skills(value):
+    """Normalized set of the comma separated skills of an employee field"""
+    return frozenset(skill.strip().lower() for skill in (value or '').split(',') if skill.strip())
+
 
 class ServiceType(models.Model):
     _name = 'service.type'
@@ -13,13 +22,108 @@ class ServiceType(models.Model):
     duration = fields.Float(string='Estimated Duration (hours)')
     equipment_required = fields.Boolean(string='Equipment Required', default=False)
     technician_required = fields.Boolean(string='Technician Required', default=True)
+    required_specialization = fields.Char(string='Required Specialization',
+                                          help="Only technicians with this specialization can be assigned")
+    required_certification = fields.Char(string='Required Certification',
+                                         help="Only technicians holding this certification, not expired, can be assigned")
     service_order_count = fields.Integer(compute='_compute_service_order_count', string='Service Orders')
 
     def _compute_service_order_count(self):
+        # Un solo conteo agrupado para todo el recordset
+        counts = dict(self.env['service.order']._read_group([('service_type_id', 'in', self.ids)], ['service_type_id'], ['__count']))
         for service_type in self:
-            service_type.service_order_count = self.env['service.order'].search_count([
-                ('service_type_id', '=', service_type.id)
-            ])
+            service_type.service_order_count = counts.get(service_type, 0)
+
+    def init(self):
+        # Versiones de la elegibilidad de técnicos: nunca se repiten, ni tras un rollback
+        self._cr.execute("CREATE SEQUENCE IF NOT EXISTS %s" % ELIGIBILITY_VERSION_SEQUENCE)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        service_types = super().create(vals_list)
+        self._invalidate_technician_eligibility()
+        return service_types
+
+    def write(self, vals):
+        requirements = [fname for fname in ('required_specialization', 'required_certification') if fname in vals]
+        before = {service_type: [service_type[fname] for fname in requirements] for service_type in self}
+        res = super().write(vals)
+        # Solo un cambio real de requisitos invalida la elegibilidad
+        if requirements and any(values != [service_type[fname] for fname in requirements]
+                                for service_type, values in before.items()):
+            self._invalidate_technician_eligibility()
+        return res
+
+    def _get_eligible_technicians(self):
+        """Ids of the technicians that can be assigned to this service type"""
+        self.ensure_one()
+        return self._get_technician_eligibility(fields.Date.context_today(self)).get(self.id, frozenset())
+
+    @api.model
+    def _get_technician_eligibility(self, today):
+        """Map every service type id to the frozenset of eligible
+        technician ids, as of ``today``"""
+        self.env.cr.execute("SELECT last_value FROM %s" % ELIGIBILITY_VERSION_SEQUENCE)
+        return self._load_technician_eligibility(today, self.env.cr.fetchone()[0])
+
+    @api.model
+    def _invalidate_technician_eligibility(self):
+        """Give the eligibility a new version.
+
+        The version is the last value of a dedicated sequence: bumping it
+        updates no row, so concurrent transactions never conflict on it, and
+        the other entries of the registry cache (API keys, access rules...)
+        are left alone. Sequences are not transactional, so the version is
+        bumped now, for the reads of the current transaction, and once more
+        after the commit: an entry cached by another worker in between, with
+        the data it saw before the commit, is never read again.
+        """
+        self.env.cr.execute("SELECT nextval(%s)", (ELIGIBILITY_VERSION_SEQUENCE,))
+        postcommit = self.env.cr.postcommit
+        if ELIGIBILITY_VERSION_SEQUENCE not in postcommit.data:
+            postcommit.data[ELIGIBILITY_VERSION_SEQUENCE] = True
+            registry = self.env.registry
+
+            @postcommit.add
+            def bump_version():
+                with registry.cursor() as cr:
+                    cr.execute("SELECT nextval(%s)", (ELIGIBILITY_VERSION_SEQUENCE,))
+
+    @api.model
+    @tools.ormcache('today', 'version')
+    def _load_technician_eligibility(self, today, version):
+        """Eligibility map of ``version``.
+
+        Specializations and certifications are matched case-insensitively
+        against the comma separated values of the employee. The map is kept
+        in the registry cache, keyed on the eligibility version so a change
+        of technicians or requirements only replaces this entry, and on
+        ``today`` so expired certifications drop out on their own.
+        """
+        technicians = self.env['hr.employee'].sudo().search_read(
+            [('is_technician', '=', True)],
+            ['specialization', 'certification', 'certification_expiry'],
+        )
+        skills = {}
+        for technician in technicians:
+            certified = not technician['certification_expiry'] or technician['certification_expiry'] >= today
+            skills[technician['id']] = (
+                _split_skills(technician['specialization']),
+                _split_skills(technician['certification']) if certified else frozenset(),
+            )
+
+        eligibility = {}
+        service_types = self.sudo().with_context(active_test=False).search_read(
+            [], ['required_specialization', 'required_certification'])
+        for service_type in service_types:
+            specialization = (service_type['required_specialization'] or '').strip().lower()
+            certification = (service_type['required_certification'] or '').strip().lower()
+            eligibility[service_type['id']] = frozenset(
+                technician_id for technician_id, (specializations, certifications) in skills.items()
+                if (not specialization or specialization in specializations)
+                and (not certification or certification in certifications)
+            )
+        return frozendict(eligibility)
 
     def action_view_service_orders(self):
         self.ensure_one()
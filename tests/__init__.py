@@ -6,3 +6,5 @@ from . import test_integrations
 from . import test_service_workflows
 from . import test_ui
 from . import test_performance
+from . import test_technician_availability
+from . import test_route_planner
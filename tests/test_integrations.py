@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
-from odoo.tests import TransactionCase, tagged
+from odoo.tests import HttpCase, TransactionCase, tagged
 from datetime import datetime, timedelta
 from odoo.exceptions import ValidationError, UserError
+from odoo.addons.modulo.controllers.main import MainController
 
 @tagged('post_install', '-at_install')
 class TestIntegrations(TransactionCase):
@@ -309,3 +310,340 @@ class TestIntegrations(TransactionCase):
         self.partner.email = False
         result = messaging_integration.send_scheduling_notification(self.service_order)
         self.assertFalse(result, "Notificación no debería enviarse sin email")
+
+
+@tagged('post_install', '-at_install')
+class TestServiceApiKeys(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ICP = self.env['ir.config_parameter'].sudo()
+        self.ICP.set_param('modulo.api_key', 'default-secret')
+        self.ICP.set_param('modulo.api_key.erp_mirror', 'mirror-secret')
+
+    def test_named_api_keys(self):
+        """Probar la validación de claves API con nombre"""
+        self.assertEqual(self.ICP._match_service_api_key('default-secret'), 'default', "Clave por defecto no reconocida")
+        self.assertEqual(self.ICP._match_service_api_key('mirror-secret'), 'erp_mirror', "Clave con nombre no reconocida")
+        self.assertIsNone(self.ICP._match_service_api_key('wrong-secret'), "Una clave inválida no debe validarse")
+        self.assertIsNone(self.ICP._match_service_api_key(''), "Una clave vacía no debe validarse")
+
+    def test_api_key_cache_invalidation(self):
+        """Probar que la caché de claves se invalida al cambiar el parámetro"""
+        self.assertEqual(self.ICP._match_service_api_key('mirror-secret'), 'erp_mirror')
+        self.ICP.set_param('modulo.api_key.erp_mirror', 'rotated-secret')
+        self.assertIsNone(self.ICP._match_service_api_key('mirror-secret'), "La clave anterior debe dejar de ser válida")
+        self.assertEqual(self.ICP._match_service_api_key('rotated-secret'), 'erp_mirror', "La nueva clave debe ser válida")
+
+
+@tagged('post_install', '-at_install')
+class TestServiceOrderChangeFeed(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Feed Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'Feed Type', 'duration': 1.0})
+        self.orders = self.env['service.order'].create([{
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+        } for _i in range(3)])
+        self.env.flush_all()
+        self.env.cr.execute("SELECT txid_current(), txid_snapshot_xmin(txid_current_snapshot())")
+        self.txid, self.horizon = self.env.cr.fetchone()
+
+    def _set_change_txid(self, orders, change_txid):
+        """Simular escrituras de otras transacciones, sin que el trigger pise el valor"""
+        self.env.cr.execute("ALTER TABLE service_order DISABLE TRIGGER service_order_change_txid")
+        self.env.cr.execute("UPDATE service_order SET change_txid = %s WHERE id IN %s", (change_txid, tuple(orders.ids)))
+        self.env.cr.execute("ALTER TABLE service_order ENABLE TRIGGER service_order_change_txid")
+
+    def _positions(self, orders):
+        self.env.cr.execute("SELECT change_txid, id FROM service_order WHERE id IN %s ORDER BY id", (tuple(orders.ids),))
+        return self.env.cr.fetchall()
+
+    def test_writes_stamp_transaction(self):
+        """Probar que cada escritura, también en SQL, guarda el id de su transacción"""
+        self._set_change_txid(self.orders, 1)
+        self.orders[0].write({'notes': 'ORM'})
+        self.orders[1]._bulk_write_values('date_scheduled', {self.orders[1].id: datetime(2030, 1, 1, 10, 0)})
+        self.env.flush_all()
+        self.assertEqual([txid for txid, _id in self._positions(self.orders)], [self.txid, self.txid, 1])
+
+    def test_in_progress_transactions_held_back(self):
+        """Probar que los cambios de transacciones en curso no adelantan el cursor"""
+        ServiceOrder = self.env['service.order']
+        after = (self.horizon - 3, 0)
+        self.assertFalse(ServiceOrder._get_changes(after)[0] & self.orders,
+                         "Los cambios de una transacción en curso deben retenerse")
+
+        # Una transacción confirmada tarde tiene un id menor que las que ya se leyeron
+        self._set_change_txid(self.orders[0], self.horizon - 1)
+        self._set_change_txid(self.orders[1], self.horizon)
+        self._set_change_txid(self.orders[2], self.horizon - 2)
+        changes, position = ServiceOrder._get_changes(after)
+        self.assertEqual(changes & self.orders, self.orders[2] | self.orders[0],
+                         "Solo deben devolverse los cambios anteriores a la transacción más antigua en curso")
+        self.assertEqual(changes[-1], self.orders[0], "Los cambios deben ordenarse por transacción")
+        self.assertEqual(position, (self.horizon - 1, self.orders[0].id))
+
+    def test_cursor_pagination(self):
+        """Probar que el cursor recorre todos los cambios sin repetirlos"""
+        for offset, order in enumerate(self.orders):
+            self._set_change_txid(order, self.horizon - 3 + offset)
+        seen = self.env['service.order']
+        position = (self.horizon - 4, 0)
+        for _page in range(10):
+            changes, position = self.env['service.order']._get_changes(position, limit=1)
+            if not changes:
+                break
+            self.assertFalse(changes & seen, "Un cambio no debe repetirse")
+            seen |= changes
+        self.assertEqual(seen & self.orders, self.orders, "Deben recorrerse todos los cambios")
+
+        controller = MainController()
+        cursor = controller._encode_changes_cursor(*position)
+        self.assertEqual(controller._decode_changes_cursor(cursor), position)
+        with self.assertRaises(ValueError):
+            controller._decode_changes_cursor('not-a-cursor')
+
+
+@tagged('post_install', '-at_install')
+class TestServiceOrderStatusApi(HttpCase):
+
+    def setUp(self):
+        super().setUp()
+        self.env['ir.config_parameter'].sudo().set_param('modulo.api_key', 'status-secret')
+        company = self.env['res.partner'].create({'name': 'Status Company', 'is_company': True})
+        self.partner = self.env['res.partner'].create({'name': 'Status Contact', 'parent_id': company.id})
+        self.service_type = self.env['service.type'].create({'name': 'Status Type', 'duration': 1.0})
+        self.technician = self.env['hr.employee'].create({'name': 'Status Technician', 'is_technician': True})
+        self.orders = self.env['service.order'].create([{
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+            'technician_id': self.technician.id,
+        } for _i in range(2)])
+
+    def _get_status(self, query, **headers):
+        headers = {key.replace('_', '-'): value for key, value in headers.items()}
+        headers['Authorization'] = 'Bearer status-secret'
+        return self.url_open('/api/service-order/status?%s' % query, headers=headers)
+
+    def _set_change_txid(self, orders, change_txid, extra=None):
+        """Simular escrituras de otras transacciones, sin que el trigger pise el valor"""
+        self.env.flush_all()
+        self.env.cr.execute("ALTER TABLE service_order DISABLE TRIGGER service_order_change_txid")
+        self.env.cr.execute("UPDATE service_order SET change_txid = %%s%s WHERE id IN %%s" % (', ' + extra if extra else ''),
+                            (change_txid, tuple(orders.ids)))
+        self.env.cr.execute("ALTER TABLE service_order ENABLE TRIGGER service_order_change_txid")
+        orders.invalidate_recordset(['write_date'])
+
+    def test_single_order_payload(self):
+        """Probar que la respuesta de estado de una orden mantiene su forma original"""
+        order = self.orders[0]
+        self.assertEqual(MainController()._serialize_service_orders(order)[0], {
+            'id': order.id,
+            'name': order.name,
+            'state': 'draft',
+            'date_requested': order.date_requested,
+            'date_scheduled': False,
+            'date_started': False,
+            'date_completed': False,
+            'technician': 'Status Technician',
+            'partner': 'Status Contact',
+            'service_type': 'Status Type',
+            'equipment': None,
+        })
+
+    def test_status_list_conditional_get(self):
+        """Probar el ciclo ETag/304 del estado de varias órdenes"""
+        query = 'technician_id=%s' % self.technician.id
+        self._set_change_txid(self.orders, 1)
+        response = self._get_status(query)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([order['id'] for order in data['orders']], self.orders.ids)
+        self.assertEqual({order['partner'] for order in data['orders']}, {'Status Contact'})
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+
+        not_modified = self._get_status(query, If_None_Match=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertFalse(not_modified.content, "Una respuesta 304 no lleva cuerpo")
+        self.assertEqual(not_modified.headers['ETag'], etag)
+        self.assertEqual(self._get_status(query, If_Modified_Since=last_modified).status_code, 304)
+
+        # Una escritura de una transacción posterior cambia el ETag y la fecha de modificación
+        self._set_change_txid(self.orders[0], 2, "write_date = write_date + interval '1 minute'")
+        changed = self._get_status(query, If_None_Match=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertNotEqual(changed.headers['Last-Modified'], last_modified)
+        self.assertEqual(self._get_status(query, If_Modified_Since=last_modified).status_code, 200)
+
+        # Una transacción que confirma tarde con un write_date anterior también cambia el ETag
+        self._set_change_txid(self.orders[1], 3, "write_date = write_date - interval '1 minute'")
+        late = self._get_status(query, If_None_Match=changed.headers['ETag'])
+        self.assertEqual(late.status_code, 200)
+        self.assertNotEqual(late.headers['ETag'], changed.headers['ETag'])
+
+        # Un filtro distinto no comparte ETag
+        other = self._get_status('ids=%s' % self.orders[0].id, If_None_Match=late.headers['ETag'])
+        self.assertEqual(other.status_code, 200)
+        self.assertEqual(other.json()['count'], 1)
+
+    def test_status_list_fields_and_errors(self):
+        """Probar la selección de campos y las peticiones inválidas"""
+        response = self._get_status('ids=%s&fields=state' % ','.join(map(str, self.orders.ids)))
+        self.assertEqual(response.json()['orders'], [{'id': order.id, 'state': 'draft'} for order in self.orders])
+
+        self.assertEqual(self._get_status('ids=%s&fields=secret' % self.orders[0].id).status_code, 400)
+        self.assertEqual(self._get_status('state=unknown').status_code, 400)
+        self.assertEqual(self._get_status('').status_code, 400)
+        unauthorized = self.url_open('/api/service-order/status?ids=%s' % self.orders[0].id,
+                                     headers={'Authorization': 'Bearer wrong-secret'})
+        self.assertEqual(unauthorized.status_code, 401)
+
+
+@tagged('post_install', '-at_install')
+class TestServiceOrderApiBatch(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ServiceOrder = self.env['service.order'].sudo()
+        self.partner = self.env['res.partner'].create({'name': 'Batch API Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'Batch API Type', 'duration': 1.0})
+
+    def _item(self, **vals):
+        return dict({'partner_id': self.partner.id, 'service_type_id': self.service_type.id}, **vals)
+
+    def test_batch_creates_all_orders(self):
+        """Probar que un lote válido crea todas las órdenes"""
+        result = self.ServiceOrder._create_api_batch([self._item(description='A'), self._item(priority='high')])
+        self.assertTrue(result['success'])
+        self.assertEqual(result['created'], 2)
+        orders = self.ServiceOrder.browse([item['id'] for item in result['results']])
+        self.assertEqual(orders.mapped('description'), ['A', ''])
+        self.assertEqual(orders.mapped('priority'), ['medium', 'high'])
+
+    def test_atomic_batch_rejects_invalid_item(self):
+        """Probar que en modo atómico un elemento inválido anula todo el lote"""
+        count = self.ServiceOrder.search_count([])
+        result = self.ServiceOrder._create_api_batch([self._item(), self._item(technician_id=-1)])
+        self.assertFalse(result['success'])
+        self.assertEqual(result['created'], 0)
+        self.assertEqual([item['index'] for item in result['results']], [1])
+        self.assertEqual(self.ServiceOrder.search_count([]), count, "No debe crearse ninguna orden")
+
+    def test_partial_batch_reports_invalid_items(self):
+        """Probar que sin modo atómico los elementos válidos se crean y los inválidos se informan"""
+        missing_partner = self.env['res.partner'].create({'name': 'Deleted Partner'})
+        missing_partner.unlink()
+        items = [
+            self._item(),
+            self._item(partner_id=[self.partner.id]),
+            self._item(service_type_id={'id': self.service_type.id}),
+            self._item(equipment_id='1'),
+            self._item(technician_id=True),
+            self._item(partner_id=missing_partner.id),
+            {'partner_id': self.partner.id},
+            'not an order',
+            self._item(technician_id=None),
+        ]
+        result = self.ServiceOrder._create_api_batch(items, atomic=False)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([item['success'] for item in result['results']],
+                         [True, False, False, False, False, False, False, False, True])
+        self.assertTrue(all(item['error'] for item in result['results'] if not item['success']))
+
+    def test_partial_batch_isolates_create_errors(self):
+        """Probar que un error al crear solo afecta a su elemento"""
+        result = self.ServiceOrder._create_api_batch(
+            [self._item(), self._item(priority='not-a-priority'), self._item()], atomic=False)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([item['success'] for item in result['results']], [True, False, True])
+
+    def test_atomic_flag_parsing(self):
+        """Probar que el indicador atomic se interpreta como booleano"""
+        controller = MainController()
+        for value, expected in ((True, True), (False, False), ('false', False), ('False', False), ('0', False),
+                                (0, False), ('true', True), (1, True), ('maybe', None), ([], None)):
+            self.assertEqual(controller._parse_api_bool(value), expected, "Valor de atomic: %r" % (value,))
+
+
+@tagged('post_install', '-at_install')
+class TestBatchInvoicing(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.partners = self.env['res.partner'].create([{'name': 'Invoice Partner %s' % i} for i in range(2)])
+        self.product = self.env['product.product'].create({'name': 'Invoice Service', 'lst_price': 80.0, 'type': 'service'})
+        self.part = self.env['product.product'].create({'name': 'Invoice Part', 'lst_price': 15.0})
+        self.types = self.env['service.type'].create([
+            {'name': 'Invoice Type %s' % i, 'duration': 1.0, 'product_id': self.product.id} for i in range(2)
+        ])
+        vals_list = []
+        for i in range(12):
+            vals_list.append({
+                'partner_id': self.partners[i % 2].id,
+                'service_type_id': self.types[0 if i % 3 else 1].id,
+                'date_requested': datetime(2024, 1 if i < 6 else 2, 10, 9, 0, 0),
+                'refaction_line_ids': [(0, 0, {'product_id': self.part.id, 'quantity': 1, 'unit_price': 15.0})],
+            })
+        self.orders = self.env['service.order'].create(vals_list)
+        self.integration = self.env['account.integration']
+
+    def _expected_groups(self, key):
+        return len({key(order) for order in self.orders})
+
+    def test_grouped_invoices(self):
+        """Probar la facturación por lotes agrupando por cliente, periodo y tipo de servicio"""
+        for grouping, key in (
+            ((), lambda o: o.partner_id),
+            (('period',), lambda o: (o.partner_id, o.date_requested.month)),
+            (('service_type',), lambda o: (o.partner_id, o.service_type_id)),
+            (None, lambda o: o),
+        ):
+            with self.subTest(grouping=grouping):
+                self.orders.write({'is_invoiced': False, 'invoice_id': False})
+                invoices = self.integration.create_invoices_from_service_orders(self.orders, grouping)
+
+                self.assertEqual(len(invoices), self._expected_groups(key))
+                self.assertEqual(len(invoices.invoice_line_ids), 24, "Una línea de servicio y una de refacción por orden")
+                self.assertTrue(all(self.orders.mapped('is_invoiced')))
+                for order in self.orders:
+                    self.assertIn(order.name, order.invoice_id.invoice_origin)
+                    self.assertEqual(order.invoice_id.partner_id, order.partner_id)
+
+    def test_action_invoices_once(self):
+        """Probar que la acción crea una factura por orden sin repetir las ya facturadas"""
+        self.orders[:4].action_create_invoice()
+        self.assertEqual(len(self.orders[:4].invoice_id), 4)
+
+        self.orders.action_create_grouped_invoice()
+        self.assertEqual(len(self.orders[:4].invoice_id), 4, "Las órdenes facturadas no se vuelven a facturar")
+        self.assertTrue(all(self.orders.mapped('is_invoiced')))
+
+        with self.assertRaises(UserError):
+            self.integration.create_invoices_from_service_orders(self.orders[:1])
+
+    def test_bulk_unset_invoice(self):
+        """Probar que la escritura en bloque admite un lote de solo valores nulos"""
+        self.orders[:2].action_create_invoice()
+        self.orders[:2]._bulk_write_values('invoice_id', {order.id: None for order in self.orders[:2]})
+        self.assertFalse(self.orders[:2].invoice_id)
+
+    def test_invoiced_orders_are_rejected(self):
+        """Probar que un lote con órdenes ya facturadas no crea ninguna factura"""
+        self.orders[:1].action_create_invoice()
+        invoice_count = self.env['account.move'].search_count([])
+        with self.assertRaises(UserError):
+            self.integration.create_invoices_from_service_orders(self.orders[:3], ())
+        self.assertEqual(self.env['account.move'].search_count([]), invoice_count)
+        self.assertFalse(any(self.orders[1:3].mapped('is_invoiced')), "Ninguna orden del lote debe facturarse")
+
+        with self.assertRaises(ValueError):
+            self.integration.create_invoices_from_service_orders(self.orders[1:3], ('partner',))
@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import HttpCase, TransactionCase, tagged
+from datetime import timedelta
+import base64
+import logging
+import time
+from odoo.addons.modulo.models.qr_code_generator import qr_image_cache
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestQRCodeCache(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        qr_image_cache.clear()
+        self.generator = self.env['qr.code.generator']
+
+    def test_qr_cache_reuses_rendered_images(self):
+        """Probar que un payload idéntico no se vuelve a renderizar"""
+        first = self.generator._render_qr_code('SO/00001|Test Partner|2023-01-01')
+        second = self.generator._render_qr_code('SO/00001|Test Partner|2023-01-01')
+
+        self.assertEqual(first, second, "El mismo payload debe producir la misma imagen")
+        stats = self.generator.get_qr_cache_stats()
+        self.assertEqual(stats['misses'], 1, "Solo debe haber un renderizado")
+        self.assertEqual(stats['memory_hits'], 1, "La segunda consulta debe salir de memoria")
+
+    def test_qr_cache_persistent_store(self):
+        """Probar que el almacén de adjuntos sobrevive al vaciado de la memoria"""
+        first = self.generator._render_qr_code('EQ|SERIAL|Partner')
+        qr_image_cache.clear()
+        second = self.generator._render_qr_code('EQ|SERIAL|Partner')
+
+        self.assertEqual(first, second, "La imagen persistida debe ser idéntica")
+        stats = self.generator.get_qr_cache_stats()
+        self.assertEqual(stats['store_hits'], 1, "La imagen debe recuperarse del almacén")
+        self.assertEqual(stats['misses'], 0, "No debe volver a renderizarse")
+
+    def test_qr_cache_key_includes_params(self):
+        """Probar que los parámetros de renderizado forman parte de la clave"""
+        small = self.generator._render_qr_code('payload', box_size=4)
+        large = self.generator._render_qr_code('payload', box_size=10)
+        self.assertNotEqual(small, large, "Parámetros distintos deben producir imágenes distintas")
+
+    def test_qr_batch_render_deduplicates_payloads(self):
+        """Probar que el renderizado por lotes deduplica los payloads"""
+        images = self.generator._render_qr_codes(['EQ-1', 'EQ-2', 'EQ-1', False])
+
+        self.assertEqual(set(images), {'EQ-1', 'EQ-2'}, "Deben devolverse solo los payloads válidos")
+        self.assertEqual(self.generator.get_qr_cache_stats()['misses'], 2,
+                         "Cada payload distinto debe renderizarse una sola vez")
+        self.assertTrue(base64.b64decode(images['EQ-1']).startswith(b'\x89PNG'),
+                        "La imagen debe ser un PNG válido")
+
+    def test_qr_store_index_created_by_models(self):
+        """Probar que los modelos con QR crean el índice del almacén de imágenes al inicializarse"""
+        self.env.cr.execute("DROP INDEX ir_attachment_qr_code_name_index")
+        self.env['service.order'].init()
+        self.env.cr.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'ir_attachment_qr_code_name_index'")
+        self.assertTrue(self.env.cr.fetchall(), "service.order debe encadenar init() con el mixin")
+
+
+@tagged('post_install', '-at_install')
+class TestQRCodeQueue(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.env['ir.config_parameter'].sudo().set_param('modulo.qr_code_mode', 'async')
+        self.partner = self.env['res.partner'].create({'name': 'Queue Partner'})
+        self.equipment = self.env['service.equipment'].create({
+            'name': 'Queued Equipment',
+            'serial_number': 'QUEUE001',
+            'partner_id': self.partner.id,
+        })
+
+    def test_async_mode_keeps_stale_image(self):
+        """Probar que en modo async la imagen anterior se conserva hasta procesar la cola"""
+        Queue = self.env['qr.code.queue']
+        self.assertFalse(self.equipment.qr_code, "En modo async no debe renderizarse al crear")
+        Queue._process_queue()
+        original_qr = self.equipment.qr_code
+        self.assertTrue(original_qr, "La cola debe renderizar el código QR")
+
+        self.partner.name = 'Renamed Partner'
+        self.assertEqual(self.equipment.qr_code, original_qr, "La imagen anterior debe conservarse")
+        self.assertEqual(Queue.search_count([('res_model', '=', 'service.equipment')]), 1,
+                         "El cambio de nombre del cliente debe encolar el equipo")
+
+        Queue._process_queue()
+        self.assertNotEqual(self.equipment.qr_code, original_qr, "La cola debe regenerar la imagen")
+        self.assertFalse(Queue.search_count([]), "La cola debe quedar vacía")
+
+
+@tagged('post_install', '-at_install')
+class TestQRCodeLazyMode(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Lazy Partner'})
+        self.equipment = self.env['service.equipment'].create({
+            'name': 'Lazy Equipment',
+            'serial_number': 'LAZY001',
+            'partner_id': self.partner.id,
+        })
+        self.env['ir.config_parameter'].sudo().set_param('modulo.qr_code_mode', 'lazy')
+
+    def test_lazy_mode_drops_stale_image(self):
+        """Probar que en modo lazy un cambio descarta la imagen anterior y se genera la nueva al leerla"""
+        generator = self.env['qr.code.generator']
+        original_qr = self.equipment.qr_code
+        self.assertTrue(self.equipment.qr_code_key, "La imagen inicial se genera en modo stored")
+
+        self.equipment.serial_number = 'LAZY002'
+        self.assertFalse(self.equipment.qr_code_key, "La imagen anterior debe descartarse")
+        self.assertNotEqual(self.equipment.qr_code, original_qr, "No debe mostrarse la imagen anterior")
+        self.assertEqual(self.equipment.qr_code, generator._render_qr_code(self.equipment._get_qr_data(self.equipment)),
+                         "La imagen debe corresponder a los datos actuales")
+
+        # Un segundo cambio también invalida la imagen generada bajo demanda
+        self.equipment.serial_number = 'LAZY003'
+        self.assertEqual(self.equipment.qr_code, generator._render_qr_code(self.equipment._get_qr_data(self.equipment)))
+
+
+@tagged('post_install', '-at_install')
+class TestServiceQRImage(HttpCase):
+
+    def setUp(self):
+        super().setUp()
+        partner = self.env['res.partner'].create({'name': 'QR Route Partner'})
+        self.equipment = self.env['service.equipment'].create({
+            'name': 'QR Route Equipment',
+            'serial_number': 'ROUTE001',
+            'partner_id': partner.id,
+        })
+        self.authenticate('admin', 'admin')
+
+    def test_png_image_and_revalidation(self):
+        """Probar que la imagen PNG se sirve con ETag y se revalida con 304"""
+        url = '/service-qr/equipment/%s.png' % self.equipment.id
+        response = self.url_open(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG'), "La respuesta debe ser un PNG")
+        self.assertEqual(response.content, base64.b64decode(self.equipment.qr_code),
+                         "La imagen servida debe ser la del registro")
+        etag = response.headers['ETag']
+        self.assertIn('max-age', response.headers['Cache-Control'])
+
+        revalidated = self.url_open(url, headers={'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertFalse(revalidated.content, "Una respuesta 304 no lleva cuerpo")
+
+        # Cambiar los datos del código cambia el ETag
+        self.equipment.serial_number = 'ROUTE002'
+        changed = self.url_open(url, headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+
+    def test_svg_image(self):
+        """Probar que la imagen SVG es un documento SVG con su propio ETag"""
+        png = self.url_open('/service-qr/equipment/%s.png' % self.equipment.id)
+        response = self.url_open('/service-qr/equipment/%s.svg' % self.equipment.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'image/svg+xml')
+        self.assertTrue(response.content.startswith(b'<?xml'), "La respuesta debe ser un documento XML")
+        self.assertIn(b'<svg', response.content)
+        self.assertNotEqual(response.headers['ETag'], png.headers['ETag'], "Cada formato tiene su propio ETag")
+
+    def test_unknown_targets(self):
+        """Probar que los tipos, formatos y registros desconocidos devuelven 404"""
+        for url in ('/service-qr/unknown/%s.png' % self.equipment.id,
+                    '/service-qr/equipment/%s.gif' % self.equipment.id,
+                    '/service-qr/equipment/0.png'):
+            self.assertEqual(self.url_open(url).status_code, 404, url)
+
+
+@tagged('post_install', '-at_install')
+class TestServiceOrderSequence(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Sequence Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'Sequence Type', 'duration': 1.0})
+
+    def test_bulk_create_allocates_unique_names(self):
+        """Probar que la creación masiva reserva referencias únicas y ordenadas"""
+        orders = self.env['service.order'].create([{
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+        } for _i in range(20)])
+
+        names = orders.mapped('name')
+        self.assertEqual(len(set(names)), 20, "Cada orden debe tener una referencia única")
+        self.assertEqual(names, sorted(names), "Las referencias deben asignarse en orden")
+        self.assertNotIn('New', names, "Ninguna orden debe quedar sin referencia")
+
+        next_name = self.env['ir.sequence'].next_by_code('service.order')
+        self.assertGreater(next_name, names[-1], "La secuencia debe continuar tras el bloque reservado")
+
+
+@tagged('post_install', '-at_install')
+class TestServiceOrderQRToken(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Token Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'Token Type', 'duration': 1.0})
+        self.order = self.env['service.order'].create({
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+        })
+
+    def test_qr_token_roundtrip(self):
+        """Probar que el token QR firmado se resuelve al id de la orden"""
+        ServiceOrder = self.env['service.order']
+        token = self.order._get_qr_token()
+        self.assertEqual(ServiceOrder._resolve_qr_token(token), self.order.id, "El token debe resolverse a la orden")
+
+        order_id, signature = token.split('.')
+        forged = '%s.%s' % (int(order_id) + 1, signature)
+        self.assertIsNone(ServiceOrder._resolve_qr_token(forged), "Un token con id alterado debe rechazarse")
+        self.assertIsNone(ServiceOrder._resolve_qr_token(order_id), "Un token sin firma debe rechazarse")
+        self.assertIsNone(ServiceOrder._resolve_qr_token('SO/00001|Token Partner|2023-01-01'),
+                          "El formato antiguo no es un token")
+
+
+@tagged('post_install', '-at_install')
+class TestServiceCounters(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service_type = self.env['service.type'].create({'name': 'Counter Type', 'duration': 1.0})
+        self.partners = self.env['res.partner'].create([{'name': 'Counter Partner %s' % i} for i in range(20)])
+        self.technicians = self.env['hr.employee'].create([
+            {'name': 'Counter Technician %s' % i, 'is_technician': True} for i in range(20)
+        ])
+        self.env['service.order'].create([{
+            'partner_id': partner.id,
+            'service_type_id': self.service_type.id,
+            'technician_id': technician.id,
+        } for i, (partner, technician) in enumerate(zip(self.partners, self.technicians)) for _j in range(i % 3)])
+        self.env['service.equipment'].create([
+            {'name': 'Counter Equipment %s' % i, 'partner_id': partner.id} for i, partner in enumerate(self.partners)
+        ])
+
+    def _count_queries(self, records, field_names):
+        # Nuevo recordset para que la precarga no incluya otros registros
+        records = records.browse(records.ids)
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        for field_name in field_names:
+            records.mapped(field_name)
+        return self.env.cr.sql_log_count - queries
+
+    def test_counters_values(self):
+        """Probar que los contadores agrupados coinciden con el conteo por registro"""
+        for i, (partner, technician) in enumerate(zip(self.partners, self.technicians)):
+            self.assertEqual(partner.service_order_count, i % 3)
+            self.assertEqual(partner.equipment_count, 1)
+            self.assertEqual(technician.service_order_count, i % 3)
+        self.assertEqual(self.service_type.service_order_count, sum(i % 3 for i in range(20)))
+
+    def test_counters_query_count_is_constant(self):
+        """Probar que el número de consultas no depende del tamaño del recordset"""
+        for records, field_names in (
+            (self.partners, ['service_order_count', 'equipment_count']),
+            (self.technicians, ['service_order_count']),
+        ):
+            few = self._count_queries(records[:2], field_names)
+            many = self._count_queries(records, field_names)
+            self.assertEqual(many, few, "%s: %s consultas para %s registros, %s para 2" % (
+                records._name, many, len(records), few))
+
+
+@tagged('post_install', '-at_install', 'modulo_benchmark', '-standard')
+class TestServiceOrderBenchmark(TransactionCase):
+    """Benchmarks, ejecutar con ``--test-tags modulo_benchmark``"""
+
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Benchmark Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'Benchmark Type', 'duration': 1.0})
+
+    def _order_vals(self, count):
+        return [{
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+        } for _i in range(count)]
+
+    def test_benchmark_order_creation_throughput(self):
+        """Comparar la asignación de secuencia por orden con la reserva por bloque"""
+        Sequence = self.env['ir.sequence']
+        for count in (1000, 10000):
+            vals_list = self._order_vals(count)
+            start = time.perf_counter()
+            for vals in vals_list:
+                vals['name'] = Sequence.next_by_code('service.order')
+            self.env['service.order'].create(vals_list)
+            self.env.flush_all()
+            per_order = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.env['service.order'].create(self._order_vals(count))
+            self.env.flush_all()
+            batched = time.perf_counter() - start
+
+            _logger.info(
+                "service.order create x%s: per-order sequence %.0f orders/s, batched sequence %.0f orders/s",
+                count, count / per_order, count / batched,
+            )
+
+    def test_benchmark_qr_scan_lookup(self):
+        """Comparar la resolución de tokens QR firmados con la búsqueda por nombre y cliente"""
+        ServiceOrder = self.env['service.order']
+        orders = ServiceOrder.create(self._order_vals(1000))
+        self.env.flush_all()
+        tokens = [order._get_qr_token() for order in orders]
+        legacy = ['%s|%s|%s' % (order.name, order.partner_id.name, order.date_requested) for order in orders]
+
+        self.env.invalidate_all()
+        start = time.perf_counter()
+        for token in tokens:
+            ServiceOrder.browse(ServiceOrder._resolve_qr_token(token)).exists()
+        signed = time.perf_counter() - start
+
+        self.env.invalidate_all()
+        start = time.perf_counter()
+        for qr_data in legacy:
+            order_ref, customer_name, _date = qr_data.split('|')
+            order = ServiceOrder.search([('name', '=', order_ref)], limit=1)
+            order.partner_id.name.lower() == customer_name.lower()
+        by_name = time.perf_counter() - start
+
+        _logger.info(
+            "QR scan lookup x%s: signed token %.3f ms/scan, legacy name+customer %.3f ms/scan",
+            len(tokens), signed * 1000 / len(tokens), by_name * 1000 / len(legacy),
+        )
+
+    def test_benchmark_batch_scheduler(self):
+        """Medir el planificador por lotes con 5.000 órdenes y 200 técnicos"""
+        self.env['hr.employee'].create([
+            {'name': 'Benchmark Technician %s' % i, 'is_technician': True} for i in range(200)
+        ])
+        orders = self.env['service.order'].create(self._order_vals(5000))
+        self.env.flush_all()
+
+        start = time.perf_counter()
+        unscheduled = self.env['service.order.scheduler'].schedule_orders(orders)
+        self.env.flush_all()
+        elapsed = time.perf_counter() - start
+
+        self.assertFalse(unscheduled, "Todas las órdenes deben caber en el horizonte")
+        _logger.info("Batch scheduler 5000 orders x 200 technicians: %.2f s", elapsed)
+
+    def test_benchmark_technician_performance_report(self):
+        """Medir el reporte de rendimiento de 200 técnicos sobre doce meses de órdenes completadas"""
+        technicians = self.env['hr.employee'].create([
+            {'name': 'Benchmark Technician %s' % i, 'is_technician': True} for i in range(200)
+        ])
+        now = fields.Datetime.now()
+        vals_list = []
+        for i in range(20000):
+            completed = now - timedelta(days=i % 365, hours=i % 7)
+            vals_list.append(dict(
+                self._order_vals(1)[0],
+                technician_id=technicians[i % 200].id,
+                state='completed',
+                date_started=completed - timedelta(hours=1),
+                date_completed=completed,
+            ))
+        self.env['service.order'].create(vals_list)
+        self.env.flush_all()
+        self.env.invalidate_all()
+
+        start = time.perf_counter()
+        report = self.env.ref('modulo.action_report_technician_performance')
+        report._render_qweb_html(report.report_name, technicians.ids)
+        elapsed = time.perf_counter() - start
+
+        _logger.info("Technician performance report x200 technicians, 20000 orders: %.2f s", elapsed)
+
+    def test_benchmark_batch_invoicing(self):
+        """Comparar la facturación orden por orden con la facturación por lotes de 10.000 órdenes"""
+        product = self.env['product.product'].create({'name': 'Benchmark Service', 'lst_price': 50.0, 'type': 'service'})
+        self.service_type.product_id = product
+        partners = self.env['res.partner'].create([{'name': 'Benchmark Customer %s' % i} for i in range(20)])
+        Integration = self.env['account.integration']
+
+        orders = self.env['service.order'].create([
+            dict(vals, partner_id=partners[i % 20].id) for i, vals in enumerate(self._order_vals(1000))
+        ])
+        self.env.flush_all()
+        start = time.perf_counter()
+        for order in orders:
+            Integration.create_invoice_from_service_order(order)
+        self.env.flush_all()
+        per_order = time.perf_counter() - start
+
+        orders = self.env['service.order'].create([
+            dict(vals, partner_id=partners[i % 20].id) for i, vals in enumerate(self._order_vals(10000))
+        ])
+        self.env.flush_all()
+        start = time.perf_counter()
+        invoices = Integration.create_invoices_from_service_orders(orders, ())
+        self.env.flush_all()
+        batched = time.perf_counter() - start
+
+        self.assertEqual(len(invoices), 20)
+        _logger.info(
+            "Invoicing: per-order %.0f orders/s (x1000), batched by partner %.0f orders/s (x10000, %s invoices)",
+            1000 / per_order, 10000 / batched, len(invoices),
+        )
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+from datetime import datetime, timedelta
+from odoo.addons.modulo.models.service_route_planner import (
+    distance_matrix, haversine_km, nearest_neighbour_route, route_length, two_opt,
+)
+from odoo.addons.modulo.tests.test_technician_availability import create_test_calendar
+
+
+@tagged('post_install', '-at_install')
+class TestServiceRoutePlanner(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.planner = self.env['service.route.planner']
+        self.service_type = self.env['service.type'].create({'name': 'Route Type', 'duration': 1.0})
+        self.technician = self.env['hr.employee'].create({
+            'name': 'Route Technician',
+            'is_technician': True,
+            'resource_calendar_id': create_test_calendar(self.env).id,
+        })
+        self.day = fields.Date.today() + timedelta(days=1)
+        self.start = fields.Datetime.to_datetime(self.day).replace(hour=8)
+
+    def _create_route_orders(self, visits, state='scheduled'):
+        """Órdenes del técnico en clientes sobre una línea, a partir de ``(longitud, hora de inicio)``"""
+        return self.env['service.order'].create([{
+            'partner_id': self.env['res.partner'].create({
+                'name': 'Route Customer %s' % longitude,
+                'partner_latitude': 40.0,
+                'partner_longitude': longitude,
+            }).id,
+            'service_type_id': self.service_type.id,
+            'technician_id': self.technician.id,
+            'date_scheduled': self.start.replace(hour=hour),
+            'state': state,
+        } for longitude, hour in visits])
+
+    def test_solver_improves_route(self):
+        """Probar que 2-opt nunca empeora la ruta del vecino más cercano y visita todos los puntos"""
+        points = [(40.0 + (i * 7 % 11) / 100.0, -3.7 + (i * 5 % 13) / 100.0) for i in range(40)]
+        matrix = distance_matrix(points)
+        greedy = nearest_neighbour_route(matrix)
+        optimized = two_opt(greedy, matrix)
+
+        self.assertEqual(sorted(optimized), list(range(len(points))), "La ruta debe visitar cada punto una vez")
+        self.assertEqual(optimized[0], 0, "El punto de partida no debe moverse")
+        self.assertLessEqual(route_length(optimized, matrix), route_length(greedy, matrix))
+        self.assertAlmostEqual(haversine_km((40.4168, -3.7038), (41.3874, 2.1686)), 505, delta=1)
+
+    def test_plan_routes_orders_visits_by_distance(self):
+        """Probar que las visitas del día se reordenan siguiendo la ruta y se reprograman con el viaje"""
+        # Clientes sobre una línea, programados en orden alterno
+        longitudes = [-3.70, -3.50, -3.65, -3.55, -3.60]
+        orders = self.env['service.order']
+        for i, longitude in enumerate(longitudes):
+            partner = self.env['res.partner'].create({
+                'name': 'Route Customer %s' % i,
+                'partner_latitude': 40.0,
+                'partner_longitude': longitude,
+            })
+            orders |= self.env['service.order'].create({
+                'partner_id': partner.id,
+                'service_type_id': self.service_type.id,
+                'technician_id': self.technician.id,
+                'date_scheduled': self.start + timedelta(hours=i),
+                'state': 'scheduled',
+            })
+
+        schedule = self.planner.plan_routes(self.day, self.technician)
+
+        self.assertEqual(set(schedule), set(orders.ids))
+        visits = orders.sorted('date_scheduled')
+        self.assertEqual(visits.mapped('partner_id.partner_longitude'), sorted(longitudes),
+                         "La ruta debe recorrer los clientes de oeste a este sin retrocesos")
+        self.assertEqual(visits[0].date_scheduled, self.start, "La primera visita conserva su hora")
+        for previous, current in zip(visits, visits[1:]):
+            self.assertGreater(current.date_scheduled, previous.date_scheduled_end, "Falta el tiempo de viaje")
+
+    def test_plan_routes_updates_write_date(self):
+        """Probar que la reprogramación de la ruta actualiza la fecha de modificación de las órdenes"""
+        orders = self.env['service.order'].create([{
+            'partner_id': self.env['res.partner'].create({'name': 'Route Stamp %s' % i}).id,
+            'service_type_id': self.service_type.id,
+            'technician_id': self.technician.id,
+            'date_scheduled': self.start + timedelta(hours=i),
+            'state': 'scheduled',
+        } for i in range(2)])
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE service_order SET write_date = %s, write_uid = NULL WHERE id IN %s",
+                            (datetime(2000, 1, 1), tuple(orders.ids)))
+        orders.invalidate_recordset(['write_date', 'write_uid'])
+
+        self.planner.plan_routes(self.day, self.technician)
+        for order in orders:
+            self.assertGreater(order.write_date, datetime(2000, 1, 1), "El cambio debe ser visible por write_date")
+            self.assertEqual(order.write_uid, self.env.user)
+
+    def test_plan_routes_keeps_orders_in_progress(self):
+        """Probar que la ruta no se reordena si una visita pisaría una orden en curso"""
+        orders = self._create_route_orders([(-3.70, 8), (-3.50, 12), (-3.69, 13)])
+        self._create_route_orders([(-3.60, 9)], state='in_progress')
+        dates = orders.mapped('date_scheduled')
+
+        schedule = self.planner.plan_routes(self.day, self.technician)
+        self.assertFalse(schedule, "La visita cercana caería a las 9:05, durante la orden en curso")
+        self.assertEqual(orders.mapped('date_scheduled'), dates)
+
+    def test_plan_routes_respects_working_hours(self):
+        """Probar que la ruta no se reordena si terminaría fuera de la jornada"""
+        orders = self._create_route_orders([(-3.70, 15), (-3.30, 16), (-3.69, 17)])
+        dates = orders.mapped('date_scheduled')
+
+        schedule = self.planner.plan_routes(self.day, self.technician)
+        self.assertFalse(schedule, "Con el viaje de vuelta al este la última visita acabaría después de las 18:00")
+        self.assertEqual(orders.mapped('date_scheduled'), dates)
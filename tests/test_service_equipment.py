@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 from odoo.tests import TransactionCase, tagged
+from odoo import fields
 from datetime import datetime, timedelta
 from odoo.exceptions import ValidationError, UserError
+from odoo.addons.modulo.models.report_equipment_history import HISTORY_PAGE_SIZE
 
 @tagged('post_install', '-at_install')
 class TestServiceEquipment(TransactionCase):
@@ -268,3 +270,113 @@ class TestServiceEquipment(TransactionCase):
         # Verificar que el equipo fue eliminado
         found_equipment = self.env['service.equipment'].search([('id', '=', equipment_id)])
         self.assertEqual(len(found_equipment), 0, "El equipo no fue eliminado correctamente")
+
+
+@tagged('post_install', '-at_install')
+class TestWarrantyExpiration(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.Equipment = self.env['service.equipment']
+        today = fields.Date.today()
+        self.customer = self.env['res.partner'].create({'name': 'Warranty Customer', 'email': 'warranty@example.com'})
+        self.other_customer = self.env['res.partner'].create({'name': 'Other Warranty Customer', 'email': 'other@example.com'})
+        self.expiring = self.Equipment.create([{
+            'name': 'Unit %s' % i,
+            'partner_id': self.customer.id,
+            'warranty_end': today + timedelta(days=5 + i),
+        } for i in range(10)])
+        self.other_expiring = self.Equipment.create({
+            'name': 'Other Unit',
+            'partner_id': self.other_customer.id,
+            'warranty_end': today + timedelta(days=20),
+        })
+        self.not_expiring = self.Equipment.create({
+            'name': 'Later Unit',
+            'partner_id': self.customer.id,
+            'warranty_end': today + timedelta(days=90),
+        })
+
+    def _digests(self, partner):
+        return self.env['mail.mail'].search([('model', '=', 'res.partner'), ('res_id', '=', partner.id)])
+
+    def test_one_digest_per_partner(self):
+        """Probar que cada cliente recibe un solo correo y una sola actividad con todos sus equipos"""
+        self.assertEqual(self.Equipment._check_warranty_expiration(), 11)
+
+        self.assertEqual(len(self._digests(self.customer)), 1, "Un solo correo por cliente")
+        self.assertEqual(len(self._digests(self.other_customer)), 1)
+        body = self._digests(self.customer).body_html
+        self.assertTrue(all(equipment.name in body for equipment in self.expiring), "El resumen debe listar todos los equipos")
+        self.assertNotIn(self.not_expiring.name, body)
+
+        activities = self.env['mail.activity'].search([('res_model', '=', 'res.partner'), ('res_id', '=', self.customer.id)])
+        self.assertEqual(len(activities), 1, "Una sola actividad por cliente")
+
+    def test_notified_equipment_is_skipped(self):
+        """Probar que la marca de notificación evita reprocesar equipos y se reinicia al prorrogar la garantía"""
+        self.Equipment._check_warranty_expiration()
+        self.assertEqual(self.expiring[0].warranty_notified_end, self.expiring[0].warranty_end)
+        self.assertFalse(self.not_expiring.warranty_notified_end)
+
+        self.assertEqual(self.Equipment._check_warranty_expiration(), 0, "La segunda ejecución no debe notificar nada")
+
+        self.expiring[0].warranty_end += timedelta(days=1)
+        self.assertEqual(self.Equipment._check_warranty_expiration(), 1)
+
+
+@tagged('post_install', '-at_install')
+class TestEquipmentHistoryReport(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        partner = self.env['res.partner'].create({'name': 'History Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'History Type', 'duration': 1.0})
+        self.equipment = self.env['service.equipment'].create([
+            {'name': 'History Unit %s' % i, 'partner_id': partner.id} for i in range(10)
+        ])
+        start = datetime(2024, 1, 1, 9, 0, 0)
+        self.env['service.order'].create([{
+            'partner_id': partner.id,
+            'service_type_id': self.service_type.id,
+            'equipment_id': equipment.id,
+            'date_requested': start + timedelta(days=day),
+            'date_started': start + timedelta(days=day),
+            'date_completed': start + timedelta(days=day, hours=2),
+            'state': 'completed',
+        } for i, equipment in enumerate(self.equipment) for day in range(i)])
+        self.report = self.env['report.modulo.report_equipment_history_document']
+
+    def test_report_values(self):
+        """Probar las estadísticas agregadas y el historial paginado de cada equipo"""
+        unit = self.equipment[-1]
+        self.env['service.order'].create([{
+            'partner_id': unit.partner_id.id,
+            'service_type_id': self.service_type.id,
+            'equipment_id': unit.id,
+            'date_requested': datetime(2025, 1, 1, 9, 0, 0) + timedelta(hours=i),
+        } for i in range(HISTORY_PAGE_SIZE)])
+
+        values = self.report._get_report_values(self.equipment.ids)
+        stats = values['stats'][unit.id]
+        self.assertEqual((stats['order_count'], stats['completed_count']), (HISTORY_PAGE_SIZE + 9, 9))
+        self.assertAlmostEqual(stats['average_duration'], 2.0)
+        self.assertEqual(stats['last_state'], 'Draft', "El último estado es el de la orden más reciente")
+
+        pages = values['history_pages'][unit.id]
+        self.assertEqual([len(page) for page in pages], [HISTORY_PAGE_SIZE, 9])
+        self.assertEqual(pages[0][0]['date_requested'], datetime(2025, 1, 1, 9, 0, 0) + timedelta(hours=HISTORY_PAGE_SIZE - 1))
+        self.assertEqual(values['history_pages'][self.equipment[0].id], [], "Sin órdenes no hay páginas")
+        self.assertEqual(values['stats'][self.equipment[0].id]['order_count'], 0)
+
+    def test_query_count_is_constant(self):
+        """Probar que el número de consultas no depende del número de equipos impresos"""
+        def count_queries(equipment):
+            self.env.invalidate_all()
+            queries = self.env.cr.sql_log_count
+            self.report._get_report_values(equipment.ids)
+            return self.env.cr.sql_log_count - queries
+
+        self.assertEqual(count_queries(self.equipment), count_queries(self.equipment[:2]))
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
+from odoo import fields
 from odoo.tests import TransactionCase, tagged
 from datetime import datetime, timedelta
 from odoo.exceptions import ValidationError, UserError
+from odoo.addons.modulo.tests.test_technician_availability import create_test_calendar
 
 @tagged('post_install', '-at_install')
 class TestServiceWorkflows(TransactionCase):
@@ -364,3 +366,170 @@ class TestServiceWorkflows(TransactionCase):
         ])
         completed_msg = messages.filtered(lambda m: 'completed' in m.body.lower())
         self.assertTrue(completed_msg, "No se encontró mensaje de completado")
+
+
+@tagged('post_install', '-at_install')
+class TestServiceReminders(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.partner = self.env['res.partner'].create({'name': 'Reminder Partner', 'email': 'reminder@example.com'})
+        self.service_type = self.env['service.type'].create({'name': 'Reminder Type', 'duration': 1.0})
+        user = self.env['res.users'].create({'name': 'Reminder Technician', 'login': 'reminder_technician'})
+        self.technician = self.env['hr.employee'].create({
+            'name': 'Reminder Technician',
+            'is_technician': True,
+            'user_id': user.id,
+        })
+        now = fields.Datetime.now()
+        self.orders = self.env['service.order'].create([{
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+            'technician_id': self.technician.id,
+            'date_scheduled': now + timedelta(hours=2 + 3 * i),
+            'state': 'scheduled',
+        } for i in range(5)])
+        # Fuera de la ventana de 24 horas
+        self.env['service.order'].create({
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+            'technician_id': self.technician.id,
+            'date_scheduled': now + timedelta(days=3),
+            'state': 'scheduled',
+        })
+
+    def _reminded(self, orders):
+        activities = self.env['mail.activity'].search([('res_model', '=', 'service.order'), ('res_id', 'in', orders.ids)])
+        mails = self.env['mail.mail'].search([('model', '=', 'service.order'), ('res_id', 'in', orders.ids)])
+        return set(activities.mapped('res_id')), set(mails.mapped('res_id'))
+
+    def test_reminders_in_chunks(self):
+        """Probar que cada orden de la ventana recibe un correo y una actividad, procesando por lotes"""
+        count = self.env['service.order']._send_service_reminders(batch_size=2)
+
+        self.assertEqual(count, 5)
+        self.assertEqual(self._reminded(self.orders), (set(self.orders.ids), set(self.orders.ids)))
+        self.assertEqual(self.orders.reminder_ids.mapped('kind'), ['day_before'] * 5)
+
+    def test_reminders_are_sent_once(self):
+        """Probar que las órdenes ya recordadas no se vuelven a notificar y que una ejecución interrumpida continúa"""
+        # Simular una ejecución interrumpida tras el primer lote
+        self.env['service.order.reminder']._claim(self.orders[:3].ids, 'day_before')
+
+        self.assertEqual(self.env['service.order']._send_service_reminders(), 2)
+        activities, mails = self._reminded(self.orders)
+        self.assertEqual(activities, set(self.orders[3:].ids))
+        self.assertEqual(mails, set(self.orders[3:].ids))
+
+        self.assertEqual(self.env['service.order']._send_service_reminders(), 0, "Nada pendiente en la segunda ejecución")
+
+        # Reprogramar una orden la vuelve a dejar pendiente
+        self.orders[0].date_scheduled += timedelta(hours=1)
+        self.assertEqual(self.env['service.order']._send_service_reminders(), 1)
+
+    def test_rescheduled_by_scheduler_is_reminded_again(self):
+        """Probar que una orden reprogramada por el planificador por lotes vuelve a recibir su recordatorio"""
+        self.technician.resource_calendar_id = create_test_calendar(self.env)
+        order = self.env['service.order'].create({
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+            'technician_id': self.technician.id,
+        })
+        # Recordatorio de una programación anterior de la orden
+        self.env['service.order.reminder']._claim(order.ids, 'day_before')
+
+        start = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        self.env['service.order.scheduler'].schedule_orders(order, start_date=start)
+        self.assertEqual(order.state, 'scheduled')
+        self.assertFalse(order.reminder_ids, "La nueva fecha libera el recordatorio anterior")
+
+        self.env['service.order']._send_service_reminders()
+        activities, mails = self._reminded(order)
+        self.assertEqual((activities, mails), ({order.id}, {order.id}))
+
+    def test_reminder_template_renders(self):
+        """Probar que la plantilla de recordatorio se interpreta con la sintaxis de Odoo 17"""
+        order = self.orders[0]
+        template = self.env.ref('modulo.email_template_service_reminder')
+
+        self.assertEqual(template._render_field('email_to', order.ids)[order.id], 'reminder@example.com')
+        self.assertEqual(template._render_field('subject', order.ids)[order.id], 'Service Reminder - %s' % order.name)
+        body = template._render_field('body_html', order.ids)[order.id]
+        self.assertIn('Reminder Partner', body)
+        self.assertNotIn('${', body, "No deben quedar marcadores sin interpretar")
+
+
+@tagged('post_install', '-at_install')
+class TestMonthlyServiceReport(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.MONTH = datetime(2024, 3, 1).date()
+        partner = self.env['res.partner'].create({'name': 'Report Partner'})
+        self.product = self.env['product.product'].create({'name': 'Report Part', 'lst_price': 50.0})
+        self.types = self.env['service.type'].create([{'name': 'Report Type %s' % i, 'duration': 1.0} for i in range(2)])
+        self.technicians = self.env['hr.employee'].create([
+            {'name': 'Report Technician %s' % i, 'is_technician': True} for i in range(2)
+        ])
+        vals_list = []
+        for i in range(8):
+            start = datetime(2024, 3, 4 + i, 9, 0, 0)
+            vals_list.append({
+                'partner_id': partner.id,
+                'service_type_id': self.types[i % 2].id,
+                'technician_id': self.technicians[i // 4].id,
+                'date_requested': start,
+                'date_started': start,
+                'date_completed': start + timedelta(hours=2),
+                'state': 'completed' if i < 6 else 'scheduled',
+                'refaction_line_ids': [(0, 0, {'product_id': self.product.id, 'quantity': 2, 'unit_price': 50.0})],
+            })
+        # Fuera del mes y cancelada: no cuentan
+        vals_list.append(dict(vals_list[0], date_requested=datetime(2024, 4, 2, 9, 0, 0)))
+        vals_list.append(dict(vals_list[0], state='cancelled'))
+        self.orders = self.env['service.order'].create(vals_list)
+
+    def test_snapshot_grouped_by_type_and_technician(self):
+        """Probar que el reporte mensual agrega por tipo de servicio y técnico en una instantánea persistente"""
+        lines = self.env['service.report.monthly']._refresh_month(self.MONTH)
+
+        self.assertEqual(len(lines), 4, "Una línea por tipo de servicio y técnico")
+        self.assertEqual(sum(lines.mapped('order_count')), 8)
+        self.assertEqual(sum(lines.mapped('completed_count')), 6)
+        self.assertAlmostEqual(sum(lines.mapped('refaction_amount')), 800.0)
+        line = lines.filtered(lambda l: l.service_type_id == self.types[0] and l.technician_id == self.technicians[0])
+        self.assertEqual((line.order_count, line.completed_count), (2, 2))
+        self.assertAlmostEqual(line.average_duration, 2.0)
+
+        # Regenerar el mes reemplaza la instantánea en lugar de duplicarla
+        self.orders[0].state = 'cancelled'
+        lines = self.env['service.report.monthly']._refresh_month(self.MONTH)
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(sum(lines.mapped('order_count')), 7)
+
+    def test_grouped_invoice_with_cancelled_order(self):
+        """Probar que el importe de una factura agrupada se reparte solo entre sus órdenes no canceladas"""
+        invoice = self.env['account.move'].create({
+            'move_type': 'out_invoice',
+            'partner_id': self.orders[0].partner_id.id,
+            'invoice_line_ids': [(0, 0, {'name': 'Grouped Services', 'quantity': 1, 'price_unit': 300.0, 'tax_ids': []})],
+        })
+        (self.orders[0] | self.orders[2] | self.orders[-1]).write({'invoice_id': invoice.id})
+
+        lines = self.env['service.report.monthly']._refresh_month(self.MONTH)
+        self.assertAlmostEqual(sum(lines.mapped('invoiced_amount')), 300.0,
+                               msg="La orden cancelada no debe quedarse con parte de la factura")
+
+    def test_monthly_report_mail(self):
+        """Probar que el cron envía el resumen del mes a la compañía"""
+        self.env.company.email = 'company@example.com'
+        summary = self.env['service.order.business.logic']._generate_monthly_service_report(self.MONTH)
+
+        self.assertEqual(summary['total_orders'], 8)
+        self.assertEqual(summary['completed_orders'], 6)
+        self.assertAlmostEqual(summary['average_duration'], 2.0)
+        mail = self.env['mail.mail'].search([('model', '=', 'res.company'), ('res_id', '=', self.env.company.id)])
+        self.assertEqual(len(mail), 1)
+        self.assertIn(summary['report_month'], mail.subject)
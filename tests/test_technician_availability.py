@@ -0,0 +1,485 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+from datetime import datetime, timedelta
+from odoo.addons.modulo.models.service_type import ELIGIBILITY_VERSION_SEQUENCE
+
+
+def create_test_calendar(env):
+    """Calendario UTC de 8:00 a 18:00 todos los días, para que los huecos no dependan de la fecha"""
+    return env['resource.calendar'].create({
+        'name': 'Technician Test Calendar',
+        'tz': 'UTC',
+        'attendance_ids': [(5, 0, 0)] + [(0, 0, {
+            'name': 'Day %s' % day,
+            'dayofweek': str(day),
+            'hour_from': 8,
+            'hour_to': 18,
+            'day_period': 'morning',
+        }) for day in range(7)],
+    })
+
+
+@tagged('post_install', '-at_install')
+class TestTechnicianAvailability(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.hr_integration = self.env['hr.integration']
+        self.partner = self.env['res.partner'].create({'name': 'Availability Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'Availability Type', 'duration': 2.0})
+        self.calendar = create_test_calendar(self.env)
+        self.env['ir.config_parameter'].sudo().set_param('modulo.scheduling_horizon_days', 7)
+        technician_vals = {'is_technician': True, 'resource_calendar_id': self.calendar.id, 'tz': 'UTC'}
+        self.technician = self.env['hr.employee'].create(dict(technician_vals, name='Busy Technician'))
+        self.other_technician = self.env['hr.employee'].create(dict(technician_vals, name='Free Technician'))
+
+        # Mañana a las 8:00, igual que find_next_available_slot
+        self.base = (fields.Datetime.now() + timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+        busy = [
+            (0, 8, 2, 'scheduled'),
+            (0, 9, 3, 'in_progress'),
+            (1, 8, 10, 'scheduled'),
+            (2, 14, 2, 'completed'),
+            (3, 7, 2, 'cancelled'),
+            (4, 13, 1.5, 'scheduled'),
+        ]
+        service_types = {}
+        for day, start_hour, duration, state in busy:
+            if duration not in service_types:
+                service_types[duration] = self.env['service.type'].create({
+                    'name': 'Availability Type %sh' % duration,
+                    'duration': duration,
+                })
+            self.env['service.order'].create({
+                'partner_id': self.partner.id,
+                'service_type_id': service_types[duration].id,
+                'technician_id': self.technician.id,
+                'date_scheduled': self.base.replace(hour=start_hour) + timedelta(days=day),
+                'state': state,
+            })
+        # Orden sin fecha de finalización real: ocupa al técnico durante la duración prevista
+        self.env['service.order'].create({
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+            'technician_id': self.technician.id,
+            'date_scheduled': self.base + timedelta(days=5),
+            'state': 'scheduled',
+        })
+
+    def test_index_matches_query_availability(self):
+        """Probar que el índice en memoria responde igual que la consulta SQL"""
+        technicians = self.technician | self.other_technician
+        index = self.hr_integration._build_availability_index(technicians, fields.Datetime.now())
+
+        for technician in technicians:
+            for day in range(7):
+                for hour in range(6, 20):
+                    for duration in (0.5, 1, 2, 4):
+                        start = self.base.replace(hour=hour) + timedelta(days=day)
+                        end = start + timedelta(hours=duration)
+                        self.assertEqual(
+                            self.hr_integration.check_technician_availability(technician, start, end, index=index),
+                            self.hr_integration.check_technician_availability(technician, start, end),
+                            "El índice y la consulta difieren para %s entre %s y %s" % (technician.name, start, end),
+                        )
+
+    def test_next_slot_matches_query_search(self):
+        """Probar que la búsqueda del siguiente hueco coincide con una búsqueda exhaustiva por consultas"""
+        for duration in (1, 2, 4, 11):
+            expected = None
+            for step in range(7 * 48):
+                start = self.base.replace(hour=0) + timedelta(minutes=30 * step)
+                end = start + timedelta(hours=duration)
+                if start.hour < 8 or end > start.replace(hour=18):
+                    continue
+                if self.hr_integration.check_technician_availability(self.technician, start, end):
+                    expected = (start, end)
+                    break
+            self.assertEqual(
+                self.hr_integration.find_next_available_slot(self.technician, duration), expected,
+                "Siguiente hueco incorrecto para una duración de %s horas" % duration,
+            )
+
+    def test_next_slot_skips_leaves(self):
+        """Probar que las ausencias del técnico no se ofrecen como huecos"""
+        self.env['resource.calendar.leaves'].create({
+            'name': 'Technician Leave',
+            'calendar_id': self.calendar.id,
+            'resource_id': self.other_technician.resource_id.id,
+            'date_from': self.base.replace(hour=0),
+            'date_to': self.base.replace(hour=12),
+        })
+        self.assertEqual(
+            self.hr_integration.find_next_available_slot(self.other_technician, 2),
+            (self.base.replace(hour=12), self.base.replace(hour=14)),
+        )
+
+    def test_index_add_interval(self):
+        """Probar que los intervalos añadidos durante un lote ocupan al técnico"""
+        index = self.hr_integration._build_availability_index(self.other_technician)
+        start = self.base + timedelta(days=10)
+        self.assertTrue(index.is_available(self.other_technician.id, start, start + timedelta(hours=2)))
+
+        index.add(self.other_technician.id, start, start + timedelta(hours=2))
+        self.assertFalse(index.is_available(self.other_technician.id, start + timedelta(hours=1), start + timedelta(hours=3)))
+        self.assertTrue(index.is_available(self.other_technician.id, start + timedelta(hours=2), start + timedelta(hours=3)))
+
+
+@tagged('post_install', '-at_install')
+class TestServiceOrderScheduler(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.scheduler = self.env['service.order.scheduler']
+        # Solo los técnicos del test participan en el reparto
+        self.env['hr.employee'].search([('is_technician', '=', True)]).write({'is_technician': False})
+        self.partner = self.env['res.partner'].create({'name': 'Scheduler Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'Scheduler Type', 'duration': 3.0})
+        calendar = create_test_calendar(self.env)
+        self.technicians = self.env['hr.employee'].create([{
+            'name': 'Scheduler Technician %s' % i,
+            'is_technician': True,
+            'resource_calendar_id': calendar.id,
+            'tz': 'UTC',
+        } for i in range(3)])
+        self.start = (fields.Datetime.now() + timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+
+    def _create_orders(self, count, **vals):
+        return self.env['service.order'].create([dict({
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+        }, **vals) for _i in range(count)])
+
+    def test_batch_assignment_is_balanced(self):
+        """Probar que el lote se reparte entre técnicos sin solapamientos ni salir de la jornada"""
+        orders = self._create_orders(12)
+        unscheduled = self.scheduler.schedule_orders(orders, start_date=self.start)
+
+        self.assertFalse(unscheduled, "Todas las órdenes deben quedar programadas")
+        self.assertEqual(set(orders.mapped('state')), {'scheduled'})
+        for technician in self.technicians:
+            assigned = orders.filtered(lambda o: o.technician_id == technician).sorted('date_scheduled')
+            self.assertEqual(len(assigned), 4, "La carga debe repartirse por igual entre los técnicos")
+            for previous, current in zip(assigned, assigned[1:]):
+                self.assertLessEqual(previous.date_scheduled_end, current.date_scheduled, "Órdenes solapadas")
+            for order in assigned:
+                self.assertGreaterEqual(order.date_scheduled.hour, 8, "Orden antes de la jornada laboral")
+                self.assertLessEqual(order.date_scheduled_end, order.date_scheduled.replace(hour=18),
+                                     "Orden fuera de la jornada laboral")
+
+    def test_assignment_updates_write_date(self):
+        """Probar que la asignación por lotes actualiza la fecha de modificación de las órdenes"""
+        orders = self._create_orders(3)
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE service_order SET write_date = %s WHERE id IN %s",
+                            (datetime(2000, 1, 1), tuple(orders.ids)))
+        orders.invalidate_recordset(['write_date'])
+
+        self.scheduler.schedule_orders(orders, start_date=self.start)
+        self.assertTrue(all(order.write_date > datetime(2000, 1, 1) for order in orders))
+
+        # Las fechas escritas en bloque también marcan la orden como modificada
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE service_order SET write_date = %s WHERE id IN %s",
+                            (datetime(2000, 1, 1), tuple(orders.ids)))
+        orders.invalidate_recordset(['write_date'])
+        orders._bulk_write_values('date_scheduled', {order.id: order.date_scheduled + timedelta(days=1) for order in orders})
+        self.assertTrue(all(order.write_date > datetime(2000, 1, 1) for order in orders))
+
+    def test_priority_and_existing_load(self):
+        """Probar que las urgentes se atienden antes y que se respeta la carga existente"""
+        busy = self.technicians[0]
+        self._create_orders(1, technician_id=busy.id, date_scheduled=self.start, state='scheduled')
+        low = self._create_orders(2, priority='low')
+        urgent = self._create_orders(2, priority='urgent')
+
+        self.scheduler.schedule_orders(low | urgent, start_date=self.start)
+
+        self.assertNotIn(busy, urgent.technician_id, "El técnico ocupado no es el menos cargado")
+        self.assertEqual(set(urgent.mapped('date_scheduled')), {self.start}, "Las urgentes deben ir primero")
+        self.assertTrue(all(order.date_scheduled >= self.start for order in low))
+
+    def test_skill_eligibility(self):
+        """Probar que solo se asignan técnicos con la especialidad y certificación vigentes"""
+        today = fields.Date.context_today(self.env['service.type'])
+        service_type = self.env['service.type'].create({
+            'name': 'HVAC Type',
+            'duration': 2.0,
+            'required_specialization': 'HVAC',
+            'required_certification': 'EPA 608',
+        })
+        qualified, expired, unskilled = self.technicians
+        qualified.write({'specialization': 'Electrical, HVAC', 'certification': 'epa 608',
+                         'certification_expiry': today + timedelta(days=30)})
+        expired.write({'specialization': 'hvac', 'certification': 'EPA 608',
+                       'certification_expiry': today - timedelta(days=1)})
+        unskilled.write({'specialization': 'Plumbing'})
+
+        self.assertEqual(service_type._get_eligible_technicians(), {qualified.id})
+        self.assertEqual(self.service_type._get_eligible_technicians(), set(self.technicians.ids),
+                         "Un tipo sin requisitos admite a todos los técnicos")
+
+        orders = self._create_orders(3, service_type_id=service_type.id)
+        self.scheduler.schedule_orders(orders, start_date=self.start)
+        self.assertEqual(orders.technician_id, qualified, "Solo el técnico cualificado puede recibir las órdenes")
+
+        # Renovar la certificación vuelve a hacer elegible al técnico
+        expired.certification_expiry = today + timedelta(days=365)
+        self.assertEqual(service_type._get_eligible_technicians(), {qualified.id, expired.id})
+
+    def test_eligibility_cache_is_targeted(self):
+        """Probar que los cambios de técnicos solo invalidan la elegibilidad, y solo si la afectan"""
+        def eligibility_version():
+            self.env.cr.execute("SELECT last_value FROM %s" % ELIGIBILITY_VERSION_SEQUENCE)
+            return self.env.cr.fetchone()[0]
+
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param('modulo.api_key', 'eligibility-secret')
+        ICP._match_service_api_key('eligibility-secret')
+        version = eligibility_version()
+
+        self.technicians[0].technician_code = 'T-001'
+        self.assertEqual(eligibility_version(), version, "Un campo ajeno a la elegibilidad no debe invalidarla")
+
+        self.technicians[0].specialization = 'HVAC'
+        self.assertNotEqual(eligibility_version(), version, "Cambiar la especialidad debe invalidar la elegibilidad")
+        version = eligibility_version()
+        self.technicians[0].specialization = 'HVAC'
+        self.service_type.write({'required_specialization': self.service_type.required_specialization})
+        self.assertEqual(eligibility_version(), version, "Reescribir el mismo valor no debe invalidar la elegibilidad")
+        queries = self.env.cr.sql_log_count
+        self.assertEqual(ICP._match_service_api_key('eligibility-secret'), 'default')
+        self.assertEqual(self.env.cr.sql_log_count, queries, "La caché de claves API no debe vaciarse")
+
+
+@tagged('post_install', '-at_install')
+class TestServiceOrderConflicts(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.business_logic = self.env['service.order.business.logic']
+        self.partner = self.env['res.partner'].create({'name': 'Conflict Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'Conflict Type', 'duration': 2.0})
+        self.equipment = self.env['service.equipment'].create({'name': 'Conflict Equipment', 'partner_id': self.partner.id})
+        calendar = create_test_calendar(self.env)
+        self.technician, self.other_technician = self.env['hr.employee'].create([{
+            'name': name,
+            'is_technician': True,
+            'resource_calendar_id': calendar.id,
+            'tz': 'UTC',
+        } for name in ('Conflict Technician', 'Other Conflict Technician')])
+        self.start = (fields.Datetime.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+        self.booked = self.env['service.order'].create({
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+            'equipment_id': self.equipment.id,
+            'technician_id': self.technician.id,
+            'date_scheduled': self.start,
+            'state': 'scheduled',
+        })
+        self.order = self.env['service.order'].create({
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+            'technician_id': self.technician.id,
+        })
+
+    def test_conflicts_without_side_effects(self):
+        """Probar los tres tipos de conflicto sin modificar ni copiar la orden"""
+        order_count = self.env['service.order'].search_count([])
+
+        conflicts = self.business_logic.check_service_order_conflicts(self.order, start=self.start + timedelta(hours=1))
+        self.assertEqual([c['type'] for c in conflicts], ['technician'])
+        self.assertIn('Overlapping', conflicts[0]['reason'])
+        self.assertEqual(conflicts[0]['order_id'], self.booked.id)
+
+        self.order.equipment_id = self.equipment
+        conflicts = self.business_logic.check_service_order_conflicts(
+            self.order, technician=self.other_technician, start=self.start + timedelta(hours=1))
+        self.assertEqual([c['type'] for c in conflicts], ['equipment'])
+
+        conflicts = self.business_logic.check_service_order_conflicts(self.order, start=self.start.replace(hour=20))
+        self.assertEqual([c['type'] for c in conflicts], ['working_hours'])
+
+        self.assertFalse(self.order.date_scheduled, "La orden no debe modificarse")
+        self.assertEqual(self.env['service.order'].search_count([]), order_count, "No deben crearse órdenes")
+
+    def test_conflicts_batch_of_candidate_dates(self):
+        """Probar muchas fechas candidatas con un número de consultas constante"""
+        candidates = [(self.order, self.technician, self.start.replace(hour=8) + timedelta(minutes=30 * step), 1.0)
+                      for step in range(20)]
+
+        def count_queries(batch):
+            self.env.invalidate_all()
+            queries = self.env.cr.sql_log_count
+            results = self.business_logic.check_service_order_conflicts_batch(batch)
+            return self.env.cr.sql_log_count - queries, results
+
+        few_queries, _results = count_queries(candidates[:2])
+        queries, results = count_queries(candidates)
+        self.assertEqual(queries, few_queries, "Las consultas no deben crecer con el número de candidatos")
+
+        free = [candidate[2] for candidate, conflicts in zip(candidates, results) if not conflicts]
+        self.assertEqual(free[0], self.start.replace(hour=8))
+        self.assertNotIn(self.start.replace(hour=9), free)
+        self.assertIn(self.start.replace(hour=11), free)
+        self.assertNotIn(self.start.replace(hour=17, minute=30), free, "Termina después de la jornada")
+
+
+@tagged('post_install', '-at_install')
+class TestTechnicianCapacity(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.capacity = self.env['service.technician.capacity']
+        self.partner = self.env['res.partner'].create({'name': 'Capacity Partner'})
+        self.short_type = self.env['service.type'].create({'name': 'Short Type', 'duration': 2.0})
+        self.long_type = self.env['service.type'].create({'name': 'Long Type', 'duration': 3.0})
+        self.technician = self.env['hr.employee'].create({
+            'name': 'Capacity Technician',
+            'is_technician': True,
+            'resource_calendar_id': create_test_calendar(self.env).id,
+            'tz': 'UTC',
+        })
+        self.day = fields.Date.today() + timedelta(days=1)
+        self.start = fields.Datetime.to_datetime(self.day).replace(hour=8)
+
+    def _line(self, day):
+        return self.capacity.search([('technician_id', '=', self.technician.id), ('date', '=', day)])
+
+    def test_capacity_follows_order_changes(self):
+        """Probar que la capacidad se actualiza al crear, mover y cancelar órdenes"""
+        orders = self.env['service.order'].create([{
+            'partner_id': self.partner.id,
+            'service_type_id': service_type.id,
+            'technician_id': self.technician.id,
+            'date_scheduled': self.start + timedelta(hours=hour),
+            'state': 'scheduled',
+        } for service_type, hour in ((self.short_type, 0), (self.long_type, 3))])
+
+        line = self._line(self.day)
+        self.assertEqual((line.order_count, line.scheduled_hours, line.capacity_hours), (2, 5.0, 10.0))
+        self.assertAlmostEqual(line.utilization, 50.0)
+
+        # Mover una orden al día siguiente actualiza ambos días
+        orders[1].date_scheduled = self.start + timedelta(days=1)
+        self.assertEqual((self._line(self.day).order_count, self._line(self.day).scheduled_hours), (1, 2.0))
+        self.assertEqual(self._line(self.day + timedelta(days=1)).scheduled_hours, 3.0)
+
+        orders[0].action_cancel()
+        self.assertEqual(self._line(self.day).scheduled_hours, 0.0, "Las órdenes canceladas no ocupan capacidad")
+
+        utilization = self.capacity.get_utilization(self.technician, self.day, self.day + timedelta(days=1))
+        self.assertEqual(utilization[self.technician.id]['order_count'], 1)
+        self.assertAlmostEqual(utilization[self.technician.id]['utilization_rate'], 15.0)
+        self.assertAlmostEqual(utilization[self.technician.id]['orders_per_day'], 0.5)
+
+
+@tagged('post_install', '-at_install')
+class TestTechnicianKpi(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.kpi = self.env['service.technician.kpi']
+        self.partner = self.env['res.partner'].create({'name': 'KPI Partner'})
+        self.service_type = self.env['service.type'].create({'name': 'KPI Type', 'duration': 2.0})
+        self.technician = self.env['hr.employee'].create({'name': 'KPI Technician', 'is_technician': True})
+        self.equipment = self.env['service.equipment'].create({'name': 'KPI Equipment', 'partner_id': self.partner.id})
+        self.product = self.env['product.product'].create({'name': 'KPI Part', 'lst_price': 10.0})
+        self.start = fields.Datetime.to_datetime(fields.Date.today() - timedelta(days=10)).replace(hour=9)
+
+    def _complete(self, start, **vals):
+        order = self.env['service.order'].create(dict({
+            'partner_id': self.partner.id,
+            'service_type_id': self.service_type.id,
+            'technician_id': self.technician.id,
+            'date_requested': start,
+            'date_scheduled': start,
+            'state': 'in_progress',
+            'date_started': start,
+        }, **vals))
+        order.write({'date_completed': start + timedelta(hours=2), 'state': 'completed'})
+        return order
+
+    def test_rollup_follows_completions(self):
+        """Probar que las líneas diarias se actualizan al completar órdenes, añadir refacciones y recibir llamadas repetidas"""
+        order = self._complete(self.start, equipment_id=self.equipment.id)
+        line = self.kpi.search([('technician_id', '=', self.technician.id)])
+        self.assertEqual((line.completed_count, line.total_duration, line.planned_count, line.on_time_count), (1, 2.0, 1, 1))
+        self.assertEqual(line.repeat_count, 0)
+
+        self.env['service.order.refaction.line'].create({
+            'order_id': order.id, 'product_id': self.product.id, 'quantity': 3, 'unit_price': 10.0,
+        })
+        self.assertAlmostEqual(line.revenue, 30.0)
+
+        # Una nueva orden del mismo equipo a los pocos días es una llamada repetida de la primera visita
+        self._complete(self.start + timedelta(days=3, hours=4), equipment_id=self.equipment.id)
+        lines = self.kpi.search([('technician_id', '=', self.technician.id)], order='date')
+        self.assertEqual(lines.mapped('repeat_count'), [1, 0])
+
+        kpis = self.kpi.get_kpis(self.technician, self.start.date(), fields.Date.today())
+        self.assertEqual(kpis[self.technician.id][self.service_type]['completed_count'], 2)
+
+        order.action_cancel()
+        self.assertEqual(len(self.kpi.search([('technician_id', '=', self.technician.id)])), 1,
+                         "Las órdenes que dejan de estar completadas salen del indicador")
+
+    def test_service_price_frozen_on_completion(self):
+        """Probar que el precio se fija al completar la orden y se descarta si deja de estarlo"""
+        service_product = self.env['product.product'].create({'name': 'Frozen Service', 'lst_price': 80.0, 'type': 'service'})
+        self.service_type.product_id = service_product
+        order = self._complete(self.start)
+        created = self._complete(self.start, state='completed')
+        self.assertEqual((order.service_price, created.service_price), (80.0, 80.0))
+
+        service_product.lst_price = 90.0
+        order.write({'state': 'completed', 'notes': 'Revisada'})
+        self.assertEqual(order.service_price, 80.0, "Reescribir el estado no vuelve a leer el precio de lista")
+
+        order.write({'state': 'in_progress'})
+        self.assertEqual(order.service_price, 0.0)
+        order.write({'state': 'completed'})
+        self.assertEqual(order.service_price, 90.0)
+
+    def test_revenue_uses_completion_price(self):
+        """Probar que los ingresos usan el precio congelado al completar y coinciden con la factura"""
+        service_product = self.env['product.product'].create({'name': 'KPI Service', 'lst_price': 100.0, 'type': 'service'})
+        self.service_type.product_id = service_product
+        order = self._complete(self.start)
+        self.env['service.order.refaction.line'].create({
+            'order_id': order.id, 'product_id': self.product.id, 'quantity': 2, 'unit_price': 10.0,
+        })
+        self.assertEqual(order.service_price, 100.0)
+
+        # Un cambio posterior del precio de lista no altera las órdenes ya completadas
+        service_product.lst_price = 150.0
+        self.kpi._refresh(order._kpi_keys())
+        line = self.kpi.search([('technician_id', '=', self.technician.id)])
+        self.assertAlmostEqual(line.revenue, 120.0)
+
+        invoice = self.env['account.integration'].create_invoice_from_service_order(order)
+        self.assertAlmostEqual(invoice.amount_untaxed, line.revenue, msg="Los ingresos deben coincidir con la factura")
+
+    def test_performance_report_values(self):
+        """Probar que el reporte de rendimiento lee los indicadores agregados de cada técnico"""
+        self._complete(self.start, equipment_id=self.equipment.id)
+        self._complete(self.start + timedelta(days=2), equipment_id=self.equipment.id)
+        self._complete(self.start + timedelta(days=5))
+        idle = self.env['hr.employee'].create({'name': 'Idle Technician', 'is_technician': True})
+
+        report = self.env['report.modulo.report_technician_performance_document']
+        values = report._get_report_values((self.technician | idle).ids)
+        performance = values['performance'][self.technician.id]
+        self.assertEqual(performance['completed_orders_count'], 3)
+        self.assertEqual(performance['repeat_calls'], 1)
+        self.assertAlmostEqual(performance['first_time_fix_rate'], 66.7)
+        self.assertAlmostEqual(performance['avg_completion_time'], 2.0)
+        self.assertEqual(performance['service_type_stats'][0]['count'], 3)
+        self.assertEqual(len(performance['service_orders']), 3)
+        self.assertEqual(values['performance'][idle.id]['completed_orders_count'], 0)
@@ -1,4 +1,5 @@
 from odoo import models, fields, api, _
+from odoo.exceptions import UserError
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -35,11 +36,9 @@ class ServiceReprogramWizard(models.TransientModel):
             if not self.reason or not self.reason.strip():
                 raise UserError(_("Reason is required for reprogramming"))
 
-            # Check for conflicts
+            # Check for conflicts at the new date, without touching the order
             business_logic = self.env['service.order.business.logic']
-            temp_order = self.order_id.copy({'date_scheduled': self.new_date})
-            conflicts = business_logic.check_service_order_conflicts(temp_order)
-            temp_order.unlink()
+            conflicts = business_logic.check_service_order_conflicts(self.order_id, start=self.new_date)
 
             if conflicts:
                 conflict_messages = [c['reason'] for c in conflicts]